@@ -0,0 +1,65 @@
+import argparse
+import os
+import time
+
+from language_pairs import language_pairs
+from model_cache import default_device, model_cache
+from translation_engine import DEFAULT_MAX_BATCH_TOKENS, translate, translate_texts
+
+
+SAMPLE_FILE = os.path.join(os.path.dirname(__file__), 'sample_en.txt')
+
+
+# Read one sentence per line, skipping blank lines
+def read_sentences(path):
+    with open(path, encoding='utf-8') as handle:
+        return [line.strip() for line in handle if line.strip()]
+
+
+# Time a translation function over the sentences, returning (seconds, outputs)
+def timed(function):
+    start = time.perf_counter()
+    outputs = function()
+    return time.perf_counter() - start, outputs
+
+
+# Compare the old one-string-per-generate() loop with token-budgeted batching
+def compare(sentences, model_name, device, max_batch_tokens, repeat):
+    # Load the model up front so neither side pays for it
+    model_cache.get(model_name, device)
+
+    rows = []
+    for _ in range(repeat):
+        sequential_time, sequential = timed(lambda: [translate(text, model_name, device) for text in sentences])
+        batched_time, batched = timed(
+            lambda: translate_texts(sentences, model_name, device, max_batch_tokens=max_batch_tokens)
+        )
+        agreement = sum(a == b for a, b in zip(sequential, batched)) / len(sentences)
+        rows.append((sequential_time, batched_time, agreement))
+
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare one-at-a-time and batched translation throughput')
+    parser.add_argument('--pair', default='English to Spanish', choices=list(language_pairs))
+    parser.add_argument('--input', default=SAMPLE_FILE, help='file with one sentence per line')
+    parser.add_argument('--max-batch-tokens', type=int, default=DEFAULT_MAX_BATCH_TOKENS)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    sentences = read_sentences(args.input)
+    device = default_device()
+    rows = compare(sentences, language_pairs[args.pair], device, args.max_batch_tokens, args.repeat)
+
+    print(f'{len(sentences)} sentences, {args.pair}, device={device}, max_batch_tokens={args.max_batch_tokens}')
+    print(f'{"run":>4} {"sequential s/s":>15} {"batched s/s":>12} {"speedup":>8} {"identical":>10}')
+    for run, (sequential_time, batched_time, agreement) in enumerate(rows, 1):
+        print(
+            f'{run:>4} {len(sentences) / sequential_time:>15.2f} {len(sentences) / batched_time:>12.2f}'
+            f' {sequential_time / batched_time:>7.2f}x {agreement:>9.0%}'
+        )
+
+
+if __name__ == '__main__':
+    main()
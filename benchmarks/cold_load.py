@@ -0,0 +1,65 @@
+import argparse
+import multiprocessing
+import os
+import time
+
+from benchmarks.metrics import peak_rss_mb
+from language_pairs import language_pairs
+
+
+# Load one model in a fresh process, from the hub/HF cache or from the local model store,
+# and report the time to load (imports included) and the resident memory afterwards
+def load_in_fresh_process(model_name, use_store):
+    start = time.perf_counter()
+    from model_cache import load_marian
+    tokenizer, model = load_marian(model_name, 'cpu', use_store=use_store)
+    load_s = time.perf_counter() - start
+
+    # The first generate() is where mmapped pages that were not touched yet get read
+    start = time.perf_counter()
+    model.generate(**tokenizer(['Hello world.'], return_tensors='pt'), max_new_tokens=8)
+    first_generate_s = time.perf_counter() - start
+    return load_s, first_generate_s, current_rss_mb(), peak_rss_mb()
+
+
+# Resident memory right now (Linux), falling back to the peak elsewhere
+def current_rss_mb():
+    try:
+        with open('/proc/self/statm') as handle:
+            pages = int(handle.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except OSError:
+        return peak_rss_mb()
+
+
+def measure(model_name, use_store, runs):
+    context = multiprocessing.get_context('spawn')
+    samples = []
+    for _ in range(runs):
+        with context.Pool(1) as pool:
+            samples.append(pool.apply(load_in_fresh_process, (model_name, use_store)))
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cold-load time and RSS: Hugging Face cache vs local model store')
+    parser.add_argument('--pair', default='English to Spanish', choices=list(language_pairs))
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    import model_store
+
+    model_name = language_pairs[args.pair]
+    if model_store.find(model_name) is None:
+        print(f'{model_name} is not in the model store, prefetching it first')
+        model_store.prefetch([model_name])
+
+    print(f'{args.pair} ({model_name}), {args.runs} fresh processes per source')
+    print(f'{"source":>8} {"load s":>8} {"1st gen s":>9} {"RSS MiB":>8} {"peak MiB":>8}')
+    for source, use_store in (('hub', False), ('store', True)):
+        for load_s, first_generate_s, rss, peak in measure(model_name, use_store, args.runs):
+            print(f'{source:>8} {load_s:>8.3f} {first_generate_s:>9.3f} {rss:>8.0f} {peak:>8.0f}')
+
+
+if __name__ == '__main__':
+    main()
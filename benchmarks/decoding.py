@@ -0,0 +1,87 @@
+import argparse
+import json
+import os
+import statistics
+import time
+
+from benchmarks.batching import read_sentences
+from benchmarks.metrics import corpus_bleu, percentile
+from benchmarks.quantization import source_sentences
+from decoding_profiles import DECODING_PROFILES
+from language_pairs import language_pairs
+
+
+# One row of the table: sentence-at-a-time latency, batched throughput and outputs
+def measure_profile(model_name, sentences, device, decoding, batch_size):
+    from translation_engine import translate_texts
+
+    latencies = []
+    outputs = []
+    for sentence in sentences:
+        start = time.perf_counter()
+        outputs.append(translate_texts([sentence], model_name, device, decoding=decoding)[0])
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for offset in range(0, len(sentences), batch_size):
+        translate_texts(sentences[offset:offset + batch_size], model_name, device, decoding=decoding)
+    throughput = len(sentences) / (time.perf_counter() - start)
+
+    return {
+        'profile': decoding or 'model default',
+        'mean_ms': 1000 * statistics.mean(latencies),
+        'p50_ms': 1000 * percentile(latencies, 0.50),
+        'p95_ms': 1000 * percentile(latencies, 0.95),
+        'sentences_per_s': throughput,
+        'mean_output_words': statistics.mean(len(output.split()) for output in outputs),
+        'outputs': outputs,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Latency and quality of each decoding profile')
+    parser.add_argument('--pair', default='English to Spanish', choices=list(language_pairs))
+    parser.add_argument('--references', default=None,
+                        help='reference translations, one per source line (default: score against the '
+                             "model's default beam search output)")
+    parser.add_argument('--batch-size', type=int, default=16)
+    parser.add_argument('--device', default='cpu')
+    parser.add_argument('--threads', type=int, default=os.cpu_count())
+    parser.add_argument('--json', default=None, help='also write the rows to this JSON file')
+    args = parser.parse_args()
+
+    import torch
+
+    from translation_engine import warm_up
+
+    torch.set_num_threads(args.threads)
+    device = torch.device(args.device)
+    model_name = language_pairs[args.pair]
+    sentences = source_sentences(args.pair, args.threads)
+    if not sentences:
+        parser.error(f'no sample sentences for the source language of {args.pair}')
+    warm_up(model_name, device)
+
+    rows = [measure_profile(model_name, sentences, device, decoding, args.batch_size)
+            for decoding in [None] + list(DECODING_PROFILES)]
+
+    if args.references:
+        references, reference_name = read_sentences(args.references), 'references'
+    else:
+        references, reference_name = rows[0]['outputs'], 'model default output'
+    for row in rows:
+        row['bleu'] = corpus_bleu(row.pop('outputs'), references)
+
+    print(f'{args.pair}, {len(sentences)} sentences, BLEU against {reference_name}')
+    print(f'{"profile":<14} {"mean ms":>8} {"p50 ms":>8} {"p95 ms":>8} {"sent/s":>8} {"words":>6} {"BLEU":>6}')
+    for row in rows:
+        print(f'{row["profile"]:<14} {row["mean_ms"]:>8.1f} {row["p50_ms"]:>8.1f} {row["p95_ms"]:>8.1f} '
+              f'{row["sentences_per_s"]:>8.1f} {row["mean_output_words"]:>6.1f} {row["bleu"]:>6.1f}')
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as handle:
+            json.dump(rows, handle, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+import argparse
+import os
+import sys
+
+
+# Run the Qt event loop for a while, so timers (smooth rescale, paint flush) fire
+def wait(app, milliseconds):
+    from PyQt5.QtCore import QEventLoop, QTimer
+
+    loop = QEventLoop()
+    QTimer.singleShot(milliseconds, loop.quit)
+    loop.exec_()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='GUI frame times while resizing and while streaming a long output')
+    parser.add_argument('--resizes', type=int, default=300, help='resize events in the simulated window drag')
+    parser.add_argument('--sentences', type=int, default=3000, help='sentences streamed into the output box')
+    parser.add_argument('--sentences-per-frame', type=int, default=5,
+                        help='sentences arriving between two turns of the event loop')
+    parser.add_argument('--offscreen', action='store_true', help='use the offscreen Qt platform (no display needed)')
+    args = parser.parse_args()
+
+    if args.offscreen:
+        os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+    from PyQt5.QtWidgets import QApplication
+
+    app = QApplication(sys.argv)
+
+    import translator_version_2 as gui
+    from instrumentation import RequestTrace
+
+    window = gui.TranslatorApp()
+    window.provide_output = lambda text: None  # no speech while measuring
+    window.show()
+    wait(app, 2 * gui.RESIZE_SMOOTH_DELAY_MS)
+
+    # A window drag: a resize event per turn of the event loop, then a pause
+    window.frame_timer.reset()
+    window.frame_probe.start()
+    for step in range(args.resizes):
+        window.resize(900 + step % 300, 650 + step % 150)
+        app.processEvents()
+    wait(app, 2 * gui.RESIZE_SMOOTH_DELAY_MS)
+    print(f'resize drag:    {window.frame_timer.summary_line()}')
+
+    # A long result streamed sentence by sentence
+    window.frame_timer.reset()
+    window.latest_request_id = -1
+    window.live_request = True  # no fade-in, no speech
+    window.current_trace = RequestTrace(-1)
+    for index in range(args.sentences):
+        window.append_output_segment(-1, index, f'This is sentence {index} of a long translated document.')
+        if index % args.sentences_per_frame == 0:
+            app.processEvents()
+    wait(app, 4 * gui.PAINT_INTERVAL_MS)
+    window.frame_probe.stop()
+    print(f'stream output:  {window.frame_timer.summary_line()}')
+    print(f'output length:  {len(window.output_textbox.toPlainText())} characters')
+
+
+if __name__ == '__main__':
+    main()
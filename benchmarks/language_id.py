@@ -0,0 +1,70 @@
+import argparse
+import time
+
+from benchmarks.batching import SAMPLE_FILE, read_sentences
+from benchmarks.metrics import percentile
+from language_id import identify, route
+
+
+# Held-out sentences (none of them is in the seed texts), a few per source language
+TEST_SENTENCES = {
+    'English': ['I have never seen such a beautiful house.', 'Can you send me the report by Friday?',
+                'Prices have gone up a lot this year.', 'Good morning'],
+    'Spanish': ['Nunca he visto una casa tan bonita.', '¿Puedes enviarme el informe el viernes?',
+                'Los precios han subido mucho este año.', 'Hola'],
+    'French': ["Je n'ai jamais vu une maison aussi belle.", "Peux-tu m'envoyer le rapport vendredi ?",
+               'Les prix ont beaucoup augmenté cette année.', 'Bonjour'],
+    'German': ['Ich habe noch nie so ein schönes Haus gesehen.', 'Kannst du mir den Bericht am Freitag schicken?',
+               'Die Preise sind dieses Jahr stark gestiegen.', 'Guten Morgen'],
+    'Italian': ['Non ho mai visto una casa così bella.', 'Puoi mandarmi il rapporto venerdì?',
+                "I prezzi sono aumentati molto quest'anno.", 'Buongiorno'],
+    'Portuguese': ['Nunca vi uma casa tão bonita.', 'Você pode me enviar o relatório na sexta-feira?',
+                   'Os preços subiram muito este ano.', 'Bom dia'],
+    'Turkish': ['Daha önce hiç böyle güzel bir ev görmedim.', 'Raporu cuma günü bana gönderebilir misin?',
+                'Fiyatlar bu yıl çok arttı.', 'Günaydın'],
+    'Russian': ['Я никогда не видел такого красивого дома.'],
+    'Chinese': ['我从来没有见过这么漂亮的房子。'],
+    'Japanese': ['こんなにきれいな家は見たことがありません。'],
+    'Arabic': ['لم أر قط منزلا بهذا الجمال.'],
+    'Hindi': ['मैंने इतना सुंदर घर कभी नहीं देखा।'],
+    'Bengali': ['আমি এত সুন্দর বাড়ি কখনও দেখিনি।'],
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Accuracy and per-sentence cost of the language identifier')
+    parser.add_argument('--sentences', default=SAMPLE_FILE, help='English sentences timed for throughput')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    misses = []
+    total = 0
+    for language, sentences in TEST_SENTENCES.items():
+        for sentence in sentences:
+            total += 1
+            detected = identify(sentence)
+            if detected != language:
+                misses.append((language, detected, sentence))
+    print(f'accuracy {1 - len(misses) / total:.1%} on {total} held-out sentences')
+    for language, detected, sentence in misses:
+        print(f'  {language} detected as {detected}: {sentence}')
+
+    sentences = read_sentences(args.sentences) * args.repeat
+    latencies = []
+    for sentence in sentences:
+        start = time.perf_counter()
+        identify(sentence)
+        latencies.append(time.perf_counter() - start)
+    print(f'{len(sentences)} sentences: p50 {1e6 * percentile(latencies, 0.50):.1f} us, '
+          f'p99 {1e6 * percentile(latencies, 0.99):.1f} us')
+
+    mixed = [sentence for sentences in TEST_SENTENCES.values() for sentence in sentences] * args.repeat
+    start = time.perf_counter()
+    groups, unchanged, unknown = route(mixed)
+    elapsed = time.perf_counter() - start
+    print(f'routed {len(mixed)} mixed texts into {len(groups)} model batches in {1000 * elapsed:.1f} ms '
+          f'({len(unchanged)} already English, {len(unknown)} without a model)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+import math
+import resource
+import sys
+from collections import Counter
+
+
+# Peak resident set size of the current process in MiB
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes
+    if sys.platform == 'darwin':
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+# Value below which the given fraction of the samples fall (nearest-rank method)
+def percentile(samples, fraction):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(math.ceil(fraction * len(ordered)) - 1, 0)
+    return ordered[rank]
+
+
+def ngrams(tokens, n):
+    return Counter(tuple(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+
+
+# Corpus-level BLEU-4 (0-100) on whitespace tokens with the standard brevity penalty.
+# Good enough to compare two systems on the same sentences; not comparable to sacreBLEU scores.
+def corpus_bleu(hypotheses, references, max_n=4):
+    matches = [0] * max_n
+    totals = [0] * max_n
+    hypothesis_length = 0
+    reference_length = 0
+
+    for hypothesis, reference in zip(hypotheses, references):
+        hypothesis_tokens = hypothesis.split()
+        reference_tokens = reference.split()
+        hypothesis_length += len(hypothesis_tokens)
+        reference_length += len(reference_tokens)
+
+        for n in range(1, max_n + 1):
+            hypothesis_ngrams = ngrams(hypothesis_tokens, n)
+            reference_ngrams = ngrams(reference_tokens, n)
+            matches[n - 1] += sum(min(count, reference_ngrams[gram]) for gram, count in hypothesis_ngrams.items())
+            totals[n - 1] += max(len(hypothesis_tokens) - n + 1, 0)
+
+    if hypothesis_length == 0 or min(matches) == 0:
+        return 0.0
+
+    log_precision = sum(math.log(matches[n] / totals[n]) for n in range(max_n)) / max_n
+    brevity_penalty = min(1.0, math.exp(1 - reference_length / hypothesis_length))
+    return 100 * brevity_penalty * math.exp(log_precision)
@@ -0,0 +1,71 @@
+import argparse
+import os
+import time
+
+from benchmarks.quantization import source_sentences
+from pivot_translation import PIVOT_LANGUAGE, pivot_route, translate_fanout, translate_pivot_stream
+from translation_worker import SegmentMemo
+
+
+# Hop one over everything, then hop two over everything: what chaining two calls by hand does
+def chained(sentences, route, device):
+    from translation_engine import translate_texts
+
+    start = time.perf_counter()
+    english = translate_texts(sentences, route[0], device)
+    outputs = translate_texts(english, route[1], device)
+    elapsed = time.perf_counter() - start
+    return elapsed, elapsed, outputs
+
+
+# Pipelined hops, timing the first sentence out and the whole list
+def pipelined(sentences, route, device):
+    start = time.perf_counter()
+    first = None
+    outputs = []
+    for _, translation in translate_pivot_stream(sentences, route, device, pivot_cache=None):
+        if first is None:
+            first = time.perf_counter() - start
+        outputs.append(translation)
+    return first, time.perf_counter() - start, outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pivot translation through English: chained vs pipelined hops')
+    parser.add_argument('--source', default='Spanish')
+    parser.add_argument('--target', default='German')
+    parser.add_argument('--fanout', nargs='*', default=['German', 'Italian', 'Russian'],
+                        help='targets for the fan-out run (one English pass shared by all)')
+    parser.add_argument('--device', default='cpu')
+    parser.add_argument('--threads', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    import torch
+
+    from translation_engine import warm_up
+
+    torch.set_num_threads(args.threads)
+    device = torch.device(args.device)
+    route = pivot_route(args.source, args.target)
+    if not isinstance(route, tuple):
+        parser.error(f'{args.source} to {args.target} is not a pivot pair')
+    sentences = source_sentences(f'{args.source} to {PIVOT_LANGUAGE}', args.threads)
+    if not sentences:
+        parser.error(f'no sample sentences for {args.source}')
+    for model_name in route:
+        warm_up(model_name, device)
+
+    print(f'{args.source} -> {PIVOT_LANGUAGE} -> {args.target}, {len(sentences)} sentences')
+    print(f'{"run":<10} {"first s":>8} {"total s":>8}')
+    for name, run in [('chained', chained), ('pipelined', pipelined)]:
+        first, total, _ = run(sentences, route, device)
+        print(f'{name:<10} {first:>8.2f} {total:>8.2f}')
+
+    for label, cache in [('no English cache', None), ('English cache', SegmentMemo(max_entries=len(sentences)))]:
+        start = time.perf_counter()
+        translate_fanout(sentences, args.source, args.fanout, device, pivot_cache=cache)
+        print(f'fan-out to {len(args.fanout)} targets, {label}: {time.perf_counter() - start:.2f}s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+import argparse
+import os
+import time
+
+from benchmarks.batching import SAMPLE_FILE, read_sentences
+from language_pairs import language_pairs
+from process_executor import ProcessTranslationExecutor, suggest_split
+
+
+# Throughput of one processes x threads split over the same sentences
+def measure(sentences, model_name, processes, threads, shard_size):
+    with ProcessTranslationExecutor(processes, threads, preload=[model_name], shard_size=shard_size) as executor:
+        # One warm-up pass so every process has loaded the model
+        executor.translate_texts(sentences[:processes * shard_size], model_name)
+
+        start = time.perf_counter()
+        executor.translate_texts(sentences, model_name)
+        return len(sentences) / (time.perf_counter() - start)
+
+
+# Every processes x threads split whose product does not exceed the core count
+def candidate_splits(cores):
+    splits = []
+    threads = 1
+    while threads <= cores:
+        splits.append((cores // threads, threads))
+        threads *= 2
+    return splits
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure throughput for processes x torch threads splits')
+    parser.add_argument('--pair', default='English to Spanish', choices=list(language_pairs))
+    parser.add_argument('--input', default=SAMPLE_FILE)
+    parser.add_argument('--repeat-input', type=int, default=20, help='repeat the input to get a larger job')
+    parser.add_argument('--cores', type=int, default=os.cpu_count())
+    parser.add_argument('--shard-size', type=int, default=32)
+    args = parser.parse_args()
+
+    sentences = read_sentences(args.input) * args.repeat_input
+    model_name = language_pairs[args.pair]
+    print(f'{len(sentences)} sentences, {args.pair}, {args.cores} cores, suggested split {suggest_split(args.cores)}')
+    print(f'{"processes":>9} {"threads":>7} {"sent/s":>8}')
+
+    for processes, threads in candidate_splits(args.cores):
+        rate = measure(sentences, model_name, processes, threads, args.shard_size)
+        print(f'{processes:>9} {threads:>7} {rate:>8.1f}')
+
+
+if __name__ == '__main__':
+    main()
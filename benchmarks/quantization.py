@@ -0,0 +1,116 @@
+import argparse
+import json
+import multiprocessing
+import os
+import statistics
+import time
+
+from benchmarks.batching import SAMPLE_FILE, read_sentences
+from benchmarks.metrics import corpus_bleu, peak_rss_mb, percentile
+from language_pairs import language_pairs
+
+
+SAMPLES_DIR = os.path.dirname(SAMPLE_FILE)
+
+
+# Runs in a fresh process so peak RSS belongs to one variant only
+def run_variant(model_name, sentences, quantized, threads):
+    import torch
+
+    from translation_engine import translate_texts
+
+    torch.set_num_threads(threads)
+    device = torch.device('cpu')
+
+    start = time.perf_counter()
+    translate_texts(['Hello'], model_name, device, quantized=quantized)
+    load_s = time.perf_counter() - start
+
+    latencies = []
+    outputs = []
+    for sentence in sentences:
+        start = time.perf_counter()
+        outputs.append(translate_texts([sentence], model_name, device, quantized=quantized)[0])
+        latencies.append(time.perf_counter() - start)
+
+    return {
+        'load_s': load_s,
+        'mean_ms': 1000 * statistics.mean(latencies),
+        'p50_ms': 1000 * percentile(latencies, 0.50),
+        'p95_ms': 1000 * percentile(latencies, 0.95),
+        'peak_rss_mb': peak_rss_mb(),
+        'outputs': outputs,
+    }
+
+
+def run_isolated(model_name, sentences, quantized, threads):
+    with multiprocessing.get_context('spawn').Pool(1) as pool:
+        return pool.apply(run_variant, (model_name, sentences, quantized, threads))
+
+
+# Source sentences for a pair: sample_en.txt for English sources, otherwise
+# samples/<Language>.txt, created once by translating the English samples
+def source_sentences(pair, threads):
+    source_language = pair.split(' to ')[0]
+    if source_language == 'English':
+        return read_sentences(SAMPLE_FILE)
+
+    path = os.path.join(SAMPLES_DIR, f'sample_{source_language.lower()}.txt')
+    if not os.path.exists(path):
+        reverse_pair = f'English to {source_language}'
+        if reverse_pair not in language_pairs:
+            return None
+        translated = run_isolated(language_pairs[reverse_pair], read_sentences(SAMPLE_FILE), False, threads)
+        with open(path, 'w', encoding='utf-8') as handle:
+            handle.write('\n'.join(translated['outputs']) + '\n')
+    return read_sentences(path)
+
+
+def compare_pair(pair, threads):
+    sentences = source_sentences(pair, threads)
+    if not sentences:
+        return None
+
+    model_name = language_pairs[pair]
+    fp32 = run_isolated(model_name, sentences, False, threads)
+    int8 = run_isolated(model_name, sentences, True, threads)
+
+    identical = sum(a == b for a, b in zip(fp32['outputs'], int8['outputs']))
+    row = {'pair': pair, 'sentences': len(sentences)}
+    for name, result in (('fp32', fp32), ('int8', int8)):
+        for metric in ('load_s', 'mean_ms', 'p50_ms', 'p95_ms', 'peak_rss_mb'):
+            row[f'{name}_{metric}'] = round(result[metric], 2)
+    row['speedup'] = round(fp32['mean_ms'] / int8['mean_ms'], 2)
+    row['bleu_vs_fp32'] = round(corpus_bleu(int8['outputs'], fp32['outputs']), 1)
+    row['identical'] = round(identical / len(sentences), 3)
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare fp32 and int8 dynamically quantized CPU inference')
+    parser.add_argument('--pair', action='append', choices=list(language_pairs),
+                        help='pair to measure (repeatable, default: every pair)')
+    parser.add_argument('--threads', type=int, default=os.cpu_count())
+    parser.add_argument('--json', default=None, help='also write the rows to this JSON file')
+    args = parser.parse_args()
+
+    rows = []
+    print(f'{"pair":<24} {"fp32 ms":>8} {"int8 ms":>8} {"speedup":>8} {"fp32 MB":>8} {"int8 MB":>8} '
+          f'{"BLEU":>6} {"same":>6}')
+    for pair in args.pair or list(language_pairs):
+        row = compare_pair(pair, args.threads)
+        if row is None:
+            print(f'{pair:<24} skipped: no sample sentences for the source language')
+            continue
+        rows.append(row)
+        print(f'{pair:<24} {row["fp32_mean_ms"]:>8.1f} {row["int8_mean_ms"]:>8.1f} {row["speedup"]:>7.2f}x '
+              f'{row["fp32_peak_rss_mb"]:>8.0f} {row["int8_peak_rss_mb"]:>8.0f} '
+              f'{row["bleu_vs_fp32"]:>6.1f} {row["identical"]:>6.0%}')
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as handle:
+            json.dump(rows, handle, indent=2)
+
+
+if __name__ == '__main__':
+    main()
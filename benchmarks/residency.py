@@ -0,0 +1,94 @@
+import argparse
+import random
+import time
+
+from benchmarks.metrics import percentile
+from language_pairs import language_pairs
+from model_cache import ModelCache, ResidencyManager
+
+MB = 1024 * 1024
+
+
+# A session switching between pairs: a few hot pairs most of the time, the rest now and then
+def workload(requests, hot_pairs, hot_share, seed):
+    generator = random.Random(seed)
+    models = list(dict.fromkeys(language_pairs.values()))
+    generator.shuffle(models)
+    hot, cold = models[:hot_pairs], models[hot_pairs:]
+    return [generator.choice(hot if generator.random() < hot_share else cold) for _ in range(requests)]
+
+
+class FakeModel:
+    def __init__(self, name):
+        self.name = name
+
+
+# Stand-ins for loading from disk and copying to the device, timed like the real thing
+def fake_functions(load_s, copy_mb_per_s, model_mb):
+    def loader(model_name, device):
+        time.sleep(load_s)
+        return None, FakeModel(model_name)
+
+    def mover(model, device):
+        time.sleep(model_mb / copy_mb_per_s)
+
+    return loader, mover, lambda model: model_mb * MB
+
+
+def replay(cache, models, device):
+    latencies = []
+    for model_name in models:
+        start = time.perf_counter()
+        cache.acquire(model_name, device)
+        cache.release(model_name, device)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Model residency: LRU cache vs device-aware residency manager')
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--hot-pairs', type=int, default=3)
+    parser.add_argument('--hot-share', type=float, default=0.85)
+    parser.add_argument('--device-budget-mb', type=float, default=1200,
+                        help='device memory for models (simulated on the CPU unless --device is an accelerator)')
+    parser.add_argument('--device', default='cpu')
+    parser.add_argument('--fake', action='store_true',
+                        help='no torch: fake models with --fake-load-s load time and --fake-copy-mb-s copy speed')
+    parser.add_argument('--fake-load-s', type=float, default=0.5)
+    parser.add_argument('--fake-copy-mb-s', type=float, default=10000)
+    parser.add_argument('--fake-model-mb', type=float, default=300)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    models = workload(args.requests, args.hot_pairs, args.hot_share, args.seed)
+    options = {}
+    if args.fake:
+        loader, mover, sizeof = fake_functions(args.fake_load_s, args.fake_copy_mb_s, args.fake_model_mb)
+        options = {'loader': loader, 'sizeof': sizeof}
+    else:
+        mover = None
+
+    budget = int(args.device_budget_mb * MB)
+    simulated = budget if args.device == 'cpu' else None
+    caches = {
+        'lru (4 models)': ModelCache(max_entries=4, **options),
+        'residency': ResidencyManager(
+            device_budget=budget, simulated_device_budget=simulated, usage_path=None,
+            **dict(options, **({'mover': mover} if mover else {})),
+        ),
+    }
+
+    print(f'{args.requests} requests over {len(set(models))} models, device budget {args.device_budget_mb:.0f} MiB')
+    print(f'{"cache":<16} {"p50 ms":>8} {"p95 ms":>8} {"total s":>8}  counters')
+    for name, cache in caches.items():
+        latencies = replay(cache, models, args.device)
+        stats = cache.stats()
+        counters = ', '.join(f'{key} {stats[key]}' for key in ('misses', 'promotions', 'demotions', 'evictions')
+                             if key in stats)
+        print(f'{name:<16} {1000 * percentile(latencies, 0.50):>8.1f} {1000 * percentile(latencies, 0.95):>8.1f} '
+              f'{sum(latencies):>8.2f}  {counters}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+from benchmarks.batching import SAMPLE_FILE, read_sentences
+from benchmarks.metrics import percentile
+from language_pairs import language_pairs
+from translation_server import TranslationClient
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+# Start a server in a subprocess and wait until it answers /health
+def start_server(window_ms, max_batch_texts, pair):
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, 'translation_server.py', '--port', str(port), '--window-ms', str(window_ms),
+         '--max-batch-texts', str(max_batch_texts), '--preload', pair],
+        cwd=REPO_ROOT,
+    )
+    url = f'http://127.0.0.1:{port}'
+    client = TranslationClient(url)
+    while True:
+        if process.poll() is not None:
+            raise RuntimeError('translation server exited during startup')
+        try:
+            client.request('GET', '/health')
+            return process, url
+        except OSError:
+            time.sleep(0.2)
+
+
+# N clients, each sending one sentence at a time as fast as the server answers
+def run_clients(url, model_name, sentences, clients, requests_per_client):
+    latencies = []
+    lock = threading.Lock()
+
+    def client_loop(offset):
+        client = TranslationClient(url)
+        own = []
+        for index in range(requests_per_client):
+            text = sentences[(offset + index) % len(sentences)]
+            start = time.perf_counter()
+            client.translate(text, model_name)
+            own.append(time.perf_counter() - start)
+        client.close()
+        with lock:
+            latencies.extend(own)
+
+    threads = [threading.Thread(target=client_loop, args=(offset * 7,)) for offset in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return latencies, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Throughput and latency of the translation server under N clients')
+    parser.add_argument('--url', default=None, help='use a running server instead of starting one')
+    parser.add_argument('--pair', default='English to Spanish', choices=list(language_pairs))
+    parser.add_argument('--input', default=SAMPLE_FILE)
+    parser.add_argument('--clients', default='1,4,16', help='comma-separated client counts')
+    parser.add_argument('--requests', type=int, default=20, help='requests per client')
+    parser.add_argument('--window-ms', type=float, default=10)
+    parser.add_argument('--max-batch-texts', type=int, default=64)
+    args = parser.parse_args()
+
+    sentences = read_sentences(args.input)
+    model_name = language_pairs[args.pair]
+
+    process = None
+    url = args.url
+    if url is None:
+        process, url = start_server(args.window_ms, args.max_batch_texts, args.pair)
+
+    try:
+        stats_client = TranslationClient(url)
+        # Warm-up so the first measured request does not pay for loading
+        stats_client.translate(sentences[0], model_name)
+
+        print(f'{args.pair}, {url}, window {args.window_ms} ms')
+        print(f'{"clients":>7} {"req/s":>8} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"texts/batch":>11}')
+        for clients in (int(value) for value in args.clients.split(',')):
+            before = stats_client.request('GET', '/stats')['batcher']
+            latencies, elapsed = run_clients(url, model_name, sentences, clients, args.requests)
+            after = stats_client.request('GET', '/stats')['batcher']
+
+            batches = after['batches'] - before['batches']
+            texts_per_batch = (after['texts'] - before['texts']) / batches if batches else 0.0
+            print(f'{clients:>7} {len(latencies) / elapsed:>8.1f} {1000 * percentile(latencies, 0.50):>8.1f} '
+                  f'{1000 * percentile(latencies, 0.95):>8.1f} {1000 * percentile(latencies, 0.99):>8.1f} '
+                  f'{texts_per_batch:>11.1f}')
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs inside a fresh interpreter in the tree being measured and prints one JSON line.
+# Works for old revisions too: steps the tree does not support are skipped.
+PROBE = r'''
+import functools, json, sys, time
+start = time.perf_counter()
+
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import QEventLoop, QTimer
+app = QApplication(sys.argv)
+qt_ready = time.perf_counter()
+
+import translator_version_2 as gui
+imported = time.perf_counter()
+
+# A fresh cache in a temporary directory: the first translation really runs the model,
+# and the user's stored translations are never touched
+if hasattr(gui, 'TranslationResultCache'):
+    gui.TranslationResultCache = functools.partial(gui.TranslationResultCache, CACHE_PATH)
+
+window = gui.TranslatorApp()
+window.provide_output = lambda text: None  # no speech while measuring
+window.show()
+app.processEvents()
+shown = time.perf_counter()
+
+result = {
+    'qt_init_s': qt_ready - start,
+    'import_s': imported - qt_ready,
+    'window_shown_s': shown - start,
+    'heavy_modules_at_show': sorted(
+        name for name in ('torch', 'transformers', 'speech_recognition', 'pyttsx3') if name in sys.modules
+    ),
+}
+
+def wait_for(signal, timeout_ms):
+    loop = QEventLoop()
+    signal.connect(lambda *args: loop.quit())
+    QTimer.singleShot(timeout_ms, loop.quit)
+    loop.exec_()
+
+signals = getattr(window, 'translation_signals', None)
+if signals is not None and hasattr(signals, 'model_ready'):
+    wait_for(signals.model_ready, TIMEOUT_MS)
+    ready = time.perf_counter()
+    result['model_ready_s'] = ready - start
+
+    window.input_text.setText(SENTENCE)
+    window.translate_text()
+    wait_for(signals.translation_done, TIMEOUT_MS)
+    done = time.perf_counter()
+    result['first_translation_s'] = done - start
+    result['first_translation_after_ready_s'] = done - ready
+
+print(json.dumps(result))
+'''
+
+
+# Materialize a git revision in a temporary directory
+def checkout(revision, directory):
+    archive = subprocess.run(['git', 'archive', revision], cwd=REPO_ROOT, check=True, capture_output=True)
+    subprocess.run(['tar', '-x', '-C', directory], input=archive.stdout, check=True)
+
+
+def probe(tree, sentence, timeout_ms):
+    env = dict(os.environ, QT_QPA_PLATFORM=os.environ.get('QT_QPA_PLATFORM', 'offscreen'))
+    with tempfile.TemporaryDirectory() as cache_directory:
+        cache_path = os.path.join(cache_directory, 'translations.sqlite3')
+        code = (PROBE.replace('TIMEOUT_MS', str(timeout_ms)).replace('SENTENCE', repr(sentence))
+                .replace('CACHE_PATH', repr(cache_path)))
+        completed = subprocess.run(
+            [sys.executable, '-c', code], cwd=tree, env=env, check=True, capture_output=True, text=True
+        )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure GUI import time, time to window and time to first translation')
+    parser.add_argument('--revision', action='append', default=[],
+                        help='git revision to measure instead of the working tree (repeatable, e.g. baseline HEAD)')
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--sentence', default='Good morning, how are you today?')
+    parser.add_argument('--timeout-ms', type=int, default=300000)
+    args = parser.parse_args()
+
+    targets = args.revision or [None]
+    report = {}
+    for revision in targets:
+        with tempfile.TemporaryDirectory() as directory:
+            tree = REPO_ROOT
+            if revision is not None:
+                checkout(revision, directory)
+                tree = directory
+            report[revision or 'working tree'] = [probe(tree, args.sentence, args.timeout_ms) for _ in range(args.runs)]
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,211 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import tempfile
+import time
+
+from benchmarks.batching import SAMPLE_FILE, read_sentences
+from benchmarks.metrics import peak_rss_mb, percentile
+from benchmarks.tiny_marian import build_tiny_marian
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# RequestTrace stages reported per case
+STAGES = ('load', 'tokenize', 'generate', 'decode')
+
+
+# Inputs of roughly `words` words, built from the sample sentences so runs are reproducible
+def make_inputs(words, count):
+    vocabulary = ' '.join(read_sentences(SAMPLE_FILE)).split()
+    inputs = []
+    for index in range(count):
+        start = (index * 7) % len(vocabulary)
+        inputs.append(' '.join(vocabulary[(start + offset) % len(vocabulary)] for offset in range(words)))
+    return inputs
+
+
+# First load of a model in a fresh process (imports, file reads and deserialization)
+def cold_load(model_name, threads):
+    import torch
+
+    torch.set_num_threads(threads)
+    start = time.perf_counter()
+    from model_cache import load_marian
+    load_marian(model_name, torch.device('cpu'))
+    return time.perf_counter() - start
+
+
+def measure_cold_load(model_name, threads):
+    with multiprocessing.get_context('spawn').Pool(1) as pool:
+        return pool.apply(cold_load, (model_name, threads))
+
+
+# Warm loads: deserializing again in a process that already did it once, and a model cache hit
+def measure_warm_load(model_name, device):
+    from model_cache import ModelCache, load_marian
+
+    load_marian(model_name, device)
+    start = time.perf_counter()
+    load_marian(model_name, device)
+    reload_s = time.perf_counter() - start
+
+    cache = ModelCache()
+    cache.get(model_name, device)
+    start = time.perf_counter()
+    cache.get(model_name, device)
+    cache_hit_s = time.perf_counter() - start
+    return reload_s, cache_hit_s
+
+
+# One request through the app's translation path (translation_engine.translate_texts:
+# batch planning, model cache, tokenize/generate/decode per batch); the stage times
+# come from its RequestTrace
+def run_once(model_name, device, cache, texts, max_batch_tokens, generate_kwargs):
+    from instrumentation import RequestTrace
+    from translation_engine import translate_texts
+
+    trace = RequestTrace()
+    start = time.perf_counter()
+    outputs = translate_texts(texts, model_name, device, cache=cache, max_batch_tokens=max_batch_tokens,
+                              trace=trace, **generate_kwargs)
+    return time.perf_counter() - start, trace.stages, outputs
+
+
+def measure_case(model_name, device, cache, words, batch_size, runs, warmup, max_batch_tokens, generate_kwargs):
+    texts = make_inputs(words, batch_size)
+    for _ in range(warmup):
+        run_once(model_name, device, cache, texts, max_batch_tokens, generate_kwargs)
+
+    samples = [run_once(model_name, device, cache, texts, max_batch_tokens, generate_kwargs) for _ in range(runs)]
+    totals = [total for total, _, _ in samples]
+    elapsed = sum(totals)
+
+    def stage_ms(name):
+        return 1000 * sum(stages.get(name, 0.0) for _, stages, _ in samples) / runs
+
+    tokenizer, _ = cache.get(model_name, device)
+    input_tokens = sum(len(ids) for ids in tokenizer(texts, truncation=True)['input_ids'])
+    output_tokens = sum(
+        len(ids) for _, _, outputs in samples for ids in tokenizer(text_target=outputs)['input_ids']
+    )
+
+    case = {'input_words': words, 'batch_size': batch_size, 'runs': runs}
+    for name in STAGES:
+        case[f'{name}_ms'] = stage_ms(name)
+    # Batch planning, cache lookups and everything else outside the traced stages
+    case['other_ms'] = 1000 * elapsed / runs - sum(case[f'{name}_ms'] for name in STAGES)
+    case.update({
+        'p50_ms': 1000 * percentile(totals, 0.50),
+        'p95_ms': 1000 * percentile(totals, 0.95),
+        'p99_ms': 1000 * percentile(totals, 0.99),
+        'sentences_per_s': batch_size * runs / elapsed,
+        'input_tokens_per_s': input_tokens * runs / elapsed,
+        'output_tokens_per_s': output_tokens / elapsed,
+    })
+    return case
+
+
+def environment(threads, device):
+    import torch
+    import transformers
+
+    try:
+        revision = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = None
+
+    return {
+        'revision': revision,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'torch': torch.__version__,
+        'transformers': transformers.__version__,
+        'torch_threads': threads,
+        'device': str(device),
+    }
+
+
+def run_suite(model_name, args):
+    import torch
+
+    from model_cache import ModelCache
+
+    torch.manual_seed(args.seed)
+    torch.set_num_threads(args.threads)
+    device = torch.device(args.device)
+
+    report = {'model': args.model or 'tiny-random-marian', 'environment': environment(args.threads, device)}
+    report['load'] = {'cold_s': [measure_cold_load(model_name, args.threads) for _ in range(args.cold_runs)]}
+    report['load']['warm_reload_s'], report['load']['cache_hit_s'] = measure_warm_load(model_name, device)
+
+    generate_kwargs = {'max_new_tokens': args.max_new_tokens}
+    if args.model is None:
+        # Random weights rarely emit </s>; pin the output length so every run does the same work
+        generate_kwargs['min_new_tokens'] = args.max_new_tokens
+    # A cache of its own, loaded up front: cases measure requests against a resident model
+    cache = ModelCache()
+    cache.get(model_name, device)
+    report['cases'] = [
+        measure_case(model_name, device, cache, words, batch_size, args.runs, args.warmup, args.max_batch_tokens,
+                     generate_kwargs)
+        for words in args.lengths
+        for batch_size in args.batch_sizes
+    ]
+    report['peak_rss_mb'] = peak_rss_mb()
+    return report
+
+
+def integer_list(value):
+    return [int(item) for item in value.split(',')]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline benchmark of model loading and translation latency/throughput')
+    parser.add_argument('--model', default=None,
+                        help='model name or directory (default: a tiny random Marian model built locally)')
+    parser.add_argument('--lengths', type=integer_list, default=[8, 32, 128], help='input lengths in words')
+    parser.add_argument('--batch-sizes', type=integer_list, default=[1, 8, 32], help='sentences per request')
+    parser.add_argument('--max-batch-tokens', type=int, default=None,
+                        help="token budget for the engine's batch planner (default: the engine's own)")
+    parser.add_argument('--runs', type=int, default=50)
+    parser.add_argument('--warmup', type=int, default=2)
+    parser.add_argument('--cold-runs', type=int, default=3)
+    parser.add_argument('--max-new-tokens', type=int, default=64,
+                        help='generation limit (exact length for the tiny random model)')
+    parser.add_argument('--threads', type=int, default=os.cpu_count())
+    parser.add_argument('--device', default='cpu')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='benchmark.json', help='JSON report path')
+    args = parser.parse_args()
+    if args.max_batch_tokens is None:
+        from translation_engine import DEFAULT_MAX_BATCH_TOKENS
+        args.max_batch_tokens = DEFAULT_MAX_BATCH_TOKENS
+
+    with tempfile.TemporaryDirectory() as directory:
+        model_name = args.model or build_tiny_marian(os.path.join(directory, 'tiny-marian'), seed=args.seed)
+        report = run_suite(model_name, args)
+
+    with open(args.output, 'w', encoding='utf-8') as handle:
+        json.dump(report, handle, indent=2)
+
+    print(f'load: {report["load"]}')
+    print(f'{"words":>5} {"batch":>5} {"tok ms":>7} {"gen ms":>8} {"dec ms":>7} {"other":>7} {"p50":>8} {"p95":>8} '
+          f'{"p99":>8} {"sent/s":>8} {"out tok/s":>9}')
+    for case in report['cases']:
+        print(f'{case["input_words"]:>5} {case["batch_size"]:>5} {case["tokenize_ms"]:>7.2f} {case["generate_ms"]:>8.2f} '
+              f'{case["decode_ms"]:>7.2f} {case["load_ms"] + case["other_ms"]:>7.2f} {case["p50_ms"]:>8.2f} '
+              f'{case["p95_ms"]:>8.2f} {case["p99_ms"]:>8.2f} {case["sentences_per_s"]:>8.1f} '
+              f'{case["output_tokens_per_s"]:>9.1f}')
+    print(f'peak RSS: {report["peak_rss_mb"]:.0f} MiB, report written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
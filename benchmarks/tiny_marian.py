@@ -0,0 +1,84 @@
+import json
+import os
+
+from benchmarks.batching import SAMPLE_FILE
+
+
+# Architecture of the randomly initialized models: small enough to build in seconds,
+# large enough that generate() dominates the timings like it does for real models
+TINY_CONFIG = {
+    'd_model': 128,
+    'encoder_layers': 2,
+    'decoder_layers': 2,
+    'encoder_attention_heads': 4,
+    'decoder_attention_heads': 4,
+    'encoder_ffn_dim': 256,
+    'decoder_ffn_dim': 256,
+    'max_position_embeddings': 512,
+    'max_length': 128,
+    'num_beams': 4,
+}
+
+
+# Train a small SentencePiece model on the local sample sentences
+def train_sentencepiece(directory, vocab_size, seed):
+    import sentencepiece
+
+    prefix = os.path.join(directory, 'spm')
+    sentencepiece.SentencePieceTrainer.train(
+        input=SAMPLE_FILE,
+        model_prefix=prefix,
+        vocab_size=vocab_size,
+        hard_vocab_limit=False,
+        character_coverage=1.0,
+        num_threads=1,
+        random_seed=seed,
+        bos_id=-1,
+        eos_id=-1,
+        unk_id=0,
+        minloglevel=2,
+    )
+    return prefix + '.model', prefix + '.vocab'
+
+
+# Build a MarianMT model with random weights and a matching tokenizer in directory,
+# fully offline, and return the directory (usable as a model name everywhere)
+def build_tiny_marian(directory, vocab_size=300, seed=0, **overrides):
+    import torch
+    from transformers import MarianConfig, MarianMTModel, MarianTokenizer
+
+    os.makedirs(directory, exist_ok=True)
+    spm_model, spm_vocab = train_sentencepiece(directory, vocab_size, seed)
+
+    # Marian vocab: eos and unk first, every SentencePiece piece, pad last
+    vocab = {'</s>': 0, '<unk>': 1}
+    with open(spm_vocab, encoding='utf-8') as handle:
+        for line in handle:
+            piece = line.split('\t')[0]
+            if piece not in vocab:
+                vocab[piece] = len(vocab)
+    vocab['<pad>'] = len(vocab)
+
+    vocab_path = os.path.join(directory, 'vocab.json')
+    with open(vocab_path, 'w', encoding='utf-8') as handle:
+        json.dump(vocab, handle, ensure_ascii=False)
+
+    tokenizer = MarianTokenizer(spm_model, spm_model, vocab_path)
+
+    settings = dict(TINY_CONFIG, **overrides)
+    config = MarianConfig(
+        vocab_size=len(vocab),
+        pad_token_id=vocab['<pad>'],
+        eos_token_id=vocab['</s>'],
+        forced_eos_token_id=vocab['</s>'],
+        decoder_start_token_id=vocab['<pad>'],
+        **settings,
+    )
+
+    torch.manual_seed(seed)
+    model = MarianMTModel(config)
+    model.eval()
+
+    model.save_pretrained(directory)
+    tokenizer.save_pretrained(directory)
+    return directory
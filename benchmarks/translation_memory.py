@@ -0,0 +1,123 @@
+import argparse
+import random
+import time
+
+from benchmarks.batching import SAMPLE_FILE, read_sentences
+from benchmarks.metrics import peak_rss_mb, percentile
+from translation_memory import TranslationMemory
+
+
+NAMES = ['Ann', 'Bob', 'Chen', 'Dana', 'Emil', 'Fatima', 'Goran', 'Hana', 'Ivan', 'Julia', 'Kofi', 'Lena']
+TEMPLATES = [
+    'Hello {name}, your order {number} has shipped and should arrive within {days} days.',
+    'Dear {name}, invoice {number} is due in {days} days.',
+    '{name} updated ticket {number} {days} minutes ago.',
+    'Your verification code is {number}, it expires in {days} minutes.',
+    'Reminder: {name} booked room {number} for {days} nights.',
+]
+
+
+# (stored source, stored target, query, expected reuse translation or None for a hint).
+# Only names and numbers may be swapped in; a different common word must go to the model
+# even when the stored target happens to contain it verbatim (cognates)
+REPAIR_CASES = [
+    ('Order 12 for Ann shipped today.', 'Pedido 12 de Ann enviado hoy.',
+     'Order 31 for Bob shipped today.', 'Pedido 31 de Bob enviado hoy.'),
+    ('Your order has been sent to the hotel.', 'Su pedido ha sido enviado al hotel.',
+     'Your order has been sent to the office.', None),
+    ('The hotel room costs 95 euros per night.', 'La habitación del hotel cuesta 95 euros por noche.',
+     'The hotel room costs 95 dollars per night.', None),
+]
+
+
+# Fails the run when a near match is reused with the wrong wording
+def check_repair():
+    for source, target, query, expected in REPAIR_CASES:
+        memory = TranslationMemory()
+        memory.add('check', source, target)
+        match = memory.lookup('check', query)
+        translation = match.translation if match is not None and match.kind == 'reuse' else None
+        if translation != expected:
+            raise SystemExit(f'repair check failed for {query!r}: got {translation!r}, expected {expected!r}')
+    print(f'repair check: {len(REPAIR_CASES)} cases ok')
+
+
+# Sentences that share no template: random runs of words from the sample file
+def random_sentence(generator, vocabulary):
+    return ' '.join(generator.choice(vocabulary) for _ in range(generator.randint(6, 20))) + '.'
+
+
+def templated_sentence(generator, template=None):
+    template = template or generator.choice(TEMPLATES)
+    return template.format(name=generator.choice(NAMES), number=generator.randint(100, 999999),
+                           days=generator.randint(2, 30))
+
+
+# Stand-in for a model translation: names and numbers are carried over verbatim
+def fake_translation(sentence):
+    return f'[es] {sentence}'
+
+
+def build_corpus(size, templated_share, seed):
+    generator = random.Random(seed)
+    vocabulary = ' '.join(read_sentences(SAMPLE_FILE)).replace('.', '').split()
+    corpus = []
+    for _ in range(size):
+        if generator.random() < templated_share:
+            corpus.append(templated_sentence(generator))
+        else:
+            corpus.append(random_sentence(generator, vocabulary))
+    return corpus, vocabulary
+
+
+def time_queries(memory, queries):
+    latencies = []
+    kinds = {'reuse': 0, 'hint': 0, None: 0}
+    for query in queries:
+        start = time.perf_counter()
+        match = memory.lookup('bench', query)
+        latencies.append(time.perf_counter() - start)
+        kinds[match.kind if match else None] += 1
+    return latencies, kinds
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build and query cost of the translation memory index')
+    parser.add_argument('--entries', type=int, default=1_000_000)
+    parser.add_argument('--queries', type=int, default=10_000)
+    parser.add_argument('--templated-share', type=float, default=0.3,
+                        help='fraction of stored sentences that come from message templates')
+    parser.add_argument('--reuse-threshold', type=float, default=0.8)
+    parser.add_argument('--hint-threshold', type=float, default=0.6)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    check_repair()
+    corpus, vocabulary = build_corpus(args.entries, args.templated_share, args.seed)
+    memory = TranslationMemory(args.reuse_threshold, args.hint_threshold, seed=args.seed)
+    rss_before = peak_rss_mb()
+
+    start = time.perf_counter()
+    for sentence in corpus:
+        memory.add('bench', sentence, fake_translation(sentence))
+    build_s = time.perf_counter() - start
+    print(f'{len(memory)} entries built in {build_s:.1f}s ({1e6 * build_s / len(corpus):.1f} us/entry), '
+          f'index RSS about {peak_rss_mb() - rss_before:.0f} MiB')
+
+    generator = random.Random(args.seed + 1)
+    workloads = {
+        'exact': [generator.choice(corpus) for _ in range(args.queries)],
+        'near-duplicate': [templated_sentence(generator) for _ in range(args.queries)],
+        'novel': [random_sentence(generator, vocabulary) for _ in range(args.queries)],
+    }
+
+    print(f'{"queries":<15} {"p50 us":>8} {"p99 us":>8} {"max us":>8} {"reuse":>7} {"hint":>7} {"miss":>7}')
+    for name, queries in workloads.items():
+        latencies, kinds = time_queries(memory, queries)
+        print(f'{name:<15} {1e6 * percentile(latencies, 0.50):>8.0f} {1e6 * percentile(latencies, 0.99):>8.0f} '
+              f'{1e6 * max(latencies):>8.0f} {kinds["reuse"] / len(queries):>7.1%} '
+              f'{kinds["hint"] / len(queries):>7.1%} {kinds[None] / len(queries):>7.1%}')
+
+
+if __name__ == '__main__':
+    main()
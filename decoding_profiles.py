@@ -0,0 +1,48 @@
+import math
+
+
+# Named decoding settings, from lowest latency to best quality.
+# generate holds generate() arguments; the output limit is derived per batch from
+# the longest source sentence: max_new_tokens = ceil(length_ratio * source tokens) + length_slack.
+# quality keeps the model's own beam size (from its generation config).
+DECODING_PROFILES = {
+    'fast': {
+        'generate': {'num_beams': 1, 'do_sample': False},
+        'length_ratio': 1.5,
+        'length_slack': 8,
+    },
+    'balanced': {
+        'generate': {'num_beams': 2, 'early_stopping': True},
+        'length_ratio': 2.0,
+        'length_slack': 10,
+    },
+    'quality': {
+        'generate': {'early_stopping': True},
+        'length_ratio': 2.5,
+        'length_slack': 16,
+    },
+}
+
+# Never generate more than this many tokens, whatever the source length
+MAX_NEW_TOKENS_CAP = 512
+
+
+def max_new_tokens_for(source_length, length_limit, cap=MAX_NEW_TOKENS_CAP):
+    ratio, slack = length_limit
+    return min(math.ceil(ratio * source_length) + slack, cap)
+
+
+# Merge a profile into explicit generate() arguments (explicit ones win).
+# Returns (generate_kwargs, length_limit); length_limit is (ratio, slack), or None
+# when there is no profile or the caller set the output length itself.
+def apply_profile(profile, generate_kwargs):
+    if profile is None:
+        return dict(generate_kwargs), None
+    if profile not in DECODING_PROFILES:
+        raise ValueError(f'unknown decoding profile {profile!r}, expected one of {", ".join(DECODING_PROFILES)}')
+
+    settings = DECODING_PROFILES[profile]
+    merged = dict(settings['generate'], **generate_kwargs)
+    if 'max_new_tokens' in generate_kwargs or 'max_length' in generate_kwargs:
+        return merged, None
+    return merged, (settings['length_ratio'], settings['length_slack'])
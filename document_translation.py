@@ -0,0 +1,482 @@
+import argparse
+import html
+import itertools
+import os
+import re
+import sys
+from collections import OrderedDict
+from html.parser import HTMLParser
+
+# Like the CLI, only the translation core is needed (no PyQt5)
+from decoding_profiles import DECODING_PROFILES
+from language_pairs import language_pairs
+from pivot_translation import pivot_pairs, translate_texts
+
+
+LETTER = re.compile(r'[^\W\d_]')
+
+
+class Segment:
+    # A translatable piece of a document. text is what the model sees; render()
+    # puts the translation back between the original prefix and suffix (whitespace,
+    # markup) and, for subtitles, re-wraps it over the original number of lines.
+    def __init__(self, text, prefix='', suffix='', lines=1):
+        self.text = text
+        self.prefix = prefix
+        self.suffix = suffix
+        self.lines = lines
+
+    def render(self, translation):
+        return self.prefix + wrap_lines(translation, self.lines) + self.suffix
+
+
+class MarkedSegment(Segment):
+    # A sentence with inline markup (links, emphasis, code spans, inline tags): the
+    # model sees the whole sentence with a numbered placeholder such as [0] for every
+    # protected span, and fill() puts the spans back. escape is applied to the
+    # translated text around the spans (HTML). fallback holds the sentence split at
+    # the spans, translated piece by piece when the placeholders do not come back.
+    def __init__(self, text, prefix, suffix, spans, fallback, escape=None):
+        super().__init__(text, prefix, suffix)
+        self.spans = spans
+        self.fallback = fallback
+        self.escape = escape
+
+    # The translation with its spans restored, or None when a placeholder is missing,
+    # repeated or unknown
+    def fill(self, translation):
+        parts = PLACEHOLDER.split(translation)
+        numbers = [int(number) for number in parts[1::2]]
+        if sorted(numbers) != list(range(len(self.spans))):
+            return None
+        escape = self.escape or (lambda text: text)
+        filled = [escape(part) if index % 2 == 0 else self.spans[int(part)] for index, part in enumerate(parts)]
+        return ''.join(filled)
+
+    def render(self, translation):
+        return self.prefix + self.fill(translation) + self.suffix
+
+
+class Group:
+    # Several pieces yielded as one (a table cell)
+    def __init__(self, pieces):
+        self.pieces = pieces
+
+
+# Split text into a Segment for the words and literal leading/trailing whitespace;
+# runs without any letter (numbers, punctuation, symbols) stay literal
+def text_pieces(text, prefix='', suffix='', lines=1):
+    stripped = text.strip()
+    if not LETTER.search(stripped):
+        return [prefix + text + suffix]
+    start = text.index(stripped)
+    leading, trailing = text[:start], text[start + len(stripped):]
+    return [Segment(stripped, prefix + leading, trailing + suffix, lines)]
+
+
+# Placeholder for a protected span inside a sentence; spaces the model puts inside the
+# brackets are tolerated
+PLACEHOLDER = re.compile(r'\[\s*(\d+)\s*\]')
+
+
+# Pieces for a run of (string, protected) items: text with protected spans in between
+# (inline markup) becomes one MarkedSegment, so the sentence is translated as a whole;
+# without spans or without letters it is handled like text_pieces(). escape encodes
+# the text (not the spans) on the way out.
+def marked_pieces(items, escape=None):
+    # Neighbouring spans share a placeholder
+    merged = []
+    for string, protected in items:
+        if protected and merged and merged[-1][1]:
+            merged[-1] = (merged[-1][0] + string, True)
+        else:
+            merged.append((string, protected))
+    items = merged
+
+    text = ''.join(string for string, protected in items if not protected)
+    spans = [string for string, protected in items if protected]
+    fallback = []
+    for string, protected in items:
+        if protected:
+            fallback.append(string)
+        else:
+            fallback.extend(escaped_piece(piece) if escape else piece for piece in text_pieces(string))
+    if not spans or not LETTER.search(text) or PLACEHOLDER.search(text):
+        # Nothing to translate around the spans, or text that already looks like a placeholder
+        return fallback
+
+    numbers = itertools.count()
+    sentence = ''.join(f'[{next(numbers)}]' if protected else string for string, protected in items)
+    stripped = sentence.strip()
+    start = sentence.index(stripped)
+    return [MarkedSegment(stripped, sentence[:start], sentence[start + len(stripped):], spans, fallback, escape)]
+
+
+# Spread text over `lines` lines of roughly equal length, breaking at spaces
+def wrap_lines(text, lines):
+    words = text.split()
+    if lines <= 1 or len(words) < 2:
+        return text
+    width = len(text) / lines
+    wrapped = []
+    current = []
+    for word in words:
+        if current and len(wrapped) < lines - 1 and len(' '.join(current + [word])) > width:
+            wrapped.append(' '.join(current))
+            current = []
+        current.append(word)
+    wrapped.append(' '.join(current))
+    return '\n'.join(wrapped)
+
+
+# SubRip subtitles: cue number and timing stay as they are, the cue text is translated.
+# A cue is one segment (re-wrapped over the same number of lines) unless it is a
+# dialogue with one "- " line per speaker, then every line is its own segment.
+SRT_TAGS = re.compile(r'^((?:\s*<[^>]+>)*)(.*?)((?:</[^>]+>\s*)*)$', re.DOTALL)
+
+
+def parse_srt(lines):
+    block = []
+    for line in lines:
+        if line.strip():
+            block.append(line.rstrip('\r\n'))
+            continue
+        if block:
+            yield from srt_cue(block)
+            block = []
+        yield line
+    if block:
+        yield from srt_cue(block)
+
+
+def srt_cue(block):
+    if len(block) < 3 or '-->' not in block[1]:
+        # Not a well-formed cue, keep it untouched
+        yield '\n'.join(block) + '\n'
+        return
+
+    yield f'{block[0]}\n{block[1]}\n'
+    text_lines = block[2:]
+    if len(text_lines) > 1 and all(line.lstrip().startswith('-') for line in text_lines):
+        for line in text_lines:
+            dash, rest = re.match(r'(\s*-\s*)(.*)', line).groups()
+            yield from text_pieces(rest, dash, '\n')
+        return
+
+    opening, text, closing = SRT_TAGS.match(' '.join(line.strip() for line in text_lines)).groups()
+    yield from text_pieces(text, opening, closing + '\n', len(text_lines))
+
+
+# Markdown: fenced and indented code, tables separators and HTML blocks are kept; headings, list
+# items and quotes keep their markers; inside a line, code spans, link targets,
+# URLs, inline HTML and emphasis markers are kept and the line is translated around them
+MARKDOWN_FENCE = re.compile(r'^\s*(```|~~~)')
+MARKDOWN_BLOCK_PREFIX = re.compile(r'^(\s*(?:#{1,6}\s+|>\s?|[-*+]\s+|\d+[.)]\s+|\[[ xX]\]\s+)*)')
+MARKDOWN_INDENTED_CODE = re.compile(r'^(?: {4}|\t)')
+MARKDOWN_LIST_ITEM = re.compile(r'^\s*(?:[-*+]|\d+[.)])\s+')
+MARKDOWN_TABLE_RULE = re.compile(r'^\s*\|?\s*:?-{3,}:?\s*(\|\s*:?-{3,}:?\s*)*\|?\s*$')
+MARKDOWN_PROTECTED = re.compile(
+    r'`[^`]*`'                   # code span
+    r'|\]\([^)]*\)'              # link target
+    r'|!?\['                     # link / image text start
+    r'|<[^>\s][^>]*>'            # inline HTML or autolink
+    r'|https?://\S+'             # bare URL
+    r'|\*\*|__|~~|(?<!\w)[*_]|[*_](?!\w)'  # emphasis markers
+)
+
+
+def parse_markdown(lines):
+    in_fence = False
+    # An indented code block starts after a blank line (it cannot interrupt a
+    # paragraph) and runs while lines stay indented or blank; inside a list the
+    # indentation belongs to the list item instead
+    in_indented_code = False
+    previous_blank = True
+    in_list = False
+    for line in lines:
+        body = line.rstrip('\r\n')
+        ending = line[len(body):]
+        blank = not body.strip()
+        indented = bool(MARKDOWN_INDENTED_CODE.match(body))
+
+        if not in_fence:
+            if in_indented_code and (blank or indented):
+                yield line
+                continue
+            in_indented_code = indented and not blank and previous_blank and not in_list
+            if not blank:
+                in_list = bool(MARKDOWN_LIST_ITEM.match(body)) or (in_list and indented)
+            previous_blank = blank
+            if in_indented_code:
+                yield line
+                continue
+
+        if MARKDOWN_FENCE.match(body):
+            in_fence = not in_fence
+            yield line
+            continue
+        if in_fence or not body.strip() or body.lstrip().startswith('<') or MARKDOWN_TABLE_RULE.match(body):
+            yield line
+            continue
+
+        prefix = MARKDOWN_BLOCK_PREFIX.match(body).group(1)
+        yield prefix
+        rest = body[len(prefix):]
+        if rest.strip().startswith('|'):
+            # Table row: every cell on its own
+            for cell in re.split(r'(\|)', rest):
+                yield cell if cell == '|' else from_inline_markdown(cell)
+        else:
+            yield from inline_markdown(rest)
+        yield ending
+
+
+def inline_markdown(text):
+    items = []
+    position = 0
+    for match in MARKDOWN_PROTECTED.finditer(text):
+        if match.start() > position:
+            items.append((text[position:match.start()], False))
+        items.append((match.group(0), True))
+        position = match.end()
+    if position < len(text):
+        items.append((text[position:], False))
+    return marked_pieces(items)
+
+
+def from_inline_markdown(text):
+    return Group(inline_markdown(text))
+
+
+# HTML: tags, comments and the contents of script/style/code/pre/textarea are kept.
+# Text runs up to the next block-level tag are segments; inline tags (links,
+# emphasis, code, ...) inside a run stay in the sentence as protected spans.
+class HTMLSegmenter(HTMLParser):
+    VERBATIM = {'script', 'style', 'code', 'pre', 'textarea'}
+    INLINE = {'a', 'abbr', 'b', 'bdi', 'bdo', 'br', 'cite', 'code', 'data', 'dfn', 'em', 'i', 'kbd', 'mark',
+              'q', 's', 'samp', 'small', 'span', 'strong', 'sub', 'sup', 'time', 'u', 'var', 'wbr'}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.pieces = []
+        self._text = []  # (string, protected) items of the current text run
+        self._verbatim_depth = 0
+
+    def flush_text(self):
+        if not self._text:
+            return
+        items, self._text = self._text, []
+        self.pieces.extend(marked_pieces(items, escape=escape_text))
+
+    # Inline tags join the current text run, any other tag ends it
+    def add_tag(self, tag, markup):
+        if tag in self.INLINE:
+            self._text.append((markup, True))
+        else:
+            self.flush_text()
+            self.pieces.append(markup)
+
+    def handle_starttag(self, tag, attrs):
+        self.add_tag(tag, self.get_starttag_text())
+        if tag in self.VERBATIM:
+            self._verbatim_depth += 1
+
+    def handle_startendtag(self, tag, attrs):
+        self.add_tag(tag, self.get_starttag_text())
+
+    def handle_endtag(self, tag):
+        if tag in self.VERBATIM and self._verbatim_depth:
+            self._verbatim_depth -= 1
+        self.add_tag(tag, f'</{tag}>')
+
+    def handle_data(self, data):
+        # script/style are raw text: the parser hands them over undecoded, keep them as they are
+        if self.cdata_elem is not None:
+            self._text.append((data, True))
+        elif self._verbatim_depth:
+            # pre/code/textarea text was entity-decoded by the parser, encode it again
+            self._text.append((escape_text(data), True))
+        else:
+            self._text.append((data, False))
+
+    def handle_comment(self, data):
+        self.flush_text()
+        self.pieces.append(f'<!--{data}-->')
+
+    def handle_decl(self, decl):
+        self.flush_text()
+        self.pieces.append(f'<!{decl}>')
+
+    def handle_pi(self, data):
+        self.flush_text()
+        self.pieces.append(f'<?{data}>')
+
+    def take(self):
+        pieces, self.pieces = self.pieces, []
+        return pieces
+
+
+# Escape text on the way out (the parser decodes entities on the way in)
+def escape_text(text):
+    return html.escape(text, quote=False)
+
+
+def escaped_piece(piece):
+    if isinstance(piece, Segment):
+        return EscapedSegment(piece.text, piece.prefix, piece.suffix, piece.lines)
+    return escape_text(piece)
+
+
+class EscapedSegment(Segment):
+    def render(self, translation):
+        return html.escape(self.prefix + translation + self.suffix, quote=False)
+
+
+def parse_html(lines):
+    parser = HTMLSegmenter()
+    for line in lines:
+        parser.feed(line)
+        # Text still being read stays buffered until the next tag
+        yield from parser.take()
+    parser.close()
+    parser.flush_text()
+    yield from parser.take()
+
+
+PARSERS = {
+    'srt': parse_srt,
+    'markdown': parse_markdown,
+    'html': parse_html,
+}
+EXTENSIONS = {'.srt': 'srt', '.md': 'markdown', '.markdown': 'markdown', '.html': 'html', '.htm': 'html'}
+
+
+class DocumentTranslator:
+    # Streams a document through a format parser and translates only its segments.
+    # Segments are deduplicated: a text that repeats (subtitle lines, boilerplate) goes
+    # to the model once while it is among the max_translations most recently used, and
+    # new texts are sent in batches of batch_segments. Output is produced batch by
+    # batch and the remembered translations are an LRU, so memory stays bounded
+    # whatever the length of the document.
+    # translate_fn(texts, model_name, **options) is translate_texts or anything like it.
+    def __init__(self, model_name, fmt, translate_fn=translate_texts, batch_segments=256, max_translations=20000,
+                 **options):
+        self.model_name = model_name
+        self.parse = PARSERS[fmt]
+        self.translate_fn = translate_fn
+        self.batch_segments = batch_segments
+        self.max_translations = max_translations
+        self.options = options
+
+        self.translations = OrderedDict()  # text -> translation, least recently used first
+        self.segments = 0
+        self.translated = 0
+
+    def translate(self, lines):
+        pending = []
+        unique = {}
+        for piece in self.parse(lines):
+            pending.append(piece)
+            for segment in segments_of(piece):
+                self.segments += 1
+                if segment.text not in self.translations:
+                    unique[segment.text] = None
+            if len(unique) >= self.batch_segments:
+                yield self.render(pending, unique)
+                pending, unique = [], {}
+        yield self.render(pending, unique)
+
+    def render(self, pieces, unique):
+        # Also anything of the batch dropped from the LRU since it was parsed
+        for piece in pieces:
+            for segment in segments_of(piece):
+                if segment.text in self.translations:
+                    self.translations.move_to_end(segment.text)
+                else:
+                    unique[segment.text] = None
+        self.translate_texts(unique)
+
+        # Sentences whose placeholders did not come back are translated piece by piece
+        retry = {}
+        for piece in pieces:
+            for segment in segments_of(piece):
+                if isinstance(segment, MarkedSegment) and segment.fill(self.translations[segment.text]) is None:
+                    for inner in segments_of(Group(segment.fallback)):
+                        if inner.text not in self.translations:
+                            retry[inner.text] = None
+        self.translate_texts(retry)
+        output = ''.join(self.render_piece(piece) for piece in pieces)
+        while len(self.translations) > self.max_translations:
+            self.translations.popitem(last=False)
+        return output
+
+    def translate_texts(self, unique):
+        if unique:
+            texts = list(unique)
+            self.translations.update(zip(texts, self.translate_fn(texts, self.model_name, **self.options)))
+            self.translated += len(texts)
+
+    def render_piece(self, piece):
+        if isinstance(piece, MarkedSegment) and piece.fill(self.translations[piece.text]) is None:
+            return ''.join(self.render_piece(inner) for inner in piece.fallback)
+        if isinstance(piece, Segment):
+            return piece.render(self.translations[piece.text])
+        if isinstance(piece, Group):
+            return ''.join(self.render_piece(inner) for inner in piece.pieces)
+        return piece
+
+    def stats(self):
+        return {'segments': self.segments, 'remembered': len(self.translations), 'translated': self.translated}
+
+
+def segments_of(piece):
+    if isinstance(piece, Segment):
+        return [piece]
+    if isinstance(piece, Group):
+        return [inner for inner in piece.pieces if isinstance(inner, Segment)]
+    return []
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Translate SRT subtitles, Markdown or HTML keeping their structure')
+    routes = dict(language_pairs, **pivot_pairs())
+    parser.add_argument('--pair', required=True, choices=list(routes), metavar='PAIR',
+                        help="language pair, e.g. 'English to Spanish' or, through English, 'Spanish to German'")
+    parser.add_argument('--input', default='-', help='input file (default: stdin)')
+    parser.add_argument('--output', default='-', help='output file (default: stdout)')
+    parser.add_argument('--format', default=None, choices=list(PARSERS),
+                        help='document format (default: from the input file extension)')
+    parser.add_argument('--batch-segments', type=int, default=256, help='unique segments translated at a time')
+    parser.add_argument('--decoding', default=None, choices=list(DECODING_PROFILES), help='decoding profile')
+    parser.add_argument('--device', default=None)
+    parser.add_argument('--cache', default=None, metavar='PATH', help='SQLite translation result cache to use')
+    args = parser.parse_args()
+
+    fmt = args.format or EXTENSIONS.get(os.path.splitext(args.input)[1].lower())
+    if fmt is None:
+        parser.error('cannot tell the format from the file name, use --format')
+
+    options = {'device': args.device, 'decoding': args.decoding}
+    if args.cache:
+        from result_cache import TranslationResultCache
+        options['result_cache'] = TranslationResultCache(args.cache)
+
+    translator = DocumentTranslator(routes[args.pair], fmt, batch_segments=args.batch_segments, **options)
+    source = sys.stdin if args.input == '-' else open(args.input, encoding='utf-8-sig')
+    target = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8', newline='')
+    try:
+        for text in translator.translate(source):
+            target.write(text)
+            target.flush()
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if target is not sys.stdout:
+            target.close()
+
+    stats = translator.stats()
+    print(f'{stats["segments"]} segments, {stats["translated"]} sent to the model', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,202 @@
+import contextlib
+import cProfile
+import json
+import logging
+import logging.handlers
+import os
+import threading
+import time
+from collections import deque
+
+
+DEFAULT_METRICS_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'translator', 'metrics.jsonl')
+DEFAULT_PROFILE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'translator', 'profiles')
+
+# Order in which stages are shown in summaries
+STAGE_ORDER = ['queue', 'cache', 'memory', 'load', 'tokenize', 'generate', 'decode', 'paint', 'tts', 'animate']
+
+
+class RequestTrace:
+    # Wall-clock time spent in each stage of one translation request.
+    # Stages that run several times (one generate() per batch) are accumulated.
+    def __init__(self, request_id=None, **fields):
+        self.request_id = request_id
+        self.fields = fields
+        self.started = time.time()
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds):
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def as_dict(self):
+        with self._lock:
+            stages = dict(self.stages)
+        return dict(
+            self.fields,
+            request_id=self.request_id,
+            started=self.started,
+            stages=stages,
+            total_s=sum(stages.values()),
+        )
+
+    # One-line summary for the status bar, e.g. "#3  load 0.00s | generate 0.41s | ..."
+    def summary(self):
+        with self._lock:
+            stages = dict(self.stages)
+        names = [name for name in STAGE_ORDER if name in stages] + sorted(set(stages) - set(STAGE_ORDER))
+        parts = ' | '.join(f'{name} {stages[name]:.2f}s' for name in names)
+        return f'#{self.request_id}  {parts}'
+
+
+# Time a stage when a trace is given, do nothing otherwise
+def stage(trace, name):
+    if trace is None:
+        return contextlib.nullcontext()
+    return trace.stage(name)
+
+
+class FrameTimer:
+    # Frame times of the GUI thread. A probe timer calls tick() once per frame
+    # interval; when the thread is busy (scaling, painting, layout) ticks come late,
+    # so the gaps between ticks are the frame times the user sees as stutter.
+    # Durations of named pieces of GUI-thread work are kept next to them.
+    def __init__(self, interval_s=1 / 60, keep=1000):
+        self.interval_s = interval_s
+        self.keep = keep
+        self.frames = deque(maxlen=keep)
+        self.work = {}
+        self._last_tick = None
+
+    def tick(self):
+        now = time.perf_counter()
+        if self._last_tick is not None:
+            self.frames.append(now - self._last_tick)
+        self._last_tick = now
+
+    def reset(self):
+        self.frames.clear()
+        self.work.clear()
+        self._last_tick = None
+
+    @contextlib.contextmanager
+    def measure(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.work.setdefault(name, deque(maxlen=self.keep)).append(time.perf_counter() - start)
+
+    # Frame time percentiles, frames longer than two intervals (dropped frames) and
+    # the median and worst duration of each kind of work, in milliseconds
+    def summary(self):
+        result = {'frames': len(self.frames)}
+        if self.frames:
+            frames = sorted(self.frames)
+            for name, fraction in [('p50', 0.50), ('p95', 0.95), ('p99', 0.99)]:
+                result[f'{name}_ms'] = 1000 * frames[min(int(fraction * len(frames)), len(frames) - 1)]
+            result['max_ms'] = 1000 * frames[-1]
+            result['dropped'] = sum(frame > 2 * self.interval_s for frame in frames)
+        result['work'] = {}
+        for name, values in self.work.items():
+            values = sorted(values)
+            result['work'][name] = {
+                'count': len(values), 'p50_ms': 1000 * values[len(values) // 2], 'max_ms': 1000 * values[-1],
+            }
+        return result
+
+    # One-line summary for the status bar
+    def summary_line(self):
+        summary = self.summary()
+        if not summary['frames']:
+            return 'no frames measured'
+        parts = [f'{summary["frames"]} frames, p50 {summary["p50_ms"]:.1f}ms, p99 {summary["p99_ms"]:.1f}ms, '
+                 f'max {summary["max_ms"]:.1f}ms, {summary["dropped"]} dropped']
+        parts += [f'{name} p50 {work["p50_ms"]:.1f}ms' for name, work in summary['work'].items()]
+        return ' | '.join(parts)
+
+
+class MetricsLog:
+    # Writes finished traces as JSON lines to a size-rotated log file and keeps
+    # the most recent ones in memory for live summaries
+    def __init__(self, path=DEFAULT_METRICS_PATH, max_bytes=5 * 1024 * 1024, backup_count=3, keep=1000):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+
+        self._logger = logging.getLogger(f'translator.metrics.{path}')
+        self._logger.setLevel(logging.INFO)
+        self._logger.propagate = False
+        if not self._logger.handlers:
+            handler = logging.handlers.RotatingFileHandler(
+                path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8'
+            )
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            self._logger.addHandler(handler)
+
+        self._recent = deque(maxlen=keep)
+        self._lock = threading.Lock()
+
+    def log(self, trace):
+        entry = trace.as_dict()
+        with self._lock:
+            self._recent.append(entry)
+        self._logger.info(json.dumps(entry, default=str))
+
+    # Median and worst time per stage over the recent traces
+    def summary(self):
+        with self._lock:
+            entries = list(self._recent)
+
+        samples = {}
+        for entry in entries:
+            for name, seconds in entry['stages'].items():
+                samples.setdefault(name, []).append(seconds)
+
+        result = {}
+        for name, values in samples.items():
+            values.sort()
+            result[name] = {'count': len(values), 'p50_s': values[len(values) // 2], 'max_s': values[-1]}
+        return result
+
+
+class ProfileCapture:
+    # Profile everything inside the with-block with cProfile (and optionally the
+    # torch profiler) and write the result next to path
+    def __init__(self, path, torch_profiler=False):
+        self.path = path
+        self.torch_profiler = torch_profiler
+        self._profile = None
+        self._torch_profile = None
+
+    def __enter__(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        if self.torch_profiler:
+            import torch
+
+            self._torch_profile = torch.profiler.profile(record_shapes=True)
+            self._torch_profile.__enter__()
+        self._profile = cProfile.Profile()
+        self._profile.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._profile.disable()
+        self._profile.dump_stats(self.path)
+        if self._torch_profile is not None:
+            self._torch_profile.__exit__(*exc_info)
+            self._torch_profile.export_chrome_trace(os.path.splitext(self.path)[0] + '.trace.json')
+        return False
+
+
+# Default profile file for one request, e.g. ~/.cache/translator/profiles/gui-20260101-120000.prof
+def profile_path(label, directory=DEFAULT_PROFILE_DIR):
+    return os.path.join(directory, f'{label}-{time.strftime("%Y%m%d-%H%M%S")}.prof')
@@ -0,0 +1,278 @@
+import math
+import re
+import unicodedata
+from collections import Counter
+
+
+# Languages written in their own script are recognised from the script alone
+SCRIPT_LANGUAGES = [
+    ('HIRAGANA', 'Japanese'),
+    ('KATAKANA', 'Japanese'),
+    ('CJK', 'Chinese'),
+    ('ARABIC', 'Arabic'),
+    ('CYRILLIC', 'Russian'),
+    ('DEVANAGARI', 'Hindi'),
+    ('BENGALI', 'Bengali'),
+    ('HEBREW', 'Hebrew'),
+    ('GREEK', 'Greek'),
+]
+
+# Latin-script languages are told apart by character trigrams learned from these samples
+SEED_TEXTS = {
+    'English': (
+        "hello thanks bye "
+        "the of and to in is that it was for on are with as his they be at one have this from or had by not "
+        "but what all were we when your can said there use an each which she do how their if will up other "
+        "about out many then them these so some her would make like him into time has look two more write go "
+        "see number no way could people my than first been call who its now find long down day did get come "
+        "made may part "
+        "The weather is nice today and we are going to the park with the children. "
+        "I would like to know what time the train leaves for the city tomorrow morning. "
+        "Thank you very much for your help, this has been a great experience for all of us. "
+        "Please let me know if you have any questions about the order or the delivery. "
+        "She said that they should have finished the work before the end of the week. "
+        "Where is the nearest station? How much does it cost? Which one is yours? "
+        "We think that everyone should be able to read and write in their own language. "
+        "The government announced new rules for schools and hospitals in the country."
+    ),
+    'Spanish': (
+        "hola gracias adiós buenos días "
+        "de la que el en y a los se del las un por con no una su para es al lo como más pero sus le ya o este "
+        "sí porque esta entre cuando muy sin sobre también me hasta hay donde quien desde todo nos durante "
+        "todos uno les ni contra otros ese eso ante ellos esto antes algunos qué unos yo otro otras otra él "
+        "tanto esa estos mucho quienes nada muchos cual poco ella estar estas algunas algo nosotros hace "
+        "tiene puede ser era fue están hemos han "
+        "El tiempo está muy bien hoy y vamos al parque con los niños. "
+        "Me gustaría saber a qué hora sale el tren para la ciudad mañana por la mañana. "
+        "Muchas gracias por tu ayuda, ha sido una gran experiencia para todos nosotros. "
+        "Por favor, avísame si tienes alguna pregunta sobre el pedido o la entrega. "
+        "Ella dijo que deberían haber terminado el trabajo antes del final de la semana. "
+        "¿Dónde está la estación más cercana? ¿Cuánto cuesta? ¿Cuál es el tuyo? "
+        "Creemos que todo el mundo debería poder leer y escribir en su propio idioma. "
+        "El gobierno anunció nuevas normas para las escuelas y los hospitales del país."
+    ),
+    'French': (
+        "bonjour merci au revoir salut "
+        "de la le et les des en un du une que est pour qui dans par plus pas au sur ne se ce il sont avec ou "
+        "son aux elle nous vous mais on ses été cette ont comme leur tout fait peut même aussi bien entre "
+        "sans deux sous où après ces était très avoir être chez dont ils elles je tu moi toi lui encore "
+        "jamais toujours rien "
+        "Il fait très beau aujourd'hui et nous allons au parc avec les enfants. "
+        "Je voudrais savoir à quelle heure part le train pour la ville demain matin. "
+        "Merci beaucoup pour votre aide, ce fut une belle expérience pour nous tous. "
+        "N'hésitez pas à me dire si vous avez des questions sur la commande ou la livraison. "
+        "Elle a dit qu'ils auraient dû terminer le travail avant la fin de la semaine. "
+        "Où est la gare la plus proche ? Combien ça coûte ? Lequel est le vôtre ? "
+        "Nous pensons que chacun devrait pouvoir lire et écrire dans sa propre langue. "
+        "Le gouvernement a annoncé de nouvelles règles pour les écoles et les hôpitaux du pays."
+    ),
+    'German': (
+        "hallo danke tschüss guten tag "
+        "der die und in den von zu das mit sich des auf für ist im dem nicht ein eine als auch es an werden "
+        "aus er hat dass sie nach wird bei einer um am sind noch wie einem über einen so zum war haben nur "
+        "oder aber vor zur bis mehr durch man sein wurde sei ich du wir ihr mich mir uns euch kein keine "
+        "schon "
+        "Das Wetter ist heute sehr schön und wir gehen mit den Kindern in den Park. "
+        "Ich möchte wissen, wann der Zug morgen früh in die Stadt fährt. "
+        "Vielen Dank für Ihre Hilfe, das war für uns alle eine großartige Erfahrung. "
+        "Bitte sagen Sie mir Bescheid, wenn Sie Fragen zur Bestellung oder zur Lieferung haben. "
+        "Sie sagte, dass sie die Arbeit vor dem Ende der Woche hätten beenden sollen. "
+        "Wo ist der nächste Bahnhof? Wie viel kostet das? Welcher gehört dir? "
+        "Wir denken, dass jeder in seiner eigenen Sprache lesen und schreiben können sollte. "
+        "Die Regierung hat neue Regeln für Schulen und Krankenhäuser im ganzen Land angekündigt."
+    ),
+    'Italian': (
+        "ciao grazie buongiorno arrivederci "
+        "di che il la e a per un in è non una sono del le si da con ma come anche ci lo questo ha io gli "
+        "della ho mi al più nel alla se cosa ti ne mio quando suo tutto molto chi dei bene fatto sei qui era "
+        "solo ancora perché stato tutti dove quello niente essere fare voglio lui lei noi voi loro "
+        "Oggi il tempo è molto bello e andiamo al parco con i bambini. "
+        "Vorrei sapere a che ora parte il treno per la città domani mattina. "
+        "Grazie mille per il tuo aiuto, è stata una bella esperienza per tutti noi. "
+        "Per favore fammi sapere se hai domande sull'ordine o sulla consegna. "
+        "Lei ha detto che avrebbero dovuto finire il lavoro prima della fine della settimana. "
+        "Dov'è la stazione più vicina? Quanto costa? Qual è il tuo? "
+        "Pensiamo che tutti dovrebbero poter leggere e scrivere nella propria lingua. "
+        "Il governo ha annunciato nuove regole per le scuole e gli ospedali del paese."
+    ),
+    'Portuguese': (
+        "olá obrigado obrigada bom dia tchau "
+        "de que o a e do da em um para é com não uma os no se na por mais as dos como mas foi ao ele das tem "
+        "à seu sua ou ser quando muito há nos já está eu também só pelo pela até isso ela entre era depois "
+        "sem mesmo aos ter seus quem nas me esse eles estão você tinha foram essa num nem suas meu às minha "
+        "têm numa pelos elas havia seja qual será nós tenho lhe deles essas esses pelas este fosse dele tu te "
+        "vocês vos lhes meus minhas teu tua "
+        "O tempo está muito bom hoje e nós vamos ao parque com as crianças. "
+        "Gostaria de saber a que horas sai o comboio para a cidade amanhã de manhã. "
+        "Muito obrigado pela sua ajuda, foi uma ótima experiência para todos nós. "
+        "Por favor, avise-me se tiver alguma dúvida sobre o pedido ou a entrega. "
+        "Ela disse que eles deveriam ter terminado o trabalho antes do fim da semana. "
+        "Onde fica a estação mais próxima? Quanto custa? Qual é o seu? "
+        "Nós achamos que todos deveriam poder ler e escrever na sua própria língua. "
+        "O governo anunciou novas regras para as escolas e os hospitais do país, não é?"
+    ),
+    'Turkish': (
+        "merhaba teşekkürler günaydın hoşça kal "
+        "bir ve bu da de için ile çok ne daha gibi ama o ben sen biz siz onlar var yok olarak kadar sonra her "
+        "şey mi mı mu mü değil olan olduğu ise diye en ya veya ki şimdi hiç böyle şu neden nasıl nerede kim "
+        "hangi bana sana ona bizim sizin onların evet hayır "
+        "Bugün hava çok güzel ve çocuklarla birlikte parka gidiyoruz. "
+        "Yarın sabah şehre giden trenin saat kaçta kalktığını öğrenmek istiyorum. "
+        "Yardımınız için çok teşekkür ederim, bu hepimiz için harika bir deneyim oldu. "
+        "Sipariş veya teslimat hakkında bir sorunuz olursa lütfen bana bildirin. "
+        "İşi hafta sonundan önce bitirmeleri gerektiğini söyledi. "
+        "En yakın istasyon nerede? Bu ne kadar? Hangisi seninki? "
+        "Herkesin kendi dilinde okuyup yazabilmesi gerektiğini düşünüyoruz. "
+        "Hükümet ülkedeki okullar ve hastaneler için yeni kurallar açıkladı."
+    ),
+}
+
+NON_LETTERS = re.compile(r"[^\w']+|[\d_]+")
+
+
+# Lowercased words padded with spaces, e.g. "Hi there" -> " hi  there "
+def normalized_words(text):
+    return ' ' + '  '.join(NON_LETTERS.sub(' ', text.lower()).split()) + ' '
+
+
+def trigrams(text):
+    padded = normalized_words(text)
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+# Name of the first non-Latin script found in text, per SCRIPT_LANGUAGES
+def script_language(text):
+    japanese = chinese = None
+    for character in text:
+        if character.isascii() or not character.isalpha():
+            continue
+        name = unicodedata.name(character, '')
+        for prefix, language in SCRIPT_LANGUAGES:
+            if name.startswith(prefix):
+                if language == 'Japanese':
+                    japanese = language
+                elif language == 'Chinese':
+                    chinese = language
+                else:
+                    return language
+                break
+    # Kanji are CJK ideographs too, kana make it Japanese
+    return japanese or chinese
+
+
+class LanguageIdentifier:
+    # Character trigram language identifier. Non-Latin scripts are decided by
+    # script; Latin text is scored with add-one smoothed trigram log-probabilities.
+    # Only the gain over each language's unseen-trigram floor is stored, and only for
+    # the languages that have seen the trigram, so scoring is one dict lookup plus one
+    # or two additions per trigram (a few microseconds for a sentence).
+    # Texts shorter than min_letters, or whose best average gain per trigram is below
+    # min_gain (nothing looks like any known language), are reported as None.
+    def __init__(self, seed_texts=SEED_TEXTS, min_gain=0.5, min_letters=3):
+        self.min_gain = min_gain
+        self.min_letters = min_letters
+        self.languages = list(seed_texts)
+        self._counts = {language: Counter(trigrams(text)) for language, text in seed_texts.items()}
+        self._build()
+
+    # Add more text for a language (a corpus file, say) and rebuild the table
+    def train(self, language, text):
+        if language not in self._counts:
+            self.languages.append(language)
+            self._counts[language] = Counter()
+        self._counts[language].update(trigrams(text))
+        self._build()
+
+    def _build(self):
+        vocabulary = set()
+        for counts in self._counts.values():
+            vocabulary.update(counts)
+
+        self._floor = []
+        table = {}
+        for number, language in enumerate(self.languages):
+            counts = self._counts[language]
+            total = sum(counts.values()) + len(vocabulary) + 1
+            self._floor.append(math.log(1 / total))
+            for gram, count in counts.items():
+                table.setdefault(gram, []).append((number, math.log(count + 1)))
+        self._table = {gram: tuple(gains) for gram, gains in table.items()}
+
+    # Per-language average log-probability gain per trigram over the unseen floor
+    def gains(self, text):
+        grams = trigrams(text)
+        totals = [0.0] * len(self.languages)
+        table = self._table
+        for gram in grams:
+            for number, gain in table.get(gram, ()):
+                totals[number] += gain
+        return {language: total / max(len(grams), 1) for language, total in zip(self.languages, totals)}
+
+    def identify(self, text):
+        language = script_language(text)
+        if language is not None:
+            return language
+
+        if sum(character.isalpha() for character in text) < self.min_letters:
+            return None
+        gains = self.gains(text)
+        # Average log-probability is floor + gain
+        scores = {language: floor + gains[language] for language, floor in zip(self.languages, self._floor)}
+        language = max(scores, key=scores.get)
+        return language if gains[language] >= self.min_gain else None
+
+
+identifier = LanguageIdentifier()
+
+
+def identify(text):
+    return identifier.identify(text)
+
+
+# Language pair that translates `language` into target, or None when there is none
+def route_pair(language, target='English', pairs=None):
+    from language_pairs import language_pairs
+
+    pairs = pairs or language_pairs
+    pair = f'{language} to {target}'
+    return pair if pair in pairs else None
+
+
+# Group texts by the model that should translate them. Returns
+# ({model_name: [indices]}, unchanged, unknown): unchanged are texts already in the
+# target language, unknown those with no recognised language or no matching pair.
+def route(texts, target='English', pairs=None, identify_fn=identify):
+    from language_pairs import language_pairs
+
+    pairs = pairs or language_pairs
+    groups = {}
+    unchanged = []
+    unknown = []
+    for index, text in enumerate(texts):
+        language = identify_fn(text)
+        if language == target:
+            unchanged.append(index)
+            continue
+        pair = route_pair(language, target, pairs) if language else None
+        if pair is None:
+            unknown.append(index)
+        else:
+            groups.setdefault(pairs[pair], []).append(index)
+    return groups, unchanged, unknown
+
+
+# Translate a mixed-language list into target with one full batch per model, so
+# every model is loaded once. Texts already in the target language, and texts that
+# cannot be routed, are returned as they are.
+def translate_mixed(texts, target='English', translate_fn=None, **options):
+    if translate_fn is None:
+        from translation_engine import translate_texts as translate_fn
+
+    texts = list(texts)
+    results = list(texts)
+    groups, _, _ = route(texts, target)
+    for model_name, indices in groups.items():
+        translations = translate_fn([texts[index] for index in indices], model_name, **options)
+        for index, translation in zip(indices, translations):
+            results[index] = translation
+    return results
@@ -0,0 +1,40 @@
+# Language pair name (as shown in the GUI) -> Hugging Face MarianMT model name
+language_pairs = {
+    'English to Spanish': 'Helsinki-NLP/opus-mt-en-es',
+    'Spanish to English': 'Helsinki-NLP/opus-mt-es-en',
+    'English to French': 'Helsinki-NLP/opus-mt-en-fr',
+    'French to English': 'Helsinki-NLP/opus-mt-fr-en',
+    'English to German': 'Helsinki-NLP/opus-mt-en-de',
+    'German to English': 'Helsinki-NLP/opus-mt-de-en',
+    'English to Chinese': 'Helsinki-NLP/opus-mt-en-zh',
+    'Chinese to English': 'Helsinki-NLP/opus-mt-zh-en',
+    'English to Arabic': 'Helsinki-NLP/opus-mt-en-ar',
+    'Arabic to English': 'Helsinki-NLP/opus-mt-ar-en',
+    'English to Italian': 'Helsinki-NLP/opus-mt-en-it',
+    'Italian to English': 'Helsinki-NLP/opus-mt-it-en',
+    'English to Portuguese': 'Helsinki-NLP/opus-mt-tc-big-en-pt',
+    'Portuguese to English': 'Helsinki-NLP/opus-mt-tc-big-en-pt',
+    'English to Russian': 'Helsinki-NLP/opus-mt-en-ru',
+    'Russian to English': 'Helsinki-NLP/opus-mt-ru-en',
+    'English to Japanese': 'Helsinki-NLP/opus-mt-en-jap',
+    'Japanese to English': 'Helsinki-NLP/opus-mt-jap-en',
+    'English to Hindi': 'Helsinki-NLP/opus-mt-en-hi',
+    'Hindi to English': 'Helsinki-NLP/opus-mt-hi-en',
+    'English to Turkish': 'Helsinki-NLP/opus-mt-en-trk',
+    'Turkish to English': 'Helsinki-NLP/opus-mt-tr-en',
+    'Bengali to English': 'Helsinki-NLP/opus-mt-bn-en',
+    'English to Vietnamese': 'Helsinki-NLP/opus-mt-en-vi',
+    'English to Indonesian': 'Helsinki-NLP/opus-mt-en-id',
+    'English to Czech': 'Helsinki-NLP/opus-mt-en-cs',
+    'English to Romanian': 'Helsinki-NLP/opus-mt-en-ro',
+    'English to Swedish': 'Helsinki-NLP/opus-mt-en-sv',
+    'English to Catalan': 'Helsinki-NLP/opus-mt-en-ca',
+    'English to Finnish': 'Helsinki-NLP/opus-mt-en-fi',
+    'English to Danish': 'Helsinki-NLP/opus-mt-en-da',
+    'English to Ukrainian': 'Helsinki-NLP/opus-mt-en-uk',
+    'English to Hungarian': 'Helsinki-NLP/opus-mt-en-hu',
+    'English to Greek': 'Helsinki-NLP/opus-mt-en-el',
+    'English to Urdu': 'Helsinki-NLP/opus-mt-en-ur',
+    'English to Hebrew': 'Helsinki-NLP/opus-mt-en-he',
+    'English to Bulgarian': 'Helsinki-NLP/opus-mt-en-he'
+}
@@ -0,0 +1,530 @@
+import contextlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import model_store
+
+
+# Share of accelerator memory the residency manager fills with models by default
+DEVICE_MEMORY_FRACTION = 0.6
+
+# Per-model use counts kept between sessions, used to pre-warm the hot models
+DEFAULT_USAGE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'translator', 'model_usage.json')
+
+# Set to a size in MiB to treat the CPU as an accelerator of that size (see ResidencyManager)
+SIMULATED_DEVICE_ENV = 'TRANSLATOR_SIMULATED_DEVICE_MB'
+
+
+# Pick the GPU when one is available, otherwise fall back to the CPU
+def default_device():
+    import torch
+
+    return torch.device("cuda" if torch.cuda.is_available() else "cpu")
+
+
+# Default loader: memory-map the model from the local model store when it has been
+# prefetched there (see model_store.py), otherwise deserialize the tokenizer and
+# model from the Hugging Face hub (or the local HF cache); then move the model onto
+# the requested device
+def load_marian(model_name, device, use_store=True):
+    directory = model_store.find(model_name) if use_store else None
+    if directory is not None:
+        return model_store.load(directory, device)
+
+    from transformers import MarianMTModel, MarianTokenizer
+
+    tokenizer = MarianTokenizer.from_pretrained(model_name)
+    model = MarianMTModel.from_pretrained(model_name).to(device)
+    model.eval()
+    return tokenizer, model
+
+
+# Replace the Linear layers of a CPU model with dynamically quantized int8 versions.
+# Weights are stored as int8, activations are quantized on the fly for every matmul.
+def quantize_int8(model):
+    import torch
+
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+# Move a model between devices in place, handing freed accelerator memory back
+def move_model(model, device):
+    import torch
+
+    model.to(device)
+    if torch.device(device).type == 'cpu' and torch.cuda.is_available():
+        torch.cuda.empty_cache()
+    return model
+
+
+# Total memory of an accelerator in bytes, None when unknown (CPU, MPS)
+def device_memory(device):
+    import torch
+
+    device = torch.device(device)
+    if device.type == 'cuda':
+        return torch.cuda.get_device_properties(device).total_memory
+    return None
+
+
+# Approximate memory footprint of a loaded model (parameters + buffers)
+def model_nbytes(model):
+    total = 0
+    for tensor in list(model.parameters()) + list(model.buffers()):
+        total += tensor.nelement() * tensor.element_size()
+
+    # Quantized Linear weights live in packed params, not in parameters()
+    for module in model.modules():
+        packed = getattr(module, '_packed_params', None)
+        if packed is not None and hasattr(packed, '_weight_bias'):
+            weight, bias = packed._weight_bias()
+            total += weight.nelement() * weight.element_size()
+            if bias is not None:
+                total += bias.nelement() * bias.element_size()
+    return total
+
+
+class ModelCache:
+    # Shared, thread-safe LRU cache of (tokenizer, model) pairs keyed by model name.
+    # The cache is bounded by an entry count and, optionally, by a byte budget;
+    # the least recently used model is evicted first. Quantized models are cached
+    # under their own key, so each model is converted to int8 only once.
+    def __init__(self, max_entries=4, max_bytes=None, loader=load_marian, sizeof=model_nbytes):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.loader = loader
+        self.sizeof = sizeof
+
+        self._entries = OrderedDict()  # key -> (tokenizer, model, nbytes)
+        self._lock = threading.Lock()
+        self._loading = {}  # key -> Event, so concurrent requests load a model only once
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.load_time = 0.0
+        self.current_bytes = 0
+
+    def get(self, model_name, device, quantized=False):
+        key = (model_name, str(device), 'int8' if quantized else 'fp32')
+
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[0], entry[1]
+
+                pending = self._loading.get(key)
+                if pending is None:
+                    # This thread becomes the loader for the key
+                    self.misses += 1
+                    pending = self._loading[key] = threading.Event()
+                    break
+
+            # Another thread is already loading this model, wait and retry
+            pending.wait()
+
+        try:
+            start = time.perf_counter()
+            tokenizer, model = self.loader(model_name, device)
+            if quantized:
+                model = quantize_int8(model)
+            elapsed = time.perf_counter() - start
+            nbytes = self.sizeof(model)
+
+            with self._lock:
+                self.load_time += elapsed
+                self._entries[key] = (tokenizer, model, nbytes)
+                self.current_bytes += nbytes
+                self._evict()
+            return tokenizer, model
+        finally:
+            with self._lock:
+                del self._loading[key]
+            pending.set()
+
+    # Drop least recently used entries until both budgets are respected.
+    # The most recent entry is always kept, even if it alone exceeds max_bytes.
+    def _evict(self):
+        while len(self._entries) > 1 and (
+            (self.max_entries is not None and len(self._entries) > self.max_entries)
+            or (self.max_bytes is not None and self.current_bytes > self.max_bytes)
+        ):
+            _, (_, _, nbytes) = self._entries.popitem(last=False)
+            self.current_bytes -= nbytes
+            self.evictions += 1
+
+    # Models are never moved here, so holding one while it runs needs no bookkeeping
+    def acquire(self, model_name, device, quantized=False):
+        return self.get(model_name, device, quantized)
+
+    def release(self, model_name, device, quantized=False):
+        pass
+
+    # No use counts are kept here
+    def uncounted(self):
+        return contextlib.nullcontext()
+
+    def __contains__(self, model_name):
+        with self._lock:
+            return any(key[0] == model_name for key in self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'load_time': self.load_time,
+            }
+
+
+class ResidentModel:
+    # One cached model: where it belongs (home device), whether it is there now or
+    # demoted to the CPU, how many callers are running it, and while it is being copied
+    # between devices an Event that is set once the copy is done
+    def __init__(self, model_name, tokenizer, model, nbytes, home, on_device):
+        self.model_name = model_name
+        self.tokenizer = tokenizer
+        self.model = model
+        self.nbytes = nbytes
+        self.home = home
+        self.on_device = on_device
+        self.leases = 0
+        self.last_used = time.monotonic()
+        self.moving = None
+
+
+class ResidencyManager:
+    # Model cache that decides where models live, with the same get() interface as
+    # ModelCache. Models on an accelerator stay there while they fit in its budget
+    # (device_budget bytes, by default DEVICE_MEMORY_FRACTION of the device memory).
+    # When a model needs room, the least recently used models that are neither pinned
+    # nor in use are demoted to the CPU: they stay in RAM, so the next use costs a copy
+    # back to the device (a promotion), not a reload. Models idle for idle_demote_s are
+    # demoted as well. Demoted and CPU models beyond max_host_entries or host_budget
+    # bytes are dropped, least recently used first. int8 models only live on the CPU.
+    # Callers running a model hold it with acquire()/release(), so it is never moved
+    # under a running generate(); pinned models are never demoted or dropped.
+    # Moves are decided under the lock but copied outside it, so one thread copying a
+    # model does not hold up every other acquire()/release(); a model being copied is
+    # handed out only once the copy is done.
+    # Use counts per model are kept and can be saved to a usage log, from which
+    # hot_models() picks what to pre-warm in the next session. Only real requests
+    # count: warm-ups and pre-warms run inside uncounted().
+    # With simulated_device_budget the CPU is treated as an accelerator of that many
+    # bytes (demotion is then only bookkeeping), to exercise the policy without a GPU.
+    def __init__(self, device_budget=None, host_budget=None, max_host_entries=4, idle_demote_s=600,
+                 pinned=(), usage_path=DEFAULT_USAGE_PATH, simulated_device_budget=None,
+                 loader=load_marian, sizeof=model_nbytes, mover=move_model):
+        self.device_budget = device_budget
+        self.host_budget = host_budget
+        self.max_host_entries = max_host_entries
+        self.idle_demote_s = idle_demote_s
+        self.usage_path = usage_path
+        self.simulated_device_budget = simulated_device_budget
+        self.loader = loader
+        self.sizeof = sizeof
+        self.mover = mover
+
+        self._entries = OrderedDict()  # key -> ResidentModel, least recently used first
+        self._lock = threading.Lock()
+        self._loading = {}  # key -> Event, so concurrent requests load a model only once
+        self._pinned = set(pinned)
+        self._budgets = {}  # home device -> byte budget (None: unlimited)
+        self._usage = {}  # model name -> {'uses', 'last_used'} (wall-clock time)
+        self._local = threading.local()  # .uncounted while inside uncounted()
+
+        self.hits = 0
+        self.misses = 0
+        self.promotions = 0
+        self.demotions = 0
+        self.evictions = 0
+        self.load_time = 0.0
+
+    # Whether models for device go to the device tier (an accelerator) or stay on the CPU
+    def _accelerated(self, device, quantized):
+        if quantized:
+            return False
+        return str(device) != 'cpu' or self.simulated_device_budget is not None
+
+    def _budget(self, home):
+        if home not in self._budgets:
+            if self.simulated_device_budget is not None and home == 'cpu':
+                self._budgets[home] = self.simulated_device_budget
+            elif self.device_budget is not None:
+                self._budgets[home] = self.device_budget
+            else:
+                memory = device_memory(home)
+                self._budgets[home] = None if memory is None else int(DEVICE_MEMORY_FRACTION * memory)
+        return self._budgets[home]
+
+    # Get a model for device and hold it until release(): it is not moved meanwhile
+    def acquire(self, model_name, device, quantized=False):
+        key = (model_name, str(device), 'int8' if quantized else 'fp32')
+        accelerated = self._accelerated(device, quantized)
+
+        while True:
+            moves = []
+            with self._lock:
+                entry = self._entries.get(key)
+                waiting = entry.moving if entry is not None else self._loading.get(key)
+                if entry is not None and waiting is None:
+                    if accelerated and not entry.on_device:
+                        self._promote(key, entry, moves)
+                    else:
+                        self.hits += 1
+                    self._use(key, entry)
+                    self._rebalance(key, moves)
+                elif entry is None and waiting is None:
+                    # This thread becomes the loader for the key
+                    self.misses += 1
+                    pending = self._loading[key] = threading.Event()
+                    break
+
+            if waiting is None:
+                self._transfer(moves)
+                return entry.tokenizer, entry.model
+
+            # Another thread is loading or copying this model, wait and retry
+            waiting.wait()
+
+        try:
+            # Models for the device tier are loaded on the CPU and copied over only once
+            # _make_room() has freed enough device memory for them
+            start = time.perf_counter()
+            tokenizer, model = self.loader(model_name, 'cpu' if accelerated else device)
+            if quantized:
+                model = quantize_int8(model)
+            elapsed = time.perf_counter() - start
+            entry = ResidentModel(model_name, tokenizer, model, self.sizeof(model), str(device), False)
+
+            moves = []
+            with self._lock:
+                self.load_time += elapsed
+                self._entries[key] = entry
+                if accelerated:
+                    self._make_room(key, entry, moves)
+                    entry.on_device = True
+                    self._start_move(entry, entry.home, moves)
+                self._use(key, entry)
+                self._rebalance(key, moves)
+            self._transfer(moves)
+            return tokenizer, model
+        finally:
+            with self._lock:
+                del self._loading[key]
+            pending.set()
+
+    def release(self, model_name, device, quantized=False):
+        key = (model_name, str(device), 'int8' if quantized else 'fp32')
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.leases:
+                entry.leases -= 1
+                entry.last_used = time.monotonic()
+
+    # ModelCache-compatible lookup without holding the model
+    def get(self, model_name, device, quantized=False):
+        model = self.acquire(model_name, device, quantized)
+        self.release(model_name, device, quantized)
+        return model
+
+    # Models acquired by this thread inside the block are not counted as used, so a
+    # pre-warmed model does not rank itself into hot_models()
+    @contextlib.contextmanager
+    def uncounted(self):
+        previous = getattr(self._local, 'uncounted', False)
+        self._local.uncounted = True
+        try:
+            yield
+        finally:
+            self._local.uncounted = previous
+
+    def _use(self, key, entry):
+        entry.leases += 1
+        entry.last_used = time.monotonic()
+        self._entries.move_to_end(key)
+        if getattr(self._local, 'uncounted', False):
+            return
+        usage = self._usage.setdefault(entry.model_name, {'uses': 0, 'last_used': 0.0})
+        usage['uses'] += 1
+        usage['last_used'] = time.time()
+
+    def _movable(self, entry):
+        return entry.on_device and not entry.leases and entry.moving is None and entry.model_name not in self._pinned
+
+    # Demote least recently used models on entry's device until entry fits the budget.
+    # Models still being copied off the device count as using it until the copy is done.
+    # When everything else is pinned or in use the budget is exceeded rather than failing.
+    def _make_room(self, key, entry, moves):
+        budget = self._budget(entry.home)
+        if budget is None:
+            return
+        used = entry.nbytes + sum(
+            other.nbytes for other_key, other in self._entries.items()
+            if other_key != key and (other.on_device or other.moving is not None) and other.home == entry.home
+        )
+        for other_key, other in list(self._entries.items()):
+            if used <= budget:
+                break
+            if other_key != key and other.home == entry.home and self._movable(other):
+                self._demote(other, moves)
+                used -= other.nbytes
+
+    def _promote(self, key, entry, moves):
+        self._make_room(key, entry, moves)
+        entry.on_device = True
+        self._start_move(entry, entry.home, moves)
+        self.promotions += 1
+
+    def _demote(self, entry, moves):
+        entry.on_device = False
+        self._start_move(entry, 'cpu', moves)
+        self.demotions += 1
+
+    # Record a move decided under the lock; _transfer() does the copy
+    def _start_move(self, entry, device, moves):
+        entry.moving = threading.Event()
+        moves.append((entry, device))
+
+    # Copy models between devices outside the lock, demotions first so the device
+    # memory they free is there before anything is copied onto the device
+    def _transfer(self, moves):
+        if not moves:
+            return
+        try:
+            for entry, device in sorted(moves, key=lambda move: move[1] != 'cpu'):
+                self.mover(entry.model, device)
+        finally:
+            with self._lock:
+                for entry, _ in moves:
+                    entry.moving.set()
+                    entry.moving = None
+
+    # Demote models idle for too long, then apply the host limits
+    def _rebalance(self, keep, moves):
+        if self.idle_demote_s is not None:
+            now = time.monotonic()
+            for entry in self._entries.values():
+                if self._movable(entry) and now - entry.last_used > self.idle_demote_s:
+                    self._demote(entry, moves)
+        self._trim_host(keep)
+
+    # Drop least recently used CPU-side models beyond the host limits; the model just
+    # used (keep) and pinned ones always stay
+    def _trim_host(self, keep):
+        def host_entries():
+            return [(key, entry) for key, entry in self._entries.items() if not entry.on_device]
+
+        while True:
+            entries = host_entries()
+            host_bytes = sum(entry.nbytes for _, entry in entries)
+            if len(entries) <= self.max_host_entries and (self.host_budget is None or host_bytes <= self.host_budget):
+                return
+            victims = [key for key, entry in entries
+                       if key != keep and entry.moving is None and entry.model_name not in self._pinned]
+            if not victims:
+                return
+            del self._entries[victims[0]]
+            self.evictions += 1
+
+    # Pinned models stay on their device (and in the cache) until unpinned
+    def pin(self, model_name):
+        with self._lock:
+            self._pinned.add(model_name)
+
+    def unpin(self, model_name):
+        with self._lock:
+            self._pinned.discard(model_name)
+
+    # Model names ranked by use count, halved for every half_life_s since last use
+    def hot_models(self, limit=None, half_life_s=7 * 24 * 3600):
+        now = time.time()
+        with self._lock:
+            scores = {
+                name: usage['uses'] * 0.5 ** (max(now - usage['last_used'], 0) / half_life_s)
+                for name, usage in self._usage.items()
+            }
+        ranked = sorted(scores, key=scores.get, reverse=True)
+        return ranked[:limit] if limit is not None else ranked
+
+    # Merge use counts from the usage log written by save_usage() in earlier sessions
+    def load_usage(self, path=None):
+        path = path or self.usage_path
+        if not path or not os.path.exists(path):
+            return self
+        with open(path, encoding='utf-8') as handle:
+            saved = json.load(handle)
+        with self._lock:
+            for name, usage in saved.items():
+                current = self._usage.setdefault(name, {'uses': 0, 'last_used': 0.0})
+                current['uses'] += usage['uses']
+                current['last_used'] = max(current['last_used'], usage['last_used'])
+        return self
+
+    def save_usage(self, path=None):
+        path = path or self.usage_path
+        if not path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._lock:
+            usage = {name: dict(values) for name, values in self._usage.items()}
+        temporary = f'{path}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as handle:
+            json.dump(usage, handle, indent=1)
+        os.replace(temporary, path)
+
+    # Load the hottest models of the usage log onto device ahead of their first use
+    def prewarm(self, device, limit=2):
+        names = self.hot_models(limit)
+        with self.uncounted():
+            for name in names:
+                self.get(name, device)
+        return names
+
+    def __contains__(self, model_name):
+        with self._lock:
+            return any(key[0] == model_name for key in self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            entries = list(self._entries.values())
+            return {
+                'entries': len(entries),
+                'on_device': sum(entry.on_device for entry in entries),
+                'device_bytes': sum(entry.nbytes for entry in entries if entry.on_device),
+                'host_bytes': sum(entry.nbytes for entry in entries if not entry.on_device),
+                'pinned': sorted(self._pinned),
+                'hits': self.hits,
+                'misses': self.misses,
+                'promotions': self.promotions,
+                'demotions': self.demotions,
+                'evictions': self.evictions,
+                'load_time': self.load_time,
+            }
+
+
+def simulated_device_budget():
+    megabytes = os.environ.get(SIMULATED_DEVICE_ENV)
+    return int(float(megabytes) * 1024 * 1024) if megabytes else None
+
+
+# Cache shared by every translation request in the process
+model_cache = ResidencyManager(simulated_device_budget=simulated_device_budget())
@@ -0,0 +1,191 @@
+import argparse
+import concurrent.futures
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+
+# Local store of pre-converted models, one directory per model (opus-mt-en-es -> Helsinki-NLP--opus-mt-en-es).
+# Can be moved with the TRANSLATOR_MODEL_STORE environment variable, which worker processes inherit.
+DEFAULT_STORE_DIR = os.environ.get(
+    'TRANSLATOR_MODEL_STORE', os.path.join(os.path.expanduser('~'), '.cache', 'translator', 'models')
+)
+MANIFEST = 'manifest.json'
+HASH_CHUNK = 1024 * 1024
+
+
+def store_path(model_name, root=DEFAULT_STORE_DIR):
+    return os.path.join(root, model_name.replace('/', '--'))
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as handle:
+        for chunk in iter(lambda: handle.read(HASH_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_manifest(directory):
+    with open(os.path.join(directory, MANIFEST), encoding='utf-8') as handle:
+        return json.load(handle)
+
+
+# Check a stored model against its manifest. The quick check only compares file sizes
+# (a few stat calls, done on every load); full=True also compares sha256 digests.
+# Returns the list of problems, empty when the model is intact.
+def verify(directory, full=False):
+    try:
+        manifest = read_manifest(directory)
+    except (OSError, ValueError) as error:
+        return [f'manifest: {error}']
+
+    problems = []
+    for name, expected in manifest['files'].items():
+        path = os.path.join(directory, name)
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            problems.append(f'{name}: missing')
+            continue
+        if size != expected['size']:
+            problems.append(f'{name}: {size} bytes, expected {expected["size"]}')
+        elif full and file_sha256(path) != expected['sha256']:
+            problems.append(f'{name}: sha256 mismatch')
+    return problems
+
+
+# Directory of a stored model that passes the quick check, or None
+def find(model_name, root=DEFAULT_STORE_DIR):
+    directory = store_path(model_name, root)
+    if os.path.isdir(directory) and not verify(directory):
+        return directory
+    return None
+
+
+# Download a model (or take it from the Hugging Face cache), save it as safetensors
+# plus tokenizer files and write the manifest. The model is written to a temporary
+# directory first (unique per call, so two conversions of the same model never
+# share one), and readers never see a half-written store entry.
+def convert(model_name, root=DEFAULT_STORE_DIR):
+    from transformers import MarianMTModel, MarianTokenizer
+
+    directory = store_path(model_name, root)
+    os.makedirs(root, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=f'{os.path.basename(directory)}.tmp-', dir=root)
+
+    try:
+        tokenizer = MarianTokenizer.from_pretrained(model_name)
+        model = MarianMTModel.from_pretrained(model_name)
+        tokenizer.save_pretrained(staging)
+        model.save_pretrained(staging, safe_serialization=True)
+
+        files = {}
+        for name in sorted(os.listdir(staging)):
+            path = os.path.join(staging, name)
+            files[name] = {'size': os.path.getsize(path), 'sha256': file_sha256(path)}
+        manifest = {'model_name': model_name, 'created': time.time(), 'files': files}
+        with open(os.path.join(staging, MANIFEST), 'w', encoding='utf-8') as handle:
+            json.dump(manifest, handle, indent=2)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(staging, directory)
+    return directory
+
+
+# Fill the store with several models at once (downloads are mostly waiting on the
+# network). Models already stored and intact are skipped unless force is set.
+# Returns {model_name: directory or exception}.
+def prefetch(model_names, root=DEFAULT_STORE_DIR, workers=4, force=False, on_progress=None):
+    os.makedirs(root, exist_ok=True)
+    results = {}
+
+    def fetch(model_name):
+        directory = store_path(model_name, root)
+        if not force and os.path.isdir(directory) and not verify(directory, full=True):
+            return directory
+        return convert(model_name, root)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        # Each model once, even when several pairs share it
+        futures = {executor.submit(fetch, model_name): model_name for model_name in dict.fromkeys(model_names)}
+        for future in concurrent.futures.as_completed(futures):
+            model_name = futures[future]
+            try:
+                results[model_name] = future.result()
+            except Exception as error:
+                results[model_name] = error
+            if on_progress is not None:
+                on_progress(model_name, results[model_name])
+    return results
+
+
+# Load a stored model. The safetensors weights are memory-mapped rather than
+# unpickled, and low_cpu_mem_usage skips the random initialization and the second
+# in-memory copy of the weights; nothing here touches the network.
+def load(directory, device):
+    from transformers import MarianMTModel, MarianTokenizer
+
+    tokenizer = MarianTokenizer.from_pretrained(directory)
+    model = MarianMTModel.from_pretrained(directory, use_safetensors=True, low_cpu_mem_usage=True).to(device)
+    model.eval()
+    return tokenizer, model
+
+
+def selected_models(args):
+    from language_pairs import language_pairs
+
+    if args.all:
+        return sorted(set(language_pairs.values()))
+    return list(dict.fromkeys([language_pairs[pair] for pair in args.pair] + args.model))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Manage the local store of pre-converted translation models')
+    parser.add_argument('command', choices=['prefetch', 'verify', 'list'])
+    parser.add_argument('--pair', action='append', default=[], help='language pair, e.g. "English to Spanish" (repeatable)')
+    parser.add_argument('--model', action='append', default=[], help='model name (repeatable)')
+    parser.add_argument('--all', action='store_true', help='every model in language_pairs')
+    parser.add_argument('--store', default=DEFAULT_STORE_DIR)
+    parser.add_argument('--workers', type=int, default=4, help='models fetched in parallel')
+    parser.add_argument('--force', action='store_true', help='convert again even when already stored')
+    args = parser.parse_args()
+
+    if args.command == 'list':
+        if os.path.isdir(args.store):
+            for name in sorted(os.listdir(args.store)):
+                directory = os.path.join(args.store, name)
+                if os.path.exists(os.path.join(directory, MANIFEST)):
+                    manifest = read_manifest(directory)
+                    size = sum(entry['size'] for entry in manifest['files'].values())
+                    print(f'{manifest["model_name"]:<40} {size / 1e6:>8.1f} MB')
+        return
+
+    model_names = selected_models(args)
+    if not model_names:
+        parser.error('choose models with --pair, --model or --all')
+
+    if args.command == 'verify':
+        failed = False
+        for model_name in model_names:
+            problems = verify(store_path(model_name, args.store), full=True)
+            failed = failed or bool(problems)
+            print(f'{model_name}: {"; ".join(problems) or "ok"}')
+        raise SystemExit(1 if failed else 0)
+
+    def report(model_name, result):
+        status = f'failed: {result}' if isinstance(result, Exception) else result
+        print(f'{model_name}: {status}', flush=True)
+
+    results = prefetch(model_names, args.store, args.workers, args.force, on_progress=report)
+    raise SystemExit(1 if any(isinstance(result, Exception) for result in results.values()) else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+import queue
+import threading
+
+import translation_engine
+from language_pairs import language_pairs
+from translation_worker import UNKEYED_OPTIONS, SegmentMemo
+
+
+# Every pair goes through this language when there is no direct model
+PIVOT_LANGUAGE = 'English'
+
+# Options that only steer a single call, left out of the intermediate cache keys
+CALL_OPTIONS = UNKEYED_OPTIONS + ('is_cancelled', 'first_batch_size', 'max_batch_tokens', 'cache')
+
+
+# ('Spanish', 'English') for 'Spanish to English'
+def pair_languages(pair):
+    source, _, target = pair.partition(' to ')
+    return source, target
+
+
+# Model names that translate source into target: the direct model when there is one,
+# otherwise (source -> English, English -> target); None when neither exists
+def pivot_route(source, target, pairs=None):
+    pairs = pairs or language_pairs
+    direct = f'{source} to {target}'
+    if direct in pairs:
+        return pairs[direct]
+    first = pairs.get(f'{source} to {PIVOT_LANGUAGE}')
+    second = pairs.get(f'{PIVOT_LANGUAGE} to {target}')
+    if first is None or second is None or source == target:
+        return None
+    return (first, second)
+
+
+# Pairs reachable only through English, as {'Spanish to German': (model, model)}
+def pivot_pairs(pairs=None):
+    pairs = pairs or language_pairs
+    sources = [pair_languages(pair)[0] for pair in pairs if pair_languages(pair)[1] == PIVOT_LANGUAGE]
+    targets = [pair_languages(pair)[1] for pair in pairs if pair_languages(pair)[0] == PIVOT_LANGUAGE]
+    routes = {}
+    for source in sources:
+        for target in targets:
+            name = f'{source} to {target}'
+            if name not in pairs and source != target:
+                routes[name] = pivot_route(source, target, pairs)
+    return routes
+
+
+# English intermediates of pivoted sentences, shared by every target language: a
+# source fanned out to several targets is translated into English once
+pivot_cache = SegmentMemo(max_entries=20000)
+
+
+def pivot_key(model_name, options, text):
+    signature = tuple(sorted((name, repr(value)) for name, value in options.items() if name not in CALL_OPTIONS))
+    return (model_name, signature, text)
+
+
+# Translate through English as two pipelined stages and yield (index, translation)
+# in input order. Hop one streams sentences into English batch by batch on a helper
+# thread; hop two translates, as one batch, whatever English sentences are ready each
+# time it is free, so it starts on the first sentences while hop one is still busy.
+# Both models come from the same model cache, so each is loaded once and stays
+# resident across calls. English intermediates are kept in pivot_cache.
+def translate_pivot_stream(texts, route, device=None, pivot_cache=pivot_cache, is_cancelled=None,
+                           stream_fn=translation_engine.translate_stream,
+                           translate_fn=translation_engine.translate_texts, **options):
+    texts = list(texts)
+    first, second = route
+    keys = [pivot_key(first, options, text) for text in texts]
+    english = [pivot_cache.get(key) if pivot_cache is not None else None for key in keys]
+    missing = [index for index, text in enumerate(english) if text is None]
+
+    ready = queue.Queue()
+    for index, text in enumerate(english):
+        if text is not None:
+            ready.put((index, text))
+
+    # Hop two batches by token budget on its own, the streaming batch shape is hop one's
+    second_options = {name: value for name, value in options.items() if name != 'first_batch_size'}
+    stopped = threading.Event()
+
+    def cancelled():
+        return stopped.is_set() or (is_cancelled is not None and is_cancelled())
+
+    def first_hop():
+        try:
+            stream = stream_fn([texts[index] for index in missing], first, device, is_cancelled=cancelled, **options)
+            for position, text in stream:
+                index = missing[position]
+                if pivot_cache is not None:
+                    pivot_cache.put(keys[index], text)
+                ready.put((index, text))
+        except Exception as error:
+            ready.put(error)
+
+    producer = None
+    if missing:
+        producer = threading.Thread(target=first_hop, name='pivot-first-hop', daemon=True)
+        producer.start()
+
+    results = [None] * len(texts)
+    received = 0
+    next_index = 0
+    try:
+        while received < len(texts):
+            batch = [ready.get()]
+            while True:
+                try:
+                    batch.append(ready.get_nowait())
+                except queue.Empty:
+                    break
+            for item in batch:
+                if isinstance(item, Exception):
+                    raise item
+            received += len(batch)
+
+            outputs = translate_fn(
+                [text for _, text in batch], second, device, is_cancelled=is_cancelled, **second_options,
+            )
+            for (index, _), output in zip(batch, outputs):
+                results[index] = output
+            while next_index < len(texts) and results[next_index] is not None:
+                yield next_index, results[next_index]
+                next_index += 1
+    finally:
+        # Also stops hop one when the caller gives up on the stream
+        stopped.set()
+        if producer is not None:
+            producer.join()
+
+
+# Drop-in replacements for the translation_engine functions of the same name that
+# also accept a (model, model) route from pivot_route() as the model name
+
+def translate_stream(texts, model_name, device=None, **options):
+    if isinstance(model_name, tuple):
+        return translate_pivot_stream(texts, model_name, device, **options)
+    options.pop('pivot_cache', None)
+    return translation_engine.translate_stream(texts, model_name, device, **options)
+
+
+def translate_texts(texts, model_name, device=None, **options):
+    if isinstance(model_name, tuple):
+        texts = list(texts)
+        results = [None] * len(texts)
+        for index, translation in translate_pivot_stream(texts, model_name, device, **options):
+            results[index] = translation
+        return results
+    options.pop('pivot_cache', None)
+    return translation_engine.translate_texts(texts, model_name, device, **options)
+
+
+def translate(text, model_name, device=None, **options):
+    return translate_texts([text], model_name, device, **options)[0]
+
+
+def warm_up(model_name, device=None, **options):
+    for name in model_name if isinstance(model_name, tuple) else (model_name,):
+        translation_engine.warm_up(name, device, **options)
+
+
+# Translate texts from source into every language of targets, returning
+# {target: translations}. Pivoted targets share one English pass through pivot_cache.
+def translate_fanout(texts, source, targets, device=None, pairs=None, **options):
+    texts = list(texts)
+    translations = {}
+    for target in targets:
+        route = pivot_route(source, target, pairs)
+        if route is None:
+            raise ValueError(f'no model translates {source} to {target}, directly or through {PIVOT_LANGUAGE}')
+        translations[target] = translate_texts(texts, route, device, **options)
+    return translations
@@ -0,0 +1,131 @@
+import multiprocessing
+import os
+
+from decoding_profiles import apply_profile
+from instrumentation import stage
+from translation_engine import (DEFAULT_MAX_BATCH_TOKENS, TranslationCancelled, decoding_params, known_results,
+                                store_results, translate_texts)
+
+
+# Sentences sent to a worker process at a time
+DEFAULT_SHARD_SIZE = 32
+
+# Per-process state, filled in by init_worker in every child process
+worker_state = {}
+
+
+# Split the cores into processes x intra-op threads. A single generate() call stops
+# scaling after a few threads, so we prefer more processes with 2-4 threads each.
+def suggest_split(cores=None):
+    cores = cores or os.cpu_count() or 1
+    if cores >= 16:
+        threads = 4
+    elif cores >= 4:
+        threads = 2
+    else:
+        threads = 1
+    return max(cores // threads, 1), threads
+
+
+def init_worker(threads, preload, max_batch_tokens):
+    import torch
+
+    torch.set_num_threads(threads)
+    torch.set_num_interop_threads(1)
+
+    worker_state['device'] = torch.device('cpu')
+    worker_state['max_batch_tokens'] = max_batch_tokens
+
+    # Every process holds its own copy of the models in its own model cache
+    for model_name in preload:
+        translate_texts(['Hello'], model_name, worker_state['device'])
+
+
+def translate_shard(job):
+    model_name, texts, quantized, generate_kwargs = job
+    return translate_texts(
+        texts, model_name, worker_state['device'],
+        max_batch_tokens=worker_state['max_batch_tokens'], quantized=quantized, **generate_kwargs
+    )
+
+
+class ProcessTranslationExecutor:
+    # Pool of CPU worker processes, each with its own model copies and an explicit
+    # torch.set_num_threads() setting. Inputs are cut into consecutive shards that are
+    # spread over the processes; results stream back in input order.
+    # translate_texts/translate_stream/translate mirror the engine functions, so an
+    # executor can be plugged into TranslationWorker or used by the batch CLI.
+    def __init__(self, processes=None, threads_per_process=None, preload=(),
+                 shard_size=DEFAULT_SHARD_SIZE, max_batch_tokens=DEFAULT_MAX_BATCH_TOKENS):
+        suggested_processes, suggested_threads = suggest_split()
+        self.processes = processes or suggested_processes
+        self.threads_per_process = threads_per_process or suggested_threads
+        self.shard_size = shard_size
+
+        # spawn, not fork: forking a process that already runs torch threads can deadlock
+        context = multiprocessing.get_context('spawn')
+        self._pool = context.Pool(
+            self.processes,
+            initializer=init_worker,
+            initargs=(self.threads_per_process, tuple(preload), max_batch_tokens),
+        )
+
+    # Yield (index, translation) in input order as shards complete
+    def translate_stream(self, texts, model_name, device=None, result_cache=None, is_cancelled=None,
+                         quantized=False, trace=None, decoding=None, translation_memory=None, **generate_kwargs):
+        texts = list(texts)
+        # Same cache key as the engine computes for this profile in the worker processes
+        merged, length_limit = apply_profile(decoding, generate_kwargs)
+        params = decoding_params(merged, quantized, length_limit)
+        results = known_results(texts, model_name, params, result_cache, translation_memory, trace)
+
+        pending = [index for index, result in enumerate(results) if result is None]
+        jobs = []
+        for start in range(0, len(pending), self.shard_size):
+            shard_texts = [texts[index] for index in pending[start:start + self.shard_size]]
+            jobs.append((model_name, shard_texts, quantized, dict(generate_kwargs, decoding=decoding)))
+
+        next_index = 0
+        position = 0
+        shards = self._pool.imap(translate_shard, jobs)
+        while True:
+            # Time spent waiting for the worker processes
+            with stage(trace, 'generate'):
+                outputs = next(shards, None)
+            if outputs is None:
+                break
+
+            if is_cancelled is not None and is_cancelled():
+                raise TranslationCancelled()
+
+            shard = pending[position:position + len(outputs)]
+            position += len(outputs)
+            for index, output in zip(shard, outputs):
+                results[index] = output
+            items = [(texts[index], results[index]) for index in shard]
+            store_results(model_name, items, params, result_cache, translation_memory, trace)
+
+            while next_index < len(texts) and results[next_index] is not None:
+                yield next_index, results[next_index]
+                next_index += 1
+
+        # Everything was served from the result cache
+        while next_index < len(texts):
+            yield next_index, results[next_index]
+            next_index += 1
+
+    def translate_texts(self, texts, model_name, device=None, **kwargs):
+        return [translation for _, translation in self.translate_stream(texts, model_name, device, **kwargs)]
+
+    def translate(self, text, model_name, device=None, **kwargs):
+        return self.translate_texts([text], model_name, device, **kwargs)[0]
+
+    def close(self):
+        self._pool.close()
+        self._pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
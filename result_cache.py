@@ -0,0 +1,160 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'translator', 'translations.sqlite3')
+
+# SQLite limits the number of bound parameters per statement
+LOOKUP_CHUNK = 500
+
+
+# Normalize source text so trivially different inputs share a cache entry
+def normalize_text(text):
+    return re.sub(r'\s+', ' ', unicodedata.normalize('NFC', text)).strip()
+
+
+# Stable string form of the decoding parameters (num_beams, max_new_tokens, ...)
+def params_signature(params):
+    return json.dumps(params or {}, sort_keys=True, default=str)
+
+
+def cache_key(model_name, text, params=None):
+    raw = '\x1f'.join((model_name, params_signature(params), normalize_text(text)))
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+class TranslationResultCache:
+    # Translation results stored in SQLite so they survive restarts.
+    # Entries are keyed by model name, normalized source text and decoding parameters.
+    # The cache holds at most max_entries rows (least recently used rows are evicted
+    # first) and, when ttl is set, ignores and purges rows older than ttl seconds.
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=100000, ttl=None):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS translations ('
+            ' key TEXT PRIMARY KEY,'
+            ' translation TEXT NOT NULL,'
+            ' created REAL NOT NULL,'
+            ' last_used REAL NOT NULL)'
+        )
+        self._connection.execute('CREATE INDEX IF NOT EXISTS translations_last_used ON translations (last_used)')
+        self._connection.commit()
+        self._count = self._connection.execute('SELECT COUNT(*) FROM translations').fetchone()[0]
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # Look up several texts at once, returning a list with None for every miss
+    def get_many(self, model_name, texts, params=None):
+        keys = [cache_key(model_name, text, params) for text in texts]
+        now = time.time()
+        found = {}
+
+        with self._lock:
+            for start in range(0, len(keys), LOOKUP_CHUNK):
+                chunk = keys[start:start + LOOKUP_CHUNK]
+                placeholders = ','.join('?' * len(chunk))
+                query = f'SELECT key, translation, created FROM translations WHERE key IN ({placeholders})'
+                for key, translation, created in self._connection.execute(query, chunk):
+                    if self.ttl is None or now - created <= self.ttl:
+                        found[key] = translation
+
+            if found:
+                self._connection.executemany(
+                    'UPDATE translations SET last_used = ? WHERE key = ?',
+                    [(now, key) for key in found],
+                )
+                self._connection.commit()
+
+            results = [found.get(key) for key in keys]
+            hits = sum(result is not None for result in results)
+            self.hits += hits
+            self.misses += len(results) - hits
+
+        return results
+
+    def get(self, model_name, text, params=None):
+        return self.get_many(model_name, [text], params)[0]
+
+    # Store (source_text, translation) pairs. The row count is kept up to date from the
+    # keys already present (primary key lookups), never recounted with a table scan.
+    def put_many(self, model_name, items, params=None):
+        now = time.time()
+        # A text given twice is stored once, with its last translation
+        rows = {}
+        for text, translation in items:
+            key = cache_key(model_name, text, params)
+            rows[key] = (key, translation, now, now)
+        if not rows:
+            return
+
+        with self._lock:
+            keys = list(rows)
+            existing = 0
+            for start in range(0, len(keys), LOOKUP_CHUNK):
+                chunk = keys[start:start + LOOKUP_CHUNK]
+                placeholders = ','.join('?' * len(chunk))
+                query = f'SELECT COUNT(*) FROM translations WHERE key IN ({placeholders})'
+                existing += self._connection.execute(query, chunk).fetchone()[0]
+
+            self._connection.executemany('INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?)', rows.values())
+            self._count += len(rows) - existing
+            self._evict(now)
+            self._connection.commit()
+
+    def put(self, model_name, text, translation, params=None):
+        self.put_many(model_name, [(text, translation)], params)
+
+    def _evict(self, now):
+        if self.ttl is not None:
+            expired = self._connection.execute('DELETE FROM translations WHERE created < ?', (now - self.ttl,))
+            self.evictions += expired.rowcount
+            self._count -= expired.rowcount
+
+        if self.max_entries is not None and self._count > self.max_entries:
+            excess = self._count - self.max_entries
+            self._connection.execute(
+                'DELETE FROM translations WHERE key IN '
+                '(SELECT key FROM translations ORDER BY last_used LIMIT ?)',
+                (excess,),
+            )
+            self.evictions += excess
+            self._count = self.max_entries
+
+    def clear(self):
+        with self._lock:
+            self._connection.execute('DELETE FROM translations')
+            self._connection.commit()
+            self._count = 0
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': self._count,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+            }
@@ -0,0 +1,43 @@
+import re
+
+
+# Common abbreviations that end with a period but do not end a sentence
+ABBREVIATIONS = {
+    'mr', 'mrs', 'ms', 'dr', 'prof', 'sr', 'jr', 'st', 'vs', 'etc', 'e.g', 'i.e',
+    'p', 'pp', 'fig', 'approx', 'dept', 'inc', 'ltd', 'co', 'sra', 'srta', 'hr',
+}
+
+# Abbreviations that are also ordinary words ("I said no."): only when a number follows, as in "No. 5"
+NUMBER_ABBREVIATIONS = {'no', 'nos'}
+
+# A sentence ends at ., !, ? or … (optionally followed by closing quotes/brackets)
+# and whitespace, or at CJK full-width punctuation, or at a line break
+SENTENCE_END = re.compile(r'([.!?…]+["\')\]»”’]*)\s+|([。！？])|\n+')
+
+
+# Split text into sentences that can be translated independently
+def split_sentences(text):
+    sentences = []
+    start = 0
+
+    for match in SENTENCE_END.finditer(text):
+        end = match.end(1) if match.group(1) else match.end()
+        candidate = text[start:end].strip()
+
+        # Do not split after abbreviations such as "Dr." or single initials
+        if match.group(1) and match.group(1).startswith('.'):
+            words = candidate[:-1].split()
+            last_word = words[-1].lower() if words else ''
+            if last_word in ABBREVIATIONS or (len(last_word) == 1 and last_word.isalpha()):
+                continue
+            if last_word in NUMBER_ABBREVIATIONS and text[match.end():match.end() + 1].isdigit():
+                continue
+
+        if candidate:
+            sentences.append(candidate)
+        start = match.end()
+
+    tail = text[start:].strip()
+    if tail:
+        sentences.append(tail)
+    return sentences
@@ -0,0 +1,261 @@
+import argparse
+import math
+import queue
+import threading
+import time
+import wave
+from array import array
+from collections import deque
+
+
+SAMPLE_RATE = 16000
+FRAME_MS = 30
+
+
+# Root-mean-square energy of a frame of 16-bit little-endian mono samples
+def frame_energy(frame):
+    samples = array('h', frame)
+    if not samples:
+        return 0.0
+    return math.sqrt(sum(sample * sample for sample in samples) / len(samples))
+
+
+class MicrophoneSource:
+    # Yields fixed-size frames of 16-bit mono PCM from the default microphone
+    def __init__(self, sample_rate=SAMPLE_RATE, frame_ms=FRAME_MS, device_index=None):
+        self.sample_rate = sample_rate
+        self.sample_width = 2
+        self.frame_samples = sample_rate * frame_ms // 1000
+        self.device_index = device_index
+
+    def frames(self, stopped):
+        import speech_recognition as sr
+
+        microphone = sr.Microphone(
+            device_index=self.device_index, sample_rate=self.sample_rate, chunk_size=self.frame_samples
+        )
+        with microphone as source:
+            self.sample_width = source.SAMPLE_WIDTH
+            while not stopped.is_set():
+                yield source.stream.read(self.frame_samples)
+
+
+class WavFileSource:
+    # Yields frames from a 16-bit PCM WAV file (multi-channel audio is downmixed).
+    # With realtime=True frames are paced like a live microphone, for latency tests.
+    def __init__(self, path, frame_ms=FRAME_MS, realtime=False):
+        self.path = path
+        self.frame_ms = frame_ms
+        self.realtime = realtime
+        self.sample_width = 2
+        with wave.open(path, 'rb') as handle:
+            if handle.getsampwidth() != 2:
+                raise ValueError(f'{path}: only 16-bit PCM WAV files are supported')
+            self.sample_rate = handle.getframerate()
+
+    def frames(self, stopped):
+        with wave.open(self.path, 'rb') as handle:
+            channels = handle.getnchannels()
+            frame_samples = self.sample_rate * self.frame_ms // 1000
+            start = time.perf_counter()
+            count = 0
+
+            while not stopped.is_set():
+                data = handle.readframes(frame_samples)
+                if not data:
+                    return
+
+                if channels > 1:
+                    samples = array('h', data)
+                    mono = array('h', (
+                        sum(samples[i:i + channels]) // channels for i in range(0, len(samples), channels)
+                    ))
+                    data = mono.tobytes()
+
+                if self.realtime:
+                    count += 1
+                    delay = start + count * self.frame_ms / 1000 - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                yield data
+
+
+class EnergyVAD:
+    # Energy-based voice activity detection. A segment starts after start_ms of
+    # frames louder than the adaptive noise floor and ends after end_silence_ms of
+    # quiet frames; pre_roll_ms of audio before the start is kept so the first
+    # syllable is not clipped.
+    def __init__(self, frame_ms=FRAME_MS, ratio=3.0, min_energy=300.0, start_ms=90,
+                 end_silence_ms=600, pre_roll_ms=300, min_segment_ms=300, max_segment_ms=15000):
+        self.frame_ms = frame_ms
+        self.ratio = ratio
+        self.min_energy = min_energy
+        self.start_frames = max(start_ms // frame_ms, 1)
+        self.end_frames = max(end_silence_ms // frame_ms, 1)
+        self.pre_roll_frames = pre_roll_ms // frame_ms
+        self.min_frames = min_segment_ms // frame_ms
+        self.max_frames = max_segment_ms // frame_ms
+
+    # Turn a stream of frames into a stream of speech segments (bytes)
+    def segments(self, frames):
+        noise_floor = None
+        pre_roll = deque(maxlen=self.pre_roll_frames + self.start_frames)
+        voiced_run = 0
+        silent_run = 0
+        segment = None
+
+        for frame in frames:
+            energy = frame_energy(frame)
+            if noise_floor is None:
+                noise_floor = energy
+            voiced = energy > max(noise_floor * self.ratio, self.min_energy)
+
+            if segment is None:
+                pre_roll.append(frame)
+                if voiced:
+                    voiced_run += 1
+                    if voiced_run >= self.start_frames:
+                        segment = list(pre_roll)
+                        pre_roll.clear()
+                        silent_run = 0
+                else:
+                    voiced_run = 0
+                    # Only learn the noise level from non-speech frames
+                    noise_floor = 0.95 * noise_floor + 0.05 * energy
+                continue
+
+            segment.append(frame)
+            silent_run = 0 if voiced else silent_run + 1
+
+            if silent_run >= self.end_frames or len(segment) >= self.max_frames:
+                if len(segment) - silent_run >= self.min_frames:
+                    yield b''.join(segment)
+                segment = None
+                voiced_run = 0
+
+        if segment is not None and len(segment) - silent_run >= self.min_frames:
+            yield b''.join(segment)
+
+
+class SpeechRecognitionBackend:
+    # Recognizer built on the speech_recognition package. method picks the engine:
+    # 'google' (online), or an offline one such as 'sphinx', 'vosk' or 'whisper'
+    # (each needs its own optional package).
+    def __init__(self, method='google', language='en-US', **options):
+        import speech_recognition as sr
+
+        self.sr = sr
+        self.recognizer = sr.Recognizer()
+        self.method = method
+        self.language = language
+        self.options = options
+
+    # Returns the recognized text, or None when nothing intelligible was said
+    def recognize(self, audio, sample_rate, sample_width):
+        audio_data = self.sr.AudioData(audio, sample_rate, sample_width)
+        recognize = getattr(self.recognizer, f'recognize_{self.method}')
+        try:
+            if self.method in ('google', 'sphinx'):
+                return recognize(audio_data, language=self.language, **self.options)
+            return recognize(audio_data, **self.options)
+        except self.sr.UnknownValueError:
+            return None
+
+
+class SpeechCaptureWorker:
+    # Captures audio on one thread, cuts it into utterances with the VAD and
+    # recognizes them on a second thread, so capture never waits for recognition.
+    # on_text(segment_index, text) is called (on the recognition thread) for every
+    # recognized segment as soon as it is ready; on_error(exception) for failures.
+    def __init__(self, source, recognizer, on_text, on_error=None, vad=None, on_finished=None):
+        self.source = source
+        self.recognizer = recognizer
+        self.on_text = on_text
+        self.on_error = on_error
+        self.on_finished = on_finished
+        self.vad = vad or EnergyVAD()
+
+        self._stopped = threading.Event()
+        self._segments = queue.Queue()
+        self._capture_thread = threading.Thread(target=self._capture, name='speech-capture', daemon=True)
+        self._recognize_thread = threading.Thread(target=self._recognize, name='speech-recognize', daemon=True)
+
+    def start(self):
+        self._capture_thread.start()
+        self._recognize_thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+
+    def join(self):
+        self._capture_thread.join()
+        self._recognize_thread.join()
+
+    def _capture(self):
+        try:
+            for segment in self.vad.segments(self.source.frames(self._stopped)):
+                self._segments.put(segment)
+        except Exception as error:
+            if self.on_error is not None:
+                self.on_error(error)
+        finally:
+            self._segments.put(None)
+
+    def _recognize(self):
+        index = 0
+        while True:
+            segment = self._segments.get()
+            if segment is None:
+                break
+            try:
+                text = self.recognizer.recognize(segment, self.source.sample_rate, self.source.sample_width)
+            except Exception as error:
+                if self.on_error is not None:
+                    self.on_error(error)
+                continue
+            if text:
+                self.on_text(index, text)
+                index += 1
+
+        if self.on_finished is not None:
+            self.on_finished()
+
+
+# Headless pipeline: WAV file -> VAD -> recognizer -> translation, with per-segment latency
+def main():
+    parser = argparse.ArgumentParser(description='Recognize and translate speech from a WAV file or the microphone')
+    parser.add_argument('--wav', default=None, help='16-bit PCM WAV file (default: microphone)')
+    parser.add_argument('--realtime', action='store_true', help='pace the WAV file like live audio')
+    parser.add_argument('--recognizer', default='google', help="speech_recognition engine, e.g. google, sphinx, vosk")
+    parser.add_argument('--language', default='en-US')
+    parser.add_argument('--pair', default='English to Spanish')
+    args = parser.parse_args()
+
+    from language_pairs import language_pairs
+    from translation_engine import translate
+
+    model_name = language_pairs[args.pair]
+    source = WavFileSource(args.wav, realtime=args.realtime) if args.wav else MicrophoneSource()
+    start = time.perf_counter()
+
+    def on_text(index, text):
+        recognized = time.perf_counter() - start
+        translation = translate(text, model_name)
+        translated = time.perf_counter() - start
+        print(f'[{index}] recognized at {recognized:.2f}s, translated at {translated:.2f}s')
+        print(f'    {text}\n    {translation}', flush=True)
+
+    worker = SpeechCaptureWorker(
+        source, SpeechRecognitionBackend(args.recognizer, args.language), on_text,
+        on_error=lambda error: print(f'error: {error}'),
+    ).start()
+    try:
+        worker.join()
+    except KeyboardInterrupt:
+        worker.stop()
+        worker.join()
+
+
+if __name__ == '__main__':
+    main()
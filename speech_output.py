@@ -0,0 +1,121 @@
+import queue
+import threading
+import time
+
+
+class Pyttsx3Backend:
+    # pyttsx3 engines must be driven from the thread that created them, so the
+    # engine is created in start(), which the speech worker calls on its own thread
+    def __init__(self, rate=125, volume=0.9, voice_index=1):
+        self.rate = rate
+        self.volume = volume
+        self.voice_index = voice_index
+        self.engine = None
+
+    def start(self):
+        import pyttsx3
+
+        self.engine = pyttsx3.init()
+
+        # Slowing down the speech rate (default is around 200 words per minute)
+        self.engine.setProperty('rate', self.rate)
+        self.engine.setProperty('volume', self.volume)  # Set volume between 0.0 and 1.0
+
+        # Choose a specific voice (male/female) when the system has it
+        voices = self.engine.getProperty('voices')
+        if len(voices) > self.voice_index:
+            self.engine.setProperty('voice', voices[self.voice_index].id)
+
+    def say(self, text):
+        self.engine.say(text)
+        self.engine.runAndWait()
+
+    # Called from another thread to cut the current utterance short
+    def stop(self):
+        if self.engine is not None:
+            self.engine.stop()
+
+
+class SilentBackend:
+    # Speaks nothing; keeps what would have been said (for tests and headless runs)
+    def __init__(self, seconds_per_character=0.0):
+        self.seconds_per_character = seconds_per_character
+        self.spoken = []
+
+    def start(self):
+        pass
+
+    def say(self, text):
+        self.spoken.append(text)
+        time.sleep(self.seconds_per_character * len(text))
+
+    def stop(self):
+        pass
+
+
+class SpeechWorker:
+    # Dedicated text-to-speech thread: the engine is set up once, utterances are
+    # taken from a queue and spoken one after another, and interrupt() drops
+    # everything queued and stops the current utterance. Nothing here ever blocks
+    # the caller, so it is safe to use from the GUI thread.
+    def __init__(self, backend=None):
+        self.backend = backend or Pyttsx3Backend()
+        self._queue = queue.Queue()
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name='speech-worker', daemon=True)
+        self._thread.start()
+
+    # Queue text to be spoken; on_done(seconds) runs on the worker thread afterwards
+    def speak(self, text, on_done=None):
+        if text.strip():
+            self._queue.put(('say', self._generation, text, on_done))
+
+    # Run callback on the worker thread once everything queued before it was spoken
+    def notify_when_done(self, callback):
+        self._queue.put(('call', self._generation, None, callback))
+
+    # Drop every queued utterance and stop the one being spoken
+    def interrupt(self):
+        with self._lock:
+            self._generation += 1
+        self.backend.stop()
+
+    # Stop the current utterance only and carry on with the queue
+    def skip(self):
+        self.backend.stop()
+
+    def stop(self):
+        self.interrupt()
+        self._queue.put(('quit', None, None, None))
+        self._thread.join()
+
+    def _run(self):
+        # The backend is only set up when there is something to say, which keeps
+        # pyttsx3 out of application startup
+        started = False
+        while True:
+            action, generation, text, callback = self._queue.get()
+            if action == 'quit':
+                return
+
+            # Queued before the last interrupt()
+            with self._lock:
+                if generation != self._generation:
+                    continue
+
+            if action == 'call':
+                callback()
+                continue
+
+            start = time.perf_counter()
+            try:
+                if not started:
+                    self.backend.start()
+                    started = True
+                self.backend.say(text)
+            except Exception:
+                # A broken audio device must not take the worker down
+                continue
+            if callback is not None:
+                callback(time.perf_counter() - start)
@@ -0,0 +1,222 @@
+import argparse
+import functools
+import json
+import os
+import sys
+
+# Only the translation core is imported here: no PyQt5, speech_recognition or pyttsx3,
+# so the command line tool starts fast and runs on headless servers
+from decoding_profiles import DECODING_PROFILES
+from language_id import translate_mixed
+from language_pairs import language_pairs
+from pivot_translation import pivot_pairs, translate_texts
+from translation_engine import DEFAULT_MAX_BATCH_TOKENS
+
+
+# --pair value that detects the language of every line and translates it to English
+AUTO_PAIR = 'auto'
+
+# Direct pairs plus the ones translated through English: pair name -> model name or (model, model)
+ROUTES = dict(language_pairs, **pivot_pairs())
+
+
+# Read lines as bytes so the byte offset of every processed chunk is known
+def read_chunks(handle, chunk_size):
+    chunk = []
+    for raw_line in iter(handle.readline, b''):
+        chunk.append(raw_line)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# Parsers return (text to translate, record); writers turn (record, translation) back into a line
+def parse_text(line, args):
+    return line, None
+
+
+def write_text(record, translation, args):
+    return translation
+
+
+def parse_tsv(line, args):
+    columns = line.split('\t')
+    return columns[args.column], columns
+
+
+def write_tsv(columns, translation, args):
+    return '\t'.join(columns + [translation.replace('\t', ' ')])
+
+
+def parse_jsonl(line, args):
+    record = json.loads(line)
+    return record[args.field], record
+
+
+def write_jsonl(record, translation, args):
+    record[args.output_field] = translation
+    return json.dumps(record, ensure_ascii=False)
+
+
+FORMATS = {
+    'text': (parse_text, write_text),
+    'tsv': (parse_tsv, write_tsv),
+    'jsonl': (parse_jsonl, write_jsonl),
+}
+
+
+def load_state(path):
+    if path and os.path.exists(path):
+        with open(path, encoding='utf-8') as handle:
+            return json.load(handle)
+    return {'offset': 0, 'lines': 0}
+
+
+# Record the input offset only after the matching output has reached the disk
+def save_state(path, state):
+    temporary = path + '.tmp'
+    with open(temporary, 'w', encoding='utf-8') as handle:
+        json.dump(state, handle)
+        handle.flush()
+        os.fsync(handle.fileno())
+    os.replace(temporary, path)
+
+
+# Translate one chunk of raw input lines, returning the output lines
+def translate_chunk(raw_lines, args, parse, write, result_cache, translate_fn=translate_texts):
+    records = []
+    texts = []
+    for raw_line in raw_lines:
+        line = raw_line.decode('utf-8').rstrip('\r\n')
+        if not line.strip():
+            records.append(None)
+            continue
+        text, record = parse(line, args)
+        records.append((len(texts), record))
+        texts.append(text)
+
+    options = {
+        'device': args.device, 'result_cache': result_cache, 'quantized': args.quantize, 'decoding': args.decoding,
+    }
+    if args.pair == AUTO_PAIR:
+        # Mixed languages: one batch per detected source language model
+        translations = translate_mixed(texts, translate_fn=translate_fn, **options)
+    else:
+        translations = translate_fn(texts, ROUTES[args.pair], **options)
+
+    output_lines = []
+    for entry in records:
+        if entry is None:
+            output_lines.append('')
+        else:
+            index, record = entry
+            output_lines.append(write(record, translations[index], args))
+    return output_lines
+
+
+def run(args):
+    parse, write = FORMATS[args.format]
+
+    result_cache = None
+    if args.cache:
+        from result_cache import TranslationResultCache
+        result_cache = TranslationResultCache(args.cache)
+
+    # Either translate in this process or shard the chunks over CPU worker processes
+    executor = None
+    translate_fn = functools.partial(translate_texts, max_batch_tokens=args.max_batch_tokens)
+    if args.processes:
+        if isinstance(ROUTES.get(args.pair), tuple):
+            raise SystemExit(f'{args.pair} goes through English and runs in-process, drop --processes')
+        from process_executor import ProcessTranslationExecutor
+        executor = ProcessTranslationExecutor(
+            args.processes, args.threads_per_process,
+            preload=[] if args.pair == AUTO_PAIR else [language_pairs[args.pair]],
+            max_batch_tokens=args.max_batch_tokens,
+        )
+        translate_fn = executor.translate_texts
+
+    # Near-duplicate lines reuse earlier translations; the memory is saved when done
+    memory = None
+    if args.memory:
+        from translation_memory import TranslationMemory
+        memory = TranslationMemory(args.memory_reuse_threshold)
+        if os.path.exists(args.memory):
+            memory.load(args.memory)
+        translate_fn = functools.partial(translate_fn, translation_memory=memory)
+
+    state = load_state(args.resume)
+    if args.resume and args.input == '-':
+        raise SystemExit('--resume needs a seekable --input file, not stdin')
+
+    source = sys.stdin.buffer if args.input == '-' else open(args.input, 'rb')
+    if state['offset']:
+        source.seek(state['offset'])
+
+    # Resumed runs append to the existing output instead of overwriting it
+    mode = 'a' if state['offset'] else 'w'
+    target = sys.stdout if args.output == '-' else open(args.output, mode, encoding='utf-8')
+
+    try:
+        for raw_lines in read_chunks(source, args.chunk_size):
+            output_lines = translate_chunk(raw_lines, args, parse, write, result_cache, translate_fn)
+            target.write(''.join(line + '\n' for line in output_lines))
+            target.flush()
+
+            state['offset'] += sum(len(raw_line) for raw_line in raw_lines)
+            state['lines'] += len(raw_lines)
+            if args.resume:
+                if target is not sys.stdout:
+                    os.fsync(target.fileno())
+                save_state(args.resume, state)
+    finally:
+        if memory is not None:
+            memory.save(args.memory)
+        if executor is not None:
+            executor.close()
+        if source is not sys.stdin.buffer:
+            source.close()
+        if target is not sys.stdout:
+            target.close()
+
+    if result_cache is not None:
+        print(f'result cache: {result_cache.stats()}', file=sys.stderr)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Translate text, TSV or JSONL line by line without the GUI')
+    parser.add_argument('--pair', required=True, choices=list(ROUTES) + [AUTO_PAIR], metavar='PAIR',
+                        help="language pair, e.g. 'English to Spanish' or, through English, 'Spanish to German'; "
+                             "'auto' detects the language of every line and translates it to English (lines "
+                             "already in English, or in a language without a model, are copied as they are)")
+    parser.add_argument('--input', default='-', help='input file (default: stdin)')
+    parser.add_argument('--output', default='-', help='output file (default: stdout)')
+    parser.add_argument('--format', default='text', choices=list(FORMATS))
+    parser.add_argument('--column', type=int, default=0, help='TSV column to translate; the translation is appended')
+    parser.add_argument('--field', default='text', help='JSONL field to translate')
+    parser.add_argument('--output-field', default='translation', help='JSONL field that receives the translation')
+    parser.add_argument('--chunk-size', type=int, default=256, help='lines read, translated and written at a time')
+    parser.add_argument('--max-batch-tokens', type=int, default=DEFAULT_MAX_BATCH_TOKENS)
+    parser.add_argument('--processes', type=int, default=0,
+                        help='shard work over this many CPU worker processes (default: translate in-process)')
+    parser.add_argument('--threads-per-process', type=int, default=None,
+                        help='torch intra-op threads per worker process (default: picked from the core count)')
+    parser.add_argument('--quantize', action='store_true', help='run int8 dynamically quantized models on the CPU')
+    parser.add_argument('--decoding', default=None, choices=list(DECODING_PROFILES),
+                        help="decoding profile: greedy 'fast', small-beam 'balanced' or full-beam 'quality' "
+                             "(default: the model's own settings)")
+    parser.add_argument('--device', default=None, help="torch device, e.g. 'cpu' or 'cuda' (default: auto)")
+    parser.add_argument('--cache', default=None, metavar='PATH', help='SQLite translation result cache to use')
+    parser.add_argument('--memory', default=None, metavar='PATH',
+                        help='translation memory file (JSON lines): near-duplicate lines reuse stored translations')
+    parser.add_argument('--memory-reuse-threshold', type=float, default=0.8,
+                        help='similarity needed to reuse a stored translation (default: 0.8)')
+    parser.add_argument('--resume', default=None, metavar='STATE_FILE',
+                        help='record progress here and continue from it when rerun')
+    return parser
+
+
+if __name__ == '__main__':
+    run(build_parser().parse_args())
@@ -0,0 +1,262 @@
+from decoding_profiles import apply_profile, max_new_tokens_for
+from instrumentation import stage
+from language_pairs import language_pairs
+from model_cache import default_device, model_cache
+
+
+# Upper bound on padded tokens (longest sequence x batch size) fed to one generate() call
+DEFAULT_MAX_BATCH_TOKENS = 4096
+
+
+class TranslationCancelled(Exception):
+    pass
+
+
+# Build a stopping criterion that ends generate() early once the request is superseded
+def cancellation_criteria(is_cancelled):
+    from transformers import StoppingCriteria, StoppingCriteriaList
+
+    class CancelCriteria(StoppingCriteria):
+        def __call__(self, input_ids, scores, **kwargs):
+            return bool(is_cancelled())
+
+    return StoppingCriteriaList([CancelCriteria()])
+
+
+# Group input indices into batches of similar token length.
+# Inputs are sorted by length so each batch carries little padding, and a batch is
+# closed once its padded size (longest input x number of inputs) would exceed the budget.
+def plan_batches(lengths, max_batch_tokens=DEFAULT_MAX_BATCH_TOKENS):
+    batches = []
+    current = []
+    longest = 0
+
+    for index in sorted(range(len(lengths)), key=lambda i: lengths[i]):
+        length = max(lengths[index], 1)
+        if current and max(longest, length) * (len(current) + 1) > max_batch_tokens:
+            batches.append(current)
+            current = []
+            longest = 0
+        current.append(index)
+        longest = max(longest, length)
+
+    if current:
+        batches.append(current)
+    return batches
+
+
+# Run one padded batch of already tokenized inputs through the model.
+# When a trace is given, the tokenize/generate/decode stages are timed on it.
+def generate_batch(tokenizer, model, device, encodings, is_cancelled=None, trace=None, **generate_kwargs):
+    if is_cancelled is not None:
+        generate_kwargs['stopping_criteria'] = cancellation_criteria(is_cancelled)
+
+    with stage(trace, 'tokenize'):
+        padded = tokenizer.pad(encodings, return_tensors='pt').to(device)
+
+    with stage(trace, 'generate'):
+        translation = model.generate(**padded, **generate_kwargs)
+
+    # A cancelled generate() returns truncated sequences, never use them
+    if is_cancelled is not None and is_cancelled():
+        raise TranslationCancelled()
+
+    with stage(trace, 'decode'):
+        return tokenizer.batch_decode(translation, skip_special_tokens=True)
+
+
+# Parameters that change the output, used as part of the result cache key
+def decoding_params(generate_kwargs, quantized=False, length_limit=None):
+    params = {name: value for name, value in generate_kwargs.items() if name != 'stopping_criteria'}
+    if quantized:
+        params['quantized'] = True
+    if length_limit is not None:
+        params['length_limit'] = list(length_limit)
+    return params
+
+
+# Dynamically quantized int8 models only run on the CPU
+def resolve_device(device, quantized=False):
+    if quantized:
+        import torch
+
+        return torch.device('cpu')
+    if device is None:
+        return default_device()
+    return device
+
+
+# Results already known for texts: exact hits from the result cache, then reusable
+# near-duplicates from the translation memory; None where the model is needed
+def known_results(texts, model_name, params, result_cache=None, translation_memory=None, trace=None):
+    if result_cache is not None:
+        with stage(trace, 'cache'):
+            results = result_cache.get_many(model_name, texts, params)
+    else:
+        results = [None] * len(texts)
+
+    if translation_memory is not None:
+        with stage(trace, 'memory'):
+            for index, text in enumerate(texts):
+                if results[index] is None:
+                    match = translation_memory.lookup(model_name, text)
+                    if match is not None and match.kind == 'reuse':
+                        results[index] = match.translation
+    return results
+
+
+# Remember new model outputs in the result cache and the translation memory
+def store_results(model_name, items, params, result_cache=None, translation_memory=None, trace=None):
+    if result_cache is not None:
+        with stage(trace, 'cache'):
+            result_cache.put_many(model_name, items, params)
+    if translation_memory is not None:
+        with stage(trace, 'memory'):
+            translation_memory.add_many(model_name, items)
+
+
+# Tokenize texts, plan batches with plan_fn and yield (indices, translations) per batch.
+# With a length_limit (from a decoding profile) every batch gets its own max_new_tokens,
+# derived from its longest input, instead of the model's fixed maximum length.
+def run_batches(texts, model_name, device, cache, plan_fn, is_cancelled, generate_kwargs, quantized=False,
+                trace=None, length_limit=None):
+    # The model is held until the last batch, so the cache does not move it meanwhile
+    with stage(trace, 'load'):
+        tokenizer, model = cache.acquire(model_name, device, quantized=quantized)
+    try:
+        # Tokenize once without padding to learn the lengths, then pad per batch
+        with stage(trace, 'tokenize'):
+            encoded = tokenizer(texts, truncation=True)
+        lengths = [len(ids) for ids in encoded['input_ids']]
+
+        for batch in plan_fn(lengths):
+            encodings = {
+                'input_ids': [encoded['input_ids'][i] for i in batch],
+                'attention_mask': [encoded['attention_mask'][i] for i in batch],
+            }
+            batch_kwargs = dict(generate_kwargs)
+            if length_limit is not None:
+                longest = max(lengths[i] for i in batch)
+                batch_kwargs['max_new_tokens'] = max_new_tokens_for(longest, length_limit)
+            yield batch, generate_batch(tokenizer, model, device, encodings, is_cancelled, trace, **batch_kwargs)
+    finally:
+        cache.release(model_name, device, quantized=quantized)
+
+
+# Translate a list of strings with the model for model_name, batching by token budget.
+# Results come back in the same order as texts. When a result_cache is given, cached
+# translations are served from it and only the misses reach the model; a
+# translation_memory (translation_memory.py) also serves near-duplicate sentences.
+# quantized=True runs an int8 dynamically quantized copy of the model on the CPU.
+# decoding picks a named decoding profile ('fast', 'balanced', 'quality', see
+# decoding_profiles.py); None keeps the model's own generation settings.
+def translate_texts(texts, model_name, device=None, cache=model_cache, result_cache=None,
+                    max_batch_tokens=DEFAULT_MAX_BATCH_TOKENS, is_cancelled=None, quantized=False,
+                    trace=None, decoding=None, translation_memory=None, **generate_kwargs):
+    texts = list(texts)
+    if not texts:
+        return []
+
+    device = resolve_device(device, quantized)
+    generate_kwargs, length_limit = apply_profile(decoding, generate_kwargs)
+    params = decoding_params(generate_kwargs, quantized, length_limit)
+    results = known_results(texts, model_name, params, result_cache, translation_memory, trace)
+
+    pending = [index for index, result in enumerate(results) if result is None]
+    if not pending:
+        return results
+
+    pending_texts = [texts[index] for index in pending]
+    batches = run_batches(
+        pending_texts, model_name, device, cache,
+        lambda lengths: plan_batches(lengths, max_batch_tokens),
+        is_cancelled, generate_kwargs, quantized, trace, length_limit,
+    )
+    for batch, outputs in batches:
+        for position, output in zip(batch, outputs):
+            results[pending[position]] = output
+
+    items = [(texts[index], results[index]) for index in pending]
+    store_results(model_name, items, params, result_cache, translation_memory, trace)
+    return results
+
+
+# Group consecutive inputs into batches for streaming, keeping document order.
+# The first batch is kept small so the first result shows up as early as possible.
+def plan_stream_batches(lengths, max_batch_tokens=DEFAULT_MAX_BATCH_TOKENS, first_batch_size=1):
+    batches = []
+    current = []
+    longest = 0
+
+    for index, length in enumerate(lengths):
+        length = max(length, 1)
+        limit_reached = len(batches) == 0 and len(current) >= first_batch_size
+        if current and (limit_reached or max(longest, length) * (len(current) + 1) > max_batch_tokens):
+            batches.append(current)
+            current = []
+            longest = 0
+        current.append(index)
+        longest = max(longest, length)
+
+    if current:
+        batches.append(current)
+    return batches
+
+
+# Translate a list of strings (usually the sentences of one document) and yield
+# (index, translation) pairs in input order as soon as each batch finishes
+def translate_stream(texts, model_name, device=None, cache=model_cache, result_cache=None,
+                     max_batch_tokens=DEFAULT_MAX_BATCH_TOKENS, first_batch_size=1,
+                     is_cancelled=None, quantized=False, trace=None, decoding=None, translation_memory=None,
+                     **generate_kwargs):
+    texts = list(texts)
+    if not texts:
+        return
+
+    device = resolve_device(device, quantized)
+    generate_kwargs, length_limit = apply_profile(decoding, generate_kwargs)
+    params = decoding_params(generate_kwargs, quantized, length_limit)
+    results = known_results(texts, model_name, params, result_cache, translation_memory, trace)
+
+    pending = [index for index, result in enumerate(results) if result is None]
+    pending_texts = [texts[index] for index in pending]
+    next_index = 0
+
+    batches = run_batches(
+        pending_texts, model_name, device, cache,
+        lambda lengths: plan_stream_batches(lengths, max_batch_tokens, first_batch_size),
+        is_cancelled, generate_kwargs, quantized, trace, length_limit,
+    ) if pending else []
+
+    # Cached results ahead of the first miss are emitted right away
+    while next_index < len(texts) and results[next_index] is not None:
+        yield next_index, results[next_index]
+        next_index += 1
+
+    for batch, outputs in batches:
+        for position, output in zip(batch, outputs):
+            results[pending[position]] = output
+
+        items = [(pending_texts[position], output) for position, output in zip(batch, outputs)]
+        store_results(model_name, items, params, result_cache, translation_memory, trace)
+
+        while next_index < len(texts) and results[next_index] is not None:
+            yield next_index, results[next_index]
+            next_index += 1
+
+
+# Translate a list of strings for a language pair name such as 'English to Spanish'
+def translate_batch(texts, pair, device=None, **kwargs):
+    return translate_texts(texts, language_pairs[pair], device, **kwargs)
+
+
+# Translate a single string with the model for model_name
+def translate(text, model_name, device=None, **kwargs):
+    return translate_texts([text], model_name, device, **kwargs)[0]
+
+
+# Load a model and run one tiny generate() so the first real request is fast.
+# Not counted as a use of the model (see ResidencyManager.hot_models).
+def warm_up(model_name, device=None, cache=model_cache, quantized=False):
+    with cache.uncounted():
+        translate_texts(['Hello'], model_name, device, cache=cache, quantized=quantized)
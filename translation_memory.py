@@ -0,0 +1,237 @@
+import difflib
+import json
+import os
+import random
+import re
+import threading
+from collections import Counter
+
+from result_cache import normalize_text
+
+
+TOKEN_PATTERN = re.compile(r'\w+|[^\w\s]')
+DIGITS = re.compile(r'\d')
+MASK64 = (1 << 64) - 1
+
+
+# Word and punctuation tokens of a sentence
+def tokenize(text):
+    return TOKEN_PATTERN.findall(normalize_text(text))
+
+
+# Tokens compared for similarity: lowercased, with every digit replaced by 0 so that
+# sentences differing only in numbers look identical (numbers are repaired afterwards)
+def similarity_tokens(tokens):
+    return DIGITS.sub('0', '\x00'.join(tokens).lower()).split('\x00')
+
+
+class MemoryMatch:
+    # A stored sentence pair close to the query. translation is the stored target with
+    # the differing names/numbers substituted, or None when that was not possible;
+    # kind is 'reuse' (use translation as is) or 'hint' (close, but needs the model).
+    def __init__(self, kind, source, target, similarity, translation):
+        self.kind = kind
+        self.source = source
+        self.target = target
+        self.similarity = similarity
+        self.translation = translation
+
+    def __repr__(self):
+        return f'MemoryMatch({self.kind!r}, similarity={self.similarity:.2f}, source={self.source!r})'
+
+
+# Tokens that may be carried over untranslated: anything with a digit, and capitalized
+# words past the start of the sentence (names, codes). Other words that happen to
+# appear verbatim in the target ("hotel", "office") are cognates, not copies.
+def name_like(token, position):
+    return bool(DIGITS.search(token)) or (position > 0 and token[:1].isupper())
+
+
+# Rewrite target for query_tokens when query and source differ only by name-like tokens
+# copied verbatim into the target (names, numbers, codes), e.g.
+# "Order 12 for Ann shipped." -> "Pedido 12 de Ann enviado." gives
+# "Order 31 for Bob shipped." -> "Pedido 31 de Bob enviado.". Returns None otherwise.
+def repair(source_tokens, query_tokens, target):
+    matcher = difflib.SequenceMatcher(None, source_tokens, query_tokens, autojunk=False)
+    for operation, i1, i2, j1, j2 in matcher.get_opcodes():
+        if operation == 'equal':
+            continue
+        if operation != 'replace' or i2 - i1 != j2 - j1:
+            return None
+        for offset, (old, new) in enumerate(zip(source_tokens[i1:i2], query_tokens[j1:j2])):
+            # Case-only differences keep the stored wording
+            if old.lower() == new.lower():
+                continue
+            if not (name_like(old, i1 + offset) and name_like(new, j1 + offset)):
+                return None
+            pattern = re.compile(rf'(?<!\w){re.escape(old)}(?!\w)')
+            if len(pattern.findall(target)) != 1:
+                return None
+            target = pattern.sub(lambda _: new, target)
+    return target
+
+
+class TranslationMemory:
+    # Sentence-level translation memory with a MinHash/LSH index per model.
+    # Every source sentence gets a MinHash signature over its tokens (one-permutation
+    # MinHash: each token hash is used once and lands in one of num_bands x
+    # rows_per_band slots); sentences sharing all values of at least one band land in
+    # the same bucket, so a lookup only looks at a handful of candidates, never at the
+    # whole memory. Candidates are ranked by shared bands and token overlap and only
+    # the best few are scored with difflib.
+    # Exact matches (after normalization) are found with a plain dict.
+    # similarity >= reuse_threshold with a successful repair() gives a 'reuse' match,
+    # similarity >= hint_threshold a 'hint' match.
+    def __init__(self, reuse_threshold=0.8, hint_threshold=0.6, num_bands=6, rows_per_band=3,
+                 max_bucket=32, max_candidates=8, max_scored=2, seed=0):
+        self.reuse_threshold = reuse_threshold
+        self.hint_threshold = hint_threshold
+        self.num_bands = num_bands
+        self.rows_per_band = rows_per_band
+        self.max_bucket = max_bucket
+        self.max_candidates = max_candidates
+        self.max_scored = max_scored
+
+        self._multiplier = random.Random(seed).getrandbits(64) | 1
+        self._models = {}  # model_name -> {'entries', 'exact', 'buckets'}
+        self._lock = threading.Lock()
+
+    def _index(self, model_name):
+        index = self._models.get(model_name)
+        if index is None:
+            index = self._models[model_name] = {'entries': [], 'exact': {}, 'buckets': {}}
+        return index
+
+    # Band keys of a token list (MinHash values of each band, hashed to one int)
+    def band_keys(self, tokens):
+        size = self.num_bands * self.rows_per_band
+        signature = [None] * size
+        for token in set(similarity_tokens(tokens)) or {''}:
+            value = ((hash(token) & MASK64) * self._multiplier) & MASK64
+            slot, value = value % size, value // size
+            if signature[slot] is None or value < signature[slot]:
+                signature[slot] = value
+
+        # Short sentences leave slots empty: borrow from the next filled slot, marked with
+        # the distance so borrowed values never equal real ones (densified MinHash)
+        filled = [slot for slot in range(size) if signature[slot] is not None]
+        if len(filled) < size:
+            dense = list(signature)
+            for slot in range(size):
+                if signature[slot] is None:
+                    donor = next((f for f in filled if f > slot), filled[0])
+                    dense[slot] = (signature[donor], (donor - slot) % size)
+            signature = dense
+
+        rows = self.rows_per_band
+        return [hash((band,) + tuple(signature[band * rows:(band + 1) * rows])) for band in range(self.num_bands)]
+
+    def add(self, model_name, source, target):
+        tokens = tokenize(source)
+        keys = self.band_keys(tokens)
+        with self._lock:
+            index = self._index(model_name)
+            exact = normalize_text(source)
+            if exact in index['exact']:
+                index['entries'][index['exact'][exact]] = (exact, target)
+                return
+
+            entry_id = len(index['entries'])
+            index['entries'].append((exact, target))
+            index['exact'][exact] = entry_id
+
+            # Buckets hold an int for a single entry and a list beyond that (saves memory
+            # at a million entries); only the newest max_bucket ids of a bucket are kept
+            buckets = index['buckets']
+            for key in keys:
+                bucket = buckets.get(key)
+                if bucket is None:
+                    buckets[key] = entry_id
+                elif isinstance(bucket, int):
+                    buckets[key] = [bucket, entry_id]
+                else:
+                    bucket.append(entry_id)
+                    if len(bucket) > self.max_bucket:
+                        del bucket[0]
+
+    def add_many(self, model_name, pairs):
+        for source, target in pairs:
+            self.add(model_name, source, target)
+
+    # Best stored match for text, or None when nothing reaches hint_threshold
+    def lookup(self, model_name, text):
+        index = self._models.get(model_name)
+        if index is None:
+            return None
+
+        normalized = normalize_text(text)
+        with self._lock:
+            exact_id = index['exact'].get(normalized)
+            if exact_id is not None:
+                source, target = index['entries'][exact_id]
+                return MemoryMatch('reuse', source, target, 1.0, target)
+
+        tokens = TOKEN_PATTERN.findall(normalized)
+        keys = self.band_keys(tokens) if tokens else []
+        votes = Counter()
+        with self._lock:
+            buckets = index['buckets']
+            for key in keys:
+                bucket = buckets.get(key)
+                if bucket is None:
+                    continue
+                if isinstance(bucket, int):
+                    votes[bucket] += 1
+                else:
+                    votes.update(bucket)
+            candidates = [index['entries'][entry_id] for entry_id, _ in votes.most_common(self.max_candidates)]
+
+        # Cheap token-set overlap (Dice) first: candidates below hint_threshold are
+        # dropped, and difflib (order-aware) only scores the top max_scored
+        query = similarity_tokens(tokens)
+        query_set = set(query)
+        overlaps = []
+        for source, target in candidates:
+            source_tokens = TOKEN_PATTERN.findall(source)  # stored normalized
+            compared = similarity_tokens(source_tokens)
+            compared_set = set(compared)
+            overlap = 2 * len(query_set & compared_set) / (len(query_set) + len(compared_set))
+            if overlap >= self.hint_threshold:
+                overlaps.append((overlap, source, target, source_tokens, compared))
+        overlaps.sort(key=lambda item: item[0], reverse=True)
+
+        best = None
+        best_similarity = self.hint_threshold
+        for _, source, target, source_tokens, compared in overlaps[:self.max_scored]:
+            similarity = difflib.SequenceMatcher(None, compared, query, autojunk=False).ratio()
+            if similarity >= best_similarity:
+                best, best_similarity = (source, target, source_tokens), similarity
+
+        if best is None:
+            return None
+        source, target, source_tokens = best
+        translation = repair(source_tokens, tokens, target) if best_similarity >= self.reuse_threshold else None
+        kind = 'reuse' if translation is not None else 'hint'
+        return MemoryMatch(kind, source, target, best_similarity, translation)
+
+    def __len__(self):
+        return sum(len(index['entries']) for index in self._models.values())
+
+    # JSON lines of {"model", "source", "target"}, so a memory can be kept between runs
+    def save(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        temporary = f'{path}.tmp'
+        with self._lock, open(temporary, 'w', encoding='utf-8') as handle:
+            for model_name, index in self._models.items():
+                for source, target in index['entries']:
+                    record = {'model': model_name, 'source': source, 'target': target}
+                    handle.write(json.dumps(record, ensure_ascii=False) + '\n')
+        os.replace(temporary, path)
+
+    def load(self, path):
+        with open(path, encoding='utf-8') as handle:
+            for line in handle:
+                if line.strip():
+                    record = json.loads(line)
+                    self.add(record['model'], record['source'], record['target'])
+        return self
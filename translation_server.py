@@ -0,0 +1,400 @@
+import argparse
+import asyncio
+import concurrent.futures
+import functools
+import http.client
+import json
+import os
+import socket
+import time
+from urllib.parse import urlparse
+
+# Like the CLI, the server only needs the translation core (no PyQt5)
+from decoding_profiles import DECODING_PROFILES
+from language_pairs import language_pairs
+from translation_engine import translate_texts, warm_up
+
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_WINDOW_MS = 10
+DEFAULT_MAX_BATCH_TEXTS = 64
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 415: 'Unsupported Media Type',
+           500: 'Internal Server Error'}
+
+# Engine options a client may set per request; anything else is ignored
+CLIENT_OPTIONS = ('quantized', 'decoding')
+
+# Models a client may name: only the app's own pairs, never an arbitrary Hub model
+SERVED_MODELS = frozenset(language_pairs.values())
+
+
+class MicroBatcher:
+    # Collects concurrent requests for the same model and options for up to
+    # window_ms (or until max_batch_texts texts are waiting) and runs them as one
+    # batch. Inference runs on a single thread: while a batch is running, pending
+    # requests are held and the oldest group is flushed as soon as it completes, so
+    # requests that arrive meanwhile are grouped into the next batch.
+    # Warm-ups run warm_up_fn on the inference thread when given (so they do not count
+    # as uses of the model), otherwise they translate a dummy text.
+    def __init__(self, translate_fn, window_ms=DEFAULT_WINDOW_MS, max_batch_texts=DEFAULT_MAX_BATCH_TEXTS,
+                 warm_up_fn=None):
+        self.translate_fn = translate_fn
+        self.warm_up_fn = warm_up_fn
+        self.window = window_ms / 1000
+        self.max_batch_texts = max_batch_texts
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='inference')
+
+        self._pending = {}  # (model_name, options json) -> [(texts, future)]
+        self._timers = {}
+        self._running = False
+
+        self.requests = 0
+        self.batches = 0
+        self.texts = 0
+
+    async def translate(self, model_name, texts, options):
+        loop = asyncio.get_running_loop()
+        key = (model_name, json.dumps(options, sort_keys=True))
+        future = loop.create_future()
+
+        pending = self._pending.setdefault(key, [])
+        pending.append((texts, future))
+        self.requests += 1
+
+        if sum(len(item[0]) for item in pending) >= self.max_batch_texts:
+            self._flush(key)
+        elif key not in self._timers:
+            self._timers[key] = loop.call_later(self.window, self._flush, key)
+
+        return await future
+
+    async def warm_up(self, model_name, options):
+        if self.warm_up_fn is None:
+            await self.translate(model_name, ['Hello'], options)
+            return
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(
+            self.executor, functools.partial(self.warm_up_fn, model_name, quantized=bool(options.get('quantized')))
+        )
+
+    def _flush(self, key):
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        if self._running:
+            return  # picked up when the running batch completes
+        items = self._pending.pop(key, None)
+        if not items:
+            return
+
+        # Up to max_batch_texts texts (at least one request); the rest waits for the next batch
+        count = len(items[0][0])
+        taken = 1
+        while taken < len(items) and count + len(items[taken][0]) <= self.max_batch_texts:
+            count += len(items[taken][0])
+            taken += 1
+        if taken < len(items):
+            self._pending[key] = items[taken:]
+        self._running = True
+        asyncio.ensure_future(self._run(key, items[:taken]))
+
+    def _batch_done(self):
+        self._running = False
+        if self._pending:
+            self._flush(next(iter(self._pending)))
+
+    async def _run(self, key, items):
+        model_name, options = key[0], json.loads(key[1])
+        texts = [text for item_texts, _ in items for text in item_texts]
+        self.batches += 1
+        self.texts += len(texts)
+
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(
+                self.executor, functools.partial(self.translate_fn, texts, model_name, **options)
+            )
+        except Exception as error:
+            for _, future in items:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        finally:
+            self._batch_done()
+
+        # Hand every caller its own slice of the batch
+        position = 0
+        for item_texts, future in items:
+            if not future.done():
+                future.set_result(results[position:position + len(item_texts)])
+            position += len(item_texts)
+
+    def stats(self):
+        return {
+            'requests': self.requests,
+            'batches': self.batches,
+            'texts': self.texts,
+            'texts_per_batch': self.texts / self.batches if self.batches else 0.0,
+        }
+
+
+class TranslationServer:
+    # Minimal HTTP/1.1 JSON server (keep-alive, TCP or Unix socket):
+    #   POST /translate  {"pair" or "model", "texts": [...], "options": {...}} -> {"translations": [...]}
+    #   POST /warm_up    {"pair" or "model", "options": {...}}                 -> {"model": ...}
+    #   POST /lookup     {"pair" or "model", "text": ...}                      -> {"match": {...} or null}
+    #   GET  /health, GET /stats
+    # /lookup returns the closest translation memory entry (reuse or hint) without translating.
+    # POST bodies must be sent as application/json: a browser cannot send that
+    # cross-origin without a preflight, so web pages cannot drive the server.
+    def __init__(self, batcher, result_cache=None, translation_memory=None):
+        self.batcher = batcher
+        self.result_cache = result_cache
+        self.translation_memory = translation_memory
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, path, version = request_line.decode('latin-1').split()
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get('content-length', 0))
+                body = await reader.readexactly(length) if length else b''
+                status, payload = await self.route(method, path, body, headers.get('content-type', ''))
+
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+                writer.write(
+                    f'HTTP/1.1 {status} {REASONS[status]}\r\n'
+                    f'Content-Type: application/json; charset=utf-8\r\n'
+                    f'Content-Length: {len(data)}\r\n'
+                    f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n'.encode('latin-1') + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionResetError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def route(self, method, path, body, content_type='application/json'):
+        try:
+            if method == 'GET' and path == '/health':
+                return 200, {'status': 'ok'}
+            if method == 'GET' and path == '/stats':
+                return 200, self.stats()
+            if method == 'POST' and path in ('/translate', '/warm_up', '/lookup'):
+                if content_type.partition(';')[0].strip().lower() != 'application/json':
+                    return 415, {'error': 'requests must be sent as application/json'}
+                request = json.loads(body or b'{}')
+                model_name = request.get('model') or language_pairs[request['pair']]
+                if model_name not in SERVED_MODELS:
+                    return 400, {'error': f'unknown model {model_name!r}'}
+                if path == '/lookup':
+                    return 200, {'match': self.lookup(model_name, request['text'])}
+                options = {name: value for name, value in request.get('options', {}).items() if name in CLIENT_OPTIONS}
+                if options.get('decoding') is not None and options['decoding'] not in DECODING_PROFILES:
+                    return 400, {'error': f'unknown decoding profile {options["decoding"]!r}'}
+                if path == '/warm_up':
+                    await self.batcher.warm_up(model_name, options)
+                    return 200, {'model': model_name}
+                # Checked before enqueueing: a bad item would fail the whole shared micro-batch
+                texts = request['texts']
+                if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+                    return 400, {'error': 'texts must be a list of strings'}
+                translations = await self.batcher.translate(model_name, texts, options)
+                return 200, {'translations': translations}
+            return 404, {'error': f'no route for {method} {path}'}
+        except (KeyError, TypeError, json.JSONDecodeError) as error:
+            return 400, {'error': f'bad request: {error!r}'}
+        except Exception as error:
+            return 500, {'error': repr(error)}
+
+    def lookup(self, model_name, text):
+        match = self.translation_memory.lookup(model_name, text) if self.translation_memory is not None else None
+        if match is None:
+            return None
+        return {'kind': match.kind, 'source': match.source, 'target': match.target,
+                'similarity': match.similarity, 'translation': match.translation}
+
+    def stats(self):
+        from model_cache import model_cache
+
+        stats = {'batcher': self.batcher.stats(), 'models': model_cache.stats()}
+        if self.result_cache is not None:
+            stats['result_cache'] = self.result_cache.stats()
+        if self.translation_memory is not None:
+            stats['translation_memory'] = {'entries': len(self.translation_memory)}
+        return stats
+
+
+async def serve(server, host=DEFAULT_HOST, port=DEFAULT_PORT, unix_socket=None):
+    if unix_socket:
+        listener = await asyncio.start_unix_server(server.handle_connection, unix_socket)
+    else:
+        listener = await asyncio.start_server(server.handle_connection, host, port)
+    async with listener:
+        await listener.serve_forever()
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout=None):
+        super().__init__('localhost', timeout=timeout)
+        self.unix_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.unix_path)
+
+
+class TranslationClient:
+    # Thin client for a running server. translate/translate_texts/translate_stream/
+    # warm_up mirror the engine functions, so it plugs into TranslationWorker and the
+    # GUI can run without loading any model itself.
+    # url is 'http://127.0.0.1:8765' or 'unix:///path/to/socket'.
+    def __init__(self, url, timeout=300):
+        self.url = url
+        self.timeout = timeout
+        self._connection = None
+
+    def _connect(self):
+        parsed = urlparse(self.url)
+        if parsed.scheme == 'unix':
+            return UnixHTTPConnection(parsed.path, timeout=self.timeout)
+        return http.client.HTTPConnection(parsed.hostname, parsed.port or DEFAULT_PORT, timeout=self.timeout)
+
+    def request(self, method, path, payload=None):
+        body = json.dumps(payload).encode('utf-8') if payload is not None else None
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+
+        # Reuse one keep-alive connection, reconnecting once if the server closed it
+        for attempt in range(2):
+            if self._connection is None:
+                self._connection = self._connect()
+            try:
+                self._connection.request(method, path, body=body, headers=headers)
+                response = self._connection.getresponse()
+                data = json.loads(response.read())
+                break
+            except (http.client.HTTPException, ConnectionError):
+                self._connection.close()
+                self._connection = None
+                if attempt:
+                    raise
+
+        if response.status != 200:
+            raise RuntimeError(f'translation server: {data.get("error")}')
+        return data
+
+    def translate_texts(self, texts, model_name, device=None, trace=None, **options):
+        payload = {
+            'model': model_name,
+            'texts': list(texts),
+            'options': {name: value for name, value in options.items() if name in CLIENT_OPTIONS},
+        }
+        start = time.perf_counter()
+        translations = self.request('POST', '/translate', payload)['translations']
+        if trace is not None:
+            trace.record('remote', time.perf_counter() - start)
+        return translations
+
+    def translate(self, text, model_name, device=None, is_cancelled=None, **options):
+        return self.translate_texts([text], model_name, device, **options)[0]
+
+    # First sentence alone so it shows up early, then the rest in one request
+    def translate_stream(self, texts, model_name, device=None, is_cancelled=None, **options):
+        texts = list(texts)
+        for start, end in ((0, 1), (1, len(texts))):
+            if start >= end:
+                continue
+            if is_cancelled is not None and is_cancelled():
+                return
+            for offset, translation in enumerate(self.translate_texts(texts[start:end], model_name, device, **options)):
+                yield start + offset, translation
+
+    def warm_up(self, model_name, device=None, **options):
+        payload = {'model': model_name, 'options': {n: v for n, v in options.items() if n in CLIENT_OPTIONS}}
+        self.request('POST', '/warm_up', payload)
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve translations to local clients with cross-client micro-batching')
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--unix-socket', default=None, help='listen on this Unix socket instead of TCP')
+    parser.add_argument('--window-ms', type=float, default=DEFAULT_WINDOW_MS,
+                        help='how long to wait for more requests before running a batch')
+    parser.add_argument('--max-batch-texts', type=int, default=DEFAULT_MAX_BATCH_TEXTS)
+    parser.add_argument('--device', default=None)
+    parser.add_argument('--cache', default=None, metavar='PATH', help='SQLite translation result cache to use')
+    parser.add_argument('--memory', default=None, metavar='PATH',
+                        help='translation memory file (JSON lines), loaded at startup and saved on exit')
+    parser.add_argument('--preload', action='append', default=[], metavar='PAIR', choices=list(language_pairs),
+                        help='language pair to load at startup (repeatable)')
+    parser.add_argument('--pin', action='append', default=[], metavar='PAIR', choices=list(language_pairs),
+                        help='language pair loaded at startup and never demoted from the device (repeatable)')
+    parser.add_argument('--prewarm', type=int, default=0, metavar='N',
+                        help='load the N most used models of earlier runs at startup (from the usage log)')
+    args = parser.parse_args()
+
+    result_cache = None
+    if args.cache:
+        from result_cache import TranslationResultCache
+        result_cache = TranslationResultCache(args.cache)
+
+    translation_memory = None
+    if args.memory:
+        from translation_memory import TranslationMemory
+        translation_memory = TranslationMemory()
+        if os.path.exists(args.memory):
+            translation_memory.load(args.memory)
+
+    translate_fn = functools.partial(
+        translate_texts, device=args.device, result_cache=result_cache, translation_memory=translation_memory
+    )
+    # Pinned pairs stay on the device; the usage log is updated on exit for --prewarm
+    from model_cache import model_cache
+
+    model_cache.load_usage()
+    for pair in args.pin:
+        model_cache.pin(language_pairs[pair])
+    preload = [language_pairs[pair] for pair in args.preload + args.pin]
+    for model_name in dict.fromkeys(preload + model_cache.hot_models(args.prewarm)):
+        warm_up(model_name, args.device)
+
+    batcher = MicroBatcher(translate_fn, args.window_ms, args.max_batch_texts,
+                           warm_up_fn=functools.partial(warm_up, device=args.device))
+    server = TranslationServer(batcher, result_cache, translation_memory)
+    where = args.unix_socket or f'http://{args.host}:{args.port}'
+    print(f'translation server listening on {where}', flush=True)
+    try:
+        asyncio.run(serve(server, args.host, args.port, args.unix_socket))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        model_cache.save_usage()
+        if translation_memory is not None:
+            translation_memory.save(args.memory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,227 @@
+import contextlib
+import itertools
+from collections import OrderedDict
+import queue
+import threading
+import time
+
+from instrumentation import ProfileCapture
+from segmentation import split_sentences
+from translation_engine import TranslationCancelled, translate, translate_stream, warm_up
+
+
+# Priorities for queued requests, lower values are served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 10
+
+
+class SegmentMemo:
+    # Small in-memory LRU of sentence translations, keyed by model, options and the
+    # source sentence. Streamed requests given one as the memo option reuse every
+    # sentence they already translated and only send the changed ones to the model.
+    def __init__(self, max_entries=2000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            translation = self._entries.get(key)
+            if translation is not None:
+                self._entries.move_to_end(key)
+            return translation
+
+    def put(self, key, translation):
+        with self._lock:
+            self._entries[key] = translation
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# Options that do not change the translation, left out of memo keys
+UNKEYED_OPTIONS = ('trace', 'result_cache', 'translation_memory')
+
+
+class TranslationRequest:
+    def __init__(self, request_id, key, text, model_name, on_done, on_error, on_segment=None, options=None):
+        self.request_id = request_id
+        self.key = key
+        self.text = text
+        self.model_name = model_name
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_segment = on_segment
+        self.options = options or {}
+        self.enqueued = time.perf_counter()
+
+
+class TranslationWorker:
+    # Long-lived pool of inference threads fed from a priority queue.
+    # Every request belongs to a key (usually the widget it paints into); a newer
+    # request for the same key supersedes the older ones, whether they are still
+    # queued or already running, so only the latest result is ever delivered.
+    # Requests with an on_segment callback are split into sentences and streamed:
+    # on_segment(request_id, index, translation) fires as each sentence finishes.
+    # Extra keyword arguments (result_cache, ...) are passed on to the engine functions,
+    # per-request options passed to submit() (quantized, ...) are added on top and win.
+    # Three options are handled by the worker itself: trace (a RequestTrace that also
+    # receives the time spent waiting in the queue), profile (a path; the request
+    # runs under ProfileCapture and the profile is written there) and memo (a
+    # SegmentMemo; streamed sentences found there are not translated again).
+    def __init__(self, device, num_threads=1, translate_fn=translate, stream_fn=translate_stream,
+                 warm_up_fn=warm_up, **engine_kwargs):
+        self.device = device
+        self.translate_fn = translate_fn
+        self.stream_fn = stream_fn
+        self.warm_up_fn = warm_up_fn
+        self.engine_kwargs = engine_kwargs
+
+        self._queue = queue.PriorityQueue()
+        self._ids = itertools.count(1)
+        self._latest = {}  # key -> id of the newest request still queued or running
+        self._lock = threading.Lock()
+        self._stopped = False
+
+        self._threads = []
+        for index in range(num_threads):
+            thread = threading.Thread(target=self._run, name=f'translation-worker-{index}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, text, model_name, key='default', priority=PRIORITY_INTERACTIVE,
+               on_done=None, on_error=None, on_segment=None, **options):
+        with self._lock:
+            request_id = next(self._ids)
+            self._latest[key] = request_id
+
+        request = TranslationRequest(request_id, key, text, model_name, on_done, on_error, on_segment, options)
+        self._queue.put((priority, request_id, request))
+        return request_id
+
+    # Load a model in the background (heavy imports included) and run a dummy generate()
+    def warm_up(self, model_name, on_done=None, on_error=None, priority=PRIORITY_BACKGROUND, **options):
+        request = TranslationRequest(None, None, None, model_name, on_done, on_error, options=options)
+        with self._lock:
+            order = next(self._ids)
+        self._queue.put((priority, order, request))
+
+    # Drop every pending and running request for key
+    def cancel(self, key):
+        with self._lock:
+            self._latest.pop(key, None)
+
+    def is_current(self, request):
+        with self._lock:
+            return self._latest.get(request.key) == request.request_id
+
+    # Forget the key once its newest request is over, so one-off keys do not pile up
+    def _finish(self, request):
+        with self._lock:
+            if self._latest.get(request.key) == request.request_id:
+                del self._latest[request.key]
+
+    def stop(self):
+        self._stopped = True
+        for _ in self._threads:
+            with self._lock:
+                order = next(self._ids)
+            self._queue.put((float('inf'), order, None))
+        for thread in self._threads:
+            thread.join()
+
+    def _run(self):
+        while True:
+            _, _, request = self._queue.get()
+            if request is None or self._stopped:
+                return
+
+            if request.key is None:
+                self._run_warm_up(request)
+                continue
+
+            # Superseded while waiting in the queue
+            if not self.is_current(request):
+                continue
+
+            options = dict(self.engine_kwargs, **request.options)
+            profile = options.pop('profile', None)
+            memo = options.pop('memo', None)
+            if options.get('trace') is not None:
+                options['trace'].record('queue', time.perf_counter() - request.enqueued)
+
+            try:
+                self._run_request(request, options, profile, memo)
+            finally:
+                self._finish(request)
+
+    def _run_request(self, request, options, profile, memo):
+        try:
+            with ProfileCapture(profile) if profile else contextlib.nullcontext():
+                if request.on_segment is not None:
+                    result = self._run_stream(request, options, memo)
+                else:
+                    result = self.translate_fn(
+                        request.text, request.model_name, self.device,
+                        is_cancelled=lambda: not self.is_current(request),
+                        **options,
+                    )
+        except TranslationCancelled:
+            return
+        except Exception as error:
+            if request.on_error is not None and self.is_current(request):
+                request.on_error(request.request_id, error)
+            return
+
+        # Superseded while generate() was running
+        if request.on_done is not None and self.is_current(request):
+            request.on_done(request.request_id, result)
+
+    def _run_warm_up(self, request):
+        try:
+            self.warm_up_fn(request.model_name, self.device, **request.options)
+        except Exception as error:
+            if request.on_error is not None:
+                request.on_error(request.request_id, error)
+            return
+        if request.on_done is not None:
+            request.on_done(request.request_id, request.model_name)
+
+    # Translate sentence by sentence, reporting each one as soon as its batch is done.
+    # Sentences are always reported in order; ones already in the memo are reported
+    # as soon as everything before them is, without going through the model.
+    def _run_stream(self, request, options, memo=None):
+        segments = split_sentences(request.text)
+        signature = tuple(sorted((name, repr(value)) for name, value in options.items() if name not in UNKEYED_OPTIONS))
+        keys = [(request.model_name, signature, segment) for segment in segments]
+
+        translations = [memo.get(key) if memo is not None else None for key in keys]
+        missing = [index for index, translation in enumerate(translations) if translation is None]
+        reported = 0
+
+        def report_ready():
+            nonlocal reported
+            while reported < len(segments) and translations[reported] is not None:
+                request.on_segment(request.request_id, reported, translations[reported])
+                reported += 1
+
+        report_ready()
+        if missing:
+            stream = self.stream_fn(
+                [segments[index] for index in missing], request.model_name, self.device,
+                is_cancelled=lambda: not self.is_current(request),
+                **options,
+            )
+            for position, translation in stream:
+                if not self.is_current(request):
+                    raise TranslationCancelled()
+                index = missing[position]
+                translations[index] = translation
+                if memo is not None:
+                    memo.put(keys[index], translation)
+                report_ready()
+
+        return ' '.join(translations)
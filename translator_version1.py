@@ -1,9 +1,10 @@
 import tkinter as tk
 from tkinter import ttk
-from transformers import MarianMTModel, MarianTokenizer
 import torch
-import speech_recognition as sr
 import threading
+from speech_input import MicrophoneSource, SpeechCaptureWorker, SpeechRecognitionBackend
+from result_cache import TranslationResultCache
+from translation_engine import translate
 
 device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
@@ -15,6 +16,8 @@ class TranslatorApp:
         self.device = device
         self.model = None
         self.tokenizer = None
+        self.result_cache = TranslationResultCache()
+        self.speech_capture = None
 
         self.master = master
         self.master.title("Neural Machine Translation System")
@@ -85,25 +88,15 @@ class TranslatorApp:
 
     # Actual translation logic
     def perform_translation(self):
-        # Check if the model is loaded
-        if self.model is None:
-            source_to_target = self.lang_pair.get()
-            self.model_name = self.language_pairs[source_to_target]
-
-            self.tokenizer = MarianTokenizer.from_pretrained(self.model_name)
-            self.model = MarianMTModel.from_pretrained(self.model_name).to(self.device)
+        source_to_target = self.lang_pair.get()
+        self.model_name = self.language_pairs[source_to_target]
 
         # Get the input text
         text = self.input_text.get()
 
-        # Tokenize and move input to GPU
-        tokenized_text = self.tokenizer([text], return_tensors='pt').to(self.device)
-
-        # Generate translation
-        translation = self.model.generate(**tokenized_text)
-
-        # Decode the output
-        translated_text = self.tokenizer.decode(translation[0], skip_special_tokens=True)
+        # Translate (repeated phrases are answered from the on-disk result cache,
+        # models are loaded once and kept in the shared model cache)
+        translated_text = translate(text, self.model_name, self.device, result_cache=self.result_cache)
 
         # Update the output text widget on the main thread
         self.master.after(0, self.update_output_text, translated_text)
@@ -114,20 +107,27 @@ class TranslatorApp:
         self.output_textbox.insert(tk.END, text)  # Insert new text
         self.output_textbox.yview(tk.END)  # Scroll to the end if the text is too long
 
-    # Initialize Speech Recognition
+    # Initialize Speech Recognition (captured and recognized in the background;
+    # a second click stops listening)
     def recognize_speech(self):
-        recognizer = sr.Recognizer()
-        with sr.Microphone() as source:
-            self.output_textbox.delete(1.0, tk.END)
-            self.output_textbox.insert(tk.END, "Listening...\n")
-            audio = recognizer.listen(source)
-            try:
-                text = recognizer.recognize_google(audio)
-                self.input_text.set(text)
-            except sr.UnknownValueError:
-                self.input_text.set("Sorry, I didn't catch that.")
-            except sr.RequestError:
-                self.input_text.set("API unavailable.")
+        if self.speech_capture is not None:
+            self.speech_capture.stop()
+            self.speech_capture = None
+            return
+
+        self.output_textbox.delete(1.0, tk.END)
+        self.output_textbox.insert(tk.END, "Listening...\n")
+        self.speech_capture = SpeechCaptureWorker(
+            MicrophoneSource(),
+            SpeechRecognitionBackend('google'),
+            on_text=lambda index, text: self.master.after(0, self.on_speech_recognized, text),
+            on_error=lambda error: self.master.after(0, self.input_text.set, "API unavailable."),
+        ).start()
+
+    # Translate every recognized utterance right away
+    def on_speech_recognized(self, text):
+        self.input_text.set(text)
+        self.translate_text()
 
 # Create the main window
 root = tk.Tk()
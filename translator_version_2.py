@@ -4,73 +4,164 @@ from PyQt5.QtWidgets import (QApplication, QWidget,
                              QVBoxLayout, QLineEdit, 
                              QPushButton, QTextEdit, 
                              QGraphicsOpacityEffect,
-                             QHBoxLayout, QSizePolicy)
-from PyQt5.QtCore import (QThread, pyqtSignal, 
+                             QHBoxLayout, QSizePolicy,
+                             QCheckBox, QShortcut)
+from PyQt5.QtCore import (QObject, pyqtSignal, 
                           QPropertyAnimation, QEasingCurve)
 from PyQt5.QtGui import (QPixmap, QFont, QIcon, 
-                         QPalette, QBrush, QColor)
+                         QPalette, QBrush, QColor,
+                         QTextCursor, QKeySequence)
 from PyQt5.QtCore import (Qt, QPropertyAnimation, 
-                          pyqtSlot, QEasingCurve)
-from transformers import MarianMTModel, MarianTokenizer
-import torch
-import speech_recognition as sr
-import pyttsx3
-
-device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+                          pyqtSlot, QEasingCurve, QTimer)
+# torch, transformers, speech_recognition and pyttsx3 are imported lazily
+# (in the worker thread or when first used) so the window shows up immediately
+import time
+from instrumentation import FrameTimer, MetricsLog, RequestTrace, profile_path
+from decoding_profiles import DECODING_PROFILES
+from language_id import identify, route_pair
+from language_pairs import language_pairs
+import pivot_translation
+from model_cache import model_cache
+from result_cache import TranslationResultCache
+from speech_output import SpeechWorker
+from translation_worker import SegmentMemo, TranslationWorker
+
+# Pair loaded in the background right after the window is shown
+DEFAULT_LANGUAGE_PAIR = 'English to Spanish'
+
+# First entry of the pair list: translate into English from whatever language is typed
+AUTO_DETECT_PAIR = 'Detect language to English'
+WARM_UP_DELAY_MS = 50
+
+# Models used most in earlier sessions (model usage log), loaded in the background
+# after the default pair
+PREWARM_MODELS = 2
+
+# Translate-as-you-type waits for this long a pause in typing before translating
+LIVE_DEBOUNCE_MS = 250
+
+# Background image, decoded once. While the window is being resized it is rescaled
+# with a fast transform, and smoothly once resizing has paused for this long
+BACKGROUND_IMAGE = 'images/background_image2.jpg'
+RESIZE_SMOOTH_DELAY_MS = 150
+
+# Streamed sentences arriving within one frame are appended to the output together
+PAINT_INTERVAL_MS = 16
+
+# Decoding profile selected at startup (see decoding_profiles.py): the model's own beam
+# search, as before profiles existed; 'balanced' or 'fast' trade quality for latency
+DEFAULT_DECODING_PROFILE = 'quality'
+
+# speech_recognition engine used for voice input: 'google' (online) or an offline
+# engine such as 'sphinx', 'vosk' or 'whisper' (needs the matching package)
+SPEECH_RECOGNIZER = 'google'
 
 
 class TranslatorApp(QWidget):
-    def __init__(self):
+    # With server_url (see translation_server.py) the app is a thin client: no model
+    # is loaded in this process and requests are batched with other clients' requests
+    def __init__(self, server_url=None):
         super().__init__()
 
-        self.device = device
+        self.device = None  # Picked by the worker on first use (cuda when available)
         self.model = None
         self.tokenizer = None
 
-        # Load models once at startup
-        self.language_pairs = {
-            'English to Spanish': 'Helsinki-NLP/opus-mt-en-es',
-            'Spanish to English': 'Helsinki-NLP/opus-mt-es-en',
-            'English to French': 'Helsinki-NLP/opus-mt-en-fr',
-            'French to English': 'Helsinki-NLP/opus-mt-fr-en',
-            'English to German': 'Helsinki-NLP/opus-mt-en-de',
-            'German to English': 'Helsinki-NLP/opus-mt-de-en',
-            'English to Chinese': 'Helsinki-NLP/opus-mt-en-zh',
-            'Chinese to English': 'Helsinki-NLP/opus-mt-zh-en',
-            'English to Arabic': 'Helsinki-NLP/opus-mt-en-ar',
-            'Arabic to English': 'Helsinki-NLP/opus-mt-ar-en',
-            'English to Italian': 'Helsinki-NLP/opus-mt-en-it',
-            'Italian to English': 'Helsinki-NLP/opus-mt-it-en',
-            'English to Portuguese': 'Helsinki-NLP/opus-mt-tc-big-en-pt',
-            'Portuguese to English': 'Helsinki-NLP/opus-mt-tc-big-en-pt',
-            'English to Russian': 'Helsinki-NLP/opus-mt-en-ru',
-            'Russian to English': 'Helsinki-NLP/opus-mt-ru-en',
-            'English to Japanese': 'Helsinki-NLP/opus-mt-en-jap',
-            'Japanese to English': 'Helsinki-NLP/opus-mt-jap-en',
-            'English to Hindi': 'Helsinki-NLP/opus-mt-en-hi',
-            'Hindi to English': 'Helsinki-NLP/opus-mt-hi-en',
-            'English to Turkish': 'Helsinki-NLP/opus-mt-en-trk',
-            'Turkish to English': 'Helsinki-NLP/opus-mt-tr-en',
-            'Bengali to English': 'Helsinki-NLP/opus-mt-bn-en',
-            'English to Vietnamese': 'Helsinki-NLP/opus-mt-en-vi',
-            'English to Indonesian': 'Helsinki-NLP/opus-mt-en-id',
-            'English to Czech': 'Helsinki-NLP/opus-mt-en-cs',
-            'English to Romanian': 'Helsinki-NLP/opus-mt-en-ro',
-            'English to Swedish': 'Helsinki-NLP/opus-mt-en-sv',
-            'English to Catalan': 'Helsinki-NLP/opus-mt-en-ca',
-            'English to Finnish': 'Helsinki-NLP/opus-mt-en-fi',
-            'English to Danish': 'Helsinki-NLP/opus-mt-en-da',
-            'English to Ukrainian': 'Helsinki-NLP/opus-mt-en-uk',
-            'English to Hungarian': 'Helsinki-NLP/opus-mt-en-hu',
-            'English to Greek': 'Helsinki-NLP/opus-mt-en-el',
-            'English to Urdu': 'Helsinki-NLP/opus-mt-en-ur',
-            'English to Hebrew': 'Helsinki-NLP/opus-mt-en-he',
-            'English to Bulgarian': 'Helsinki-NLP/opus-mt-en-he'
-        }
+        # One long-lived inference worker owns the models for the whole session;
+        # its results are marshalled back to the GUI thread through Qt signals
+        self.latest_request_id = None
+        self.voice_request_ids = set()  # Voice translations still running, each with its own key
+        self.translation_signals = TranslationSignals()
+        self.translation_signals.translation_done.connect(self.update_output_text)
+        self.translation_signals.segment_done.connect(self.append_output_segment)
+        self.translation_signals.translation_failed.connect(self.on_translation_failed)
+        self.translation_signals.model_ready.connect(self.on_model_ready)
+        self.translation_signals.model_failed.connect(self.on_model_failed)
+        self.translation_signals.speech_done.connect(self.on_speech_done)
+        if server_url:
+            from translation_server import TranslationClient
+
+            self.result_cache = None  # The server keeps its own
+            client = TranslationClient(server_url)
+            self.translation_worker = TranslationWorker(
+                self.device, translate_fn=client.translate, stream_fn=client.translate_stream,
+                warm_up_fn=client.warm_up,
+            )
+        else:
+            # Near-duplicate sentences (same message, another name or number) reuse earlier translations
+            from translation_memory import TranslationMemory
+
+            # Pairs without a direct model are translated through English (pivot_translation.py)
+            self.result_cache = TranslationResultCache()
+            self.translation_worker = TranslationWorker(
+                self.device, translate_fn=pivot_translation.translate, stream_fn=pivot_translation.translate_stream,
+                warm_up_fn=pivot_translation.warm_up,
+                result_cache=self.result_cache, translation_memory=TranslationMemory(),
+            )
+
+        # Text-to-speech runs on its own thread with a single engine
+        self.speech_worker = SpeechWorker()
+
+        # Voice input is captured and recognized in the background while listening
+        self.speech_capture = None
+        self.translation_signals.speech_recognized.connect(self.on_speech_recognized)
+        self.translation_signals.voice_translation_done.connect(self.on_voice_translation_done)
+        self.translation_signals.speech_failed.connect(self.on_speech_failed)
+        self.translation_signals.listening_stopped.connect(self.on_listening_stopped)
+
+        # Per-stage timings of the current request, shown in the status bar and
+        # written to a rotating JSON-lines log once the request is fully done
+        self.metrics_log = MetricsLog()
+        self.current_trace = None
+        self.pending_trace_parts = set()
+        self.profile_next = False
+
+        # Translate-as-you-type: sentences translated earlier in the session are kept
+        # in memory, so each pass only sends the sentences that changed to the model
+        self.segment_memo = SegmentMemo()
+        self.live_request = False
+        self.last_keystroke = None
+        self.live_timer = QTimer(self)
+        self.live_timer.setSingleShot(True)
+        self.live_timer.setInterval(LIVE_DEBOUNCE_MS)
+        self.live_timer.timeout.connect(self.translate_live)
+
+        # Background image: the decoded pixmap and the size it was last smoothly scaled to
+        self.background_source = None
+        self.background_smooth_size = None
+        self.resize_timer = QTimer(self)
+        self.resize_timer.setSingleShot(True)
+        self.resize_timer.setInterval(RESIZE_SMOOTH_DELAY_MS)
+        self.resize_timer.timeout.connect(self.update_background_image)
+
+        # Sentences waiting to be appended to the output at the next frame
+        self.pending_segments = []
+        self.paint_timer = QTimer(self)
+        self.paint_timer.setSingleShot(True)
+        self.paint_timer.setInterval(PAINT_INTERVAL_MS)
+        self.paint_timer.timeout.connect(self.flush_output_segments)
+
+        # Frame times of the GUI thread, measured while the probe runs (Ctrl+Shift+F)
+        self.frame_timer = FrameTimer()
+        self.frame_probe = QTimer(self)
+        self.frame_probe.setTimerType(Qt.PreciseTimer)
+        self.frame_probe.setInterval(round(1000 * self.frame_timer.interval_s))
+        self.frame_probe.timeout.connect(self.frame_timer.tick)
+
+        # Language pair name -> MarianMT model name, or (model, model) for pairs that go
+        # through English; the translation server only offers the direct pairs
+        self.language_pairs = language_pairs
+        if not server_url:
+            self.language_pairs = dict(language_pairs, **pivot_translation.pivot_pairs())
+        self.local_models = not server_url
 
         # Set up the UI with animations and visuals
         self.initUI()
 
+        # Load the default model once the first frame has been painted
+        self.show_loading_state()
+        QTimer.singleShot(WARM_UP_DELAY_MS, self.start_warm_up)
+
 
     def initUI(self):
         self.setWindowTitle('Neural Machine Translation System')
@@ -107,8 +198,9 @@ class TranslatorApp(QWidget):
 
         # Language selection combo box
         self.lang_pair = QComboBox()
+        self.lang_pair.addItem(AUTO_DETECT_PAIR)
         self.lang_pair.addItems(self.language_pairs)  # Add language pairs here
-        self.lang_pair.setCurrentText("English to Spanish")  # Default language pair
+        self.lang_pair.setCurrentText(DEFAULT_LANGUAGE_PAIR)  # Default language pair
         self.lang_pair.setStyleSheet(
             "font-size: 20px;"
             "font-family: fantasy;"
@@ -125,6 +217,42 @@ class TranslatorApp(QWidget):
         # Add the combo box to the horizontal layout (hbox)
         hbox.addWidget(self.lang_pair, 2)  # Stretch factor 2 (larger)
 
+        # Decoding profile: greedy (fast), small beam (balanced) or full beam (quality)
+        self.decoding_combo = QComboBox()
+        self.decoding_combo.addItems(DECODING_PROFILES)
+        self.decoding_combo.setCurrentText(DEFAULT_DECODING_PROFILE)
+        self.decoding_combo.setStyleSheet(
+            "font-size: 16px;"
+            "font-family: fantasy;"
+            "background-color: hsl(217, 83%, 77%);"
+            "font-weight: bold;"
+            "margin: 25px;"
+            "border: 2px solid;"
+            "border-radius: 8px;"
+        )
+        hbox.addWidget(self.decoding_combo)
+
+        # Opt-in int8 quantized CPU inference (faster on machines without a GPU)
+        self.quantize_checkbox = QCheckBox('Fast CPU mode (int8)')
+        self.quantize_checkbox.setStyleSheet(
+            "font-size: 16px;"
+            "font-family: fantasy;"
+            "font-weight: bold;"
+            "margin: 25px;"
+        )
+        hbox.addWidget(self.quantize_checkbox)
+
+        # Translate while typing (debounced), in addition to the Translate button
+        self.live_checkbox = QCheckBox('Translate as you type')
+        self.live_checkbox.setChecked(True)
+        self.live_checkbox.setStyleSheet(
+            "font-size: 16px;"
+            "font-family: fantasy;"
+            "font-weight: bold;"
+            "margin: 25px;"
+        )
+        hbox.addWidget(self.live_checkbox)
+
         # Add the horizontal layout (hbox) to the main layout (layout)
         layout.addLayout(hbox)
 
@@ -167,6 +295,7 @@ class TranslatorApp(QWidget):
         )
         
         self.input_text.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)  # Make the input field larger
+        self.input_text.textEdited.connect(self.on_input_changed)
         input_layout.addWidget(self.input_text)
 
         # Add the horizontal layout to the main layout
@@ -270,27 +399,68 @@ class TranslatorApp(QWidget):
         )
 
         self.output_textbox.setReadOnly(True)  # Make it read-only
+        self.output_textbox.setUndoRedoEnabled(False)  # No undo history for appended sentences
+
+        # Fade-in of new results, created once and restarted for every result. The effect
+        # is only enabled while it runs: an enabled opacity effect renders the text box
+        # offscreen on every repaint
+        self.output_effect = QGraphicsOpacityEffect(self.output_textbox)
+        self.output_effect.setEnabled(False)
+        self.output_textbox.setGraphicsEffect(self.output_effect)
+        self.output_animation = QPropertyAnimation(self.output_effect, b"opacity", self)
+        self.output_animation.setDuration(1000)
+        self.output_animation.setStartValue(0)
+        self.output_animation.setEndValue(1)
+        self.output_animation.setEasingCurve(QEasingCurve.InOutQuad)
+        self.output_animation.finished.connect(self.on_output_animation_finished)
 
         output_hbox.addWidget(self.output_textbox, 5)  # Set stretch factor to 3
 
         # Add the horizontal layout to the main layout
         layout.addLayout(output_hbox)
 
+        # Status bar with the stage timings of the last request
+        self.status_label = QLabel('')
+        self.status_label.setStyleSheet(
+            "font-size: 13px;"
+            "font-family: monospace;"
+            "color: black;"
+            "background-color: hsl(217, 83%, 85%);"
+            "padding: 4px 12px;"
+            "margin: 0px 25px 10px 25px;"
+            "border-radius: 4px;"
+        )
+        layout.addWidget(self.status_label)
+
+        # Ctrl+P profiles the next translation with cProfile
+        self.profile_shortcut = QShortcut(QKeySequence('Ctrl+P'), self)
+        self.profile_shortcut.activated.connect(self.request_profile)
+
+        # Ctrl+Shift+F starts measuring frame times, pressing it again shows and logs them
+        self.frame_shortcut = QShortcut(QKeySequence('Ctrl+Shift+F'), self)
+        self.frame_shortcut.activated.connect(self.toggle_frame_probe)
+
         # Set the layout to the window
         self.setLayout(layout)
 
 
-    def update_background_image(self):
-        # Load the background image
-        background_image = QPixmap('images/background_image2.jpg')
+    def update_background_image(self, smooth=True):
+        # Load the background image once
+        if self.background_source is None:
+            self.background_source = QPixmap(BACKGROUND_IMAGE)
+        if smooth and self.background_smooth_size == self.size():
+            return
 
         # Resize the background image to match the widget's current size
-        scaled_image = background_image.scaled(self.size(), Qt.KeepAspectRatioByExpanding, Qt.SmoothTransformation)
+        transform = Qt.SmoothTransformation if smooth else Qt.FastTransformation
+        with self.frame_timer.measure('smooth_scale' if smooth else 'fast_scale'):
+            scaled_image = self.background_source.scaled(self.size(), Qt.KeepAspectRatioByExpanding, transform)
 
-        # Set the background image using QPalette
-        palette = QPalette()
-        palette.setBrush(QPalette.Window, QBrush(scaled_image))
-        self.setPalette(palette)
+            # Set the background image using QPalette
+            palette = QPalette()
+            palette.setBrush(QPalette.Window, QBrush(scaled_image))
+            self.setPalette(palette)
+        self.background_smooth_size = self.size() if smooth else None
 
         # background_image.lower()  # Make sure the background is behind other widgets
 
@@ -301,75 +471,310 @@ class TranslatorApp(QWidget):
         # background_label.resize(self.width(), self.height())
         # background_label.setScaledContents(True)
 
+    # Keep this session's model use for pre-warming the next one
+    def closeEvent(self, event):
+        if self.local_models:
+            model_cache.save_usage()
+        return super().closeEvent(event)
+
     def resizeEvent(self, event):
-        # Reapply the background image when the window is resized
-        self.update_background_image()
+        # Quick rescale on every resize event; the smooth one runs once resizing pauses
+        self.update_background_image(smooth=False)
+        self.resize_timer.start()
         return super().resizeEvent(event)
         
 
     def animate_output(self):
-        # Animate the opacity of the output textbox
-        effect = QGraphicsOpacityEffect()
-        self.output_textbox.setGraphicsEffect(effect)
-        self.animation = QPropertyAnimation(effect, b"opacity")
-        self.animation.setDuration(1000)
-        self.animation.setStartValue(0)
-        self.animation.setEndValue(1)
-        self.animation.setEasingCurve(QEasingCurve.InOutQuad)
-        self.animation.start()
-
+        # Animate the opacity of the output textbox, restarting a running fade
+        self.output_animation.stop()
+        self.output_effect.setEnabled(True)
+        self.animation_started = time.perf_counter()
+        self.output_animation.start()
+
+    def on_output_animation_finished(self):
+        self.output_effect.setEnabled(False)
+        if self.current_trace is not None and 'animate' in self.pending_trace_parts:
+            self.current_trace.record('animate', time.perf_counter() - self.animation_started)
+            self.complete_trace_part('animate')
+
+    # Mark one part of the current request as done; log the trace once all parts are
+    def complete_trace_part(self, part):
+        self.pending_trace_parts.discard(part)
+        self.status_label.setText(self.current_trace.summary())
+        if not self.pending_trace_parts:
+            self.metrics_log.log(self.current_trace)
+
+    def request_profile(self):
+        self.profile_next = True
+        self.status_label.setText('The next translation will be profiled')
+
+    def toggle_frame_probe(self):
+        if not self.frame_probe.isActive():
+            self.frame_timer.reset()
+            self.frame_probe.start()
+            self.status_label.setText('Measuring frame times, press Ctrl+Shift+F again to stop')
+            return
+        self.frame_probe.stop()
+        self.status_label.setText(self.frame_timer.summary_line())
+        self.metrics_log.log(RequestTrace(kind='frames', **self.frame_timer.summary()))
+
+
+    # Disable translation and say so until the default model is ready
+    def show_loading_state(self):
+        self.translate_btn.setEnabled(False)
+        self.translate_btn.setText('Loading model...')
+        self.output_textbox.setPlaceholderText('Loading the translation model, you can start typing...')
+
+    def start_warm_up(self):
+        default_model = self.language_pairs[DEFAULT_LANGUAGE_PAIR]
+        self.translation_worker.warm_up(
+            default_model,
+            on_done=self.translation_signals.model_ready.emit,
+            on_error=lambda request_id, error: self.translation_signals.model_failed.emit(str(error)),
+        )
+        if not self.local_models:
+            return
+
+        # Then the models used most in earlier sessions, queued behind any real request
+        model_cache.load_usage()
+        hot_models = [model_name for model_name in model_cache.hot_models() if model_name != default_model]
+        for model_name in hot_models[:PREWARM_MODELS]:
+            self.translation_worker.warm_up(model_name)
+
+    def on_model_ready(self, request_id, model_name):
+        self.translate_btn.setEnabled(True)
+        self.translate_btn.setText('Translate')
+        self.output_textbox.setPlaceholderText('')
+
+    def on_model_failed(self, message):
+        # Let the user try anyway, the model is loaded again on the first request
+        self.translate_btn.setEnabled(True)
+        self.translate_btn.setText('Translate')
+        self.output_textbox.setPlaceholderText(f'Could not load the model: {message}')
+
+
+    # Restart the debounce timer on every keystroke; the translation runs once typing pauses
+    def on_input_changed(self, text):
+        if not self.live_checkbox.isChecked():
+            return
+        self.last_keystroke = time.perf_counter()
+        if not text.strip():
+            # Nothing left to translate: drop pending work and clear the output
+            self.live_timer.stop()
+            self.translation_worker.cancel('output_textbox')
+            self.latest_request_id = None
+            self.pending_segments = []
+            self.output_textbox.clear()
+            return
+        self.live_timer.start()
+
+    def translate_live(self):
+        self.submit_translation(live=True)
 
     def translate_text(self):
+        self.live_timer.stop()
+        self.submit_translation(live=False)
+
+    # (pair, model name) for the selected pair; with AUTO_DETECT_PAIR the pair comes
+    # from the language of text, and (None, None) when no model translates it
+    def resolve_model(self, lang_pair, text):
+        if lang_pair != AUTO_DETECT_PAIR:
+            return lang_pair, self.language_pairs[lang_pair]
+
+        language = identify(text)
+        pair = route_pair(language) if language else None
+        if pair is None:
+            if language == 'English':
+                self.status_label.setText('The text is already in English')
+            else:
+                self.status_label.setText(f'No model translates {language or "this language"} to English')
+            return None, None
+        self.status_label.setText(f'Detected {language}')
+        return pair, self.language_pairs[pair]
+
+    # Live passes repaint quietly (no speech, no fade) and skip the on-disk result
+    # cache and the translation memory so half-typed sentences are not stored there;
+    # both kinds share the memo
+    def submit_translation(self, live):
         input_text = self.input_text.text()
-        lang_pair = self.lang_pair.currentText()
+        lang_pair, model_name = self.resolve_model(self.lang_pair.currentText(), input_text)
+        if model_name is None:
+            return
+
+        trace = RequestTrace(pair=lang_pair, characters=len(input_text), live=live)
+        profile = profile_path('gui') if self.profile_next and not live else None
+        if profile:
+            self.profile_next = False
+        options = {}
+        if live and self.result_cache is not None:
+            options = {'result_cache': None, 'translation_memory': None}
+
+        # Queue the translation on the worker, superseding any older request for the output
+        # box (a running generate() for text that has since changed is cancelled)
+        self.latest_request_id = self.translation_worker.submit(
+            input_text,
+            model_name,
+            key='output_textbox',
+            on_done=self.translation_signals.translation_done.emit,
+            on_error=lambda request_id, error: self.translation_signals.translation_failed.emit(request_id, str(error)),
+            on_segment=self.translation_signals.segment_done.emit,
+            quantized=self.quantize_checkbox.isChecked(),
+            decoding=self.decoding_combo.currentText(),
+            trace=trace,
+            profile=profile,
+            memo=self.segment_memo,
+            **options,
+        )
 
-        # Start translation in a separate thread
-        self.translation_thread = TranslationThread(input_text, lang_pair, self.language_pairs, self.device)
-        self.translation_thread.translation_done.connect(self.update_output_text)
-        self.translation_thread.start()
+        trace.request_id = self.latest_request_id
+        if profile:
+            trace.fields['profile'] = profile
+        self.current_trace = trace
+        self.live_request = live
 
-        # Start loading animation (fade out the text box to indicate it's working)
-        self.animate_output()
+        # Stop reading out the previous result
+        self.speech_worker.interrupt()
 
+        if live:
+            self.pending_trace_parts = {'output'}
+            return
 
-    # Function to provide text and voice output
-    def provide_output(self, translated_text):
-        # Text output
-        self.output_textbox.clear()
-        # Output translated text to the text box
-        self.output_textbox.setPlainText(translated_text)
-        
-        # Voice output
-        # Setting up text-to-speech engine
-        self.tts_engine = pyttsx3.init()
+        self.pending_trace_parts = {'output', 'animate', 'speech'}
 
-        # Slowing down the speech rate (default is around 200 words per minute)
-        self.tts_engine.setProperty('rate', 125)  # Lower the value for slower speech, e.g., 150
+        # Start loading animation (fade out the text box to indicate it's working)
+        self.animate_output()
 
-        self.tts_engine.setProperty('volume', 0.9)  # Set volume between 0.0 and 1.0
-        voices = self.tts_engine.getProperty('voices')
-        self.tts_engine.setProperty('voice', voices[1].id)  # Choose a specific voice (male/female)
 
-        self.tts_engine.say(translated_text)
-        self.tts_engine.runAndWait()
+    # Function to provide voice output for one translated sentence.
+    # Speech starts with the first sentence while the rest is still being generated;
+    # the speech worker queues the sentences so the GUI thread never waits for audio.
+    def provide_output(self, translated_text):
+        trace = self.current_trace
+        self.speech_worker.speak(translated_text, on_done=lambda seconds: trace.record('tts', seconds))
+
+    def update_output_text(self, request_id, translated_text):
+        # Only paint the result of the most recent request
+        if request_id != self.latest_request_id:
+            return
+
+        # Sentences still waiting for the next frame are shown before the request counts as done
+        self.paint_timer.stop()
+        self.flush_output_segments()
+        self.complete_trace_part('output')
+        if not self.live_request:
+            self.speech_worker.notify_when_done(lambda: self.translation_signals.speech_done.emit(request_id))
+
+    def on_translation_failed(self, request_id, message):
+        # A failed utterance adds a line to the voice transcript, the other lines stay
+        if request_id in self.voice_request_ids:
+            self.voice_request_ids.discard(request_id)
+            self.output_textbox.append(f"Translation error: {message}")
+            return
+        if request_id != self.latest_request_id:
+            return
+        self.paint_timer.stop()
+        self.pending_segments = []
+        self.output_textbox.setPlainText(f"Translation error: {message}")
+
+    def on_speech_done(self, request_id):
+        if request_id == self.latest_request_id:
+            self.complete_trace_part('speech')
+
+    # Paint the first translated sentence as soon as it arrives; the following ones are
+    # collected and appended at the end of the document once per frame
+    def append_output_segment(self, request_id, index, segment_text):
+        if request_id != self.latest_request_id:
+            return
+
+        if index == 0:
+            self.pending_segments = []
+            with self.current_trace.stage('paint'), self.frame_timer.measure('paint'):
+                # First sentence of a new result replaces the previous output
+                self.output_textbox.setPlainText(segment_text)
+            if not self.live_request:
+                self.animate_output()  # Animate when the text appears
+        else:
+            self.pending_segments.append(segment_text)
+            if not self.paint_timer.isActive():
+                self.paint_timer.start()
+
+        if self.live_request:
+            if index == 0 and self.last_keystroke is not None:
+                self.current_trace.fields['keystroke_to_update_s'] = time.perf_counter() - self.last_keystroke
+            self.status_label.setText(self.current_trace.summary())
+            return
+
+        self.status_label.setText(self.current_trace.summary())
+        self.provide_output(segment_text)
+
+
+    # Append the collected sentences through a cursor of its own: no full re-layout and
+    # no scrolling to the end of a long document for every sentence
+    def flush_output_segments(self):
+        if not self.pending_segments:
+            return
+        text = ' ' + ' '.join(self.pending_segments)
+        self.pending_segments = []
+        with self.current_trace.stage('paint'), self.frame_timer.measure('paint'):
+            cursor = QTextCursor(self.output_textbox.document())
+            cursor.movePosition(QTextCursor.End)
+            cursor.insertText(text)
+
+
+    # Start listening in the background, or stop when already listening.
+    # Every utterance is translated as soon as it has been recognized.
+    def recognize_speech(self):
+        if self.speech_capture is not None:
+            self.speech_capture.stop()
+            return
+
+        from speech_input import MicrophoneSource, SpeechCaptureWorker, SpeechRecognitionBackend
+
+        signals = self.translation_signals
+        self.speech_capture = SpeechCaptureWorker(
+            MicrophoneSource(),
+            SpeechRecognitionBackend(SPEECH_RECOGNIZER),
+            on_text=signals.speech_recognized.emit,
+            on_error=lambda error: signals.speech_failed.emit(str(error)),
+            on_finished=signals.listening_stopped.emit,
+        ).start()
+
+        self.voice_btn.setText('Stop Listening')
+        self.output_textbox.setPlainText("Listening...")
+        self.voice_lines = 0
+
+    def on_speech_recognized(self, index, text):
+        self.input_text.setText(text)
+
+        # Each utterance gets its own key so a new one does not cancel the previous one
+        _, model_name = self.resolve_model(self.lang_pair.currentText(), text)
+        if model_name is None:
+            return
+        request_id = self.translation_worker.submit(
+            text,
+            model_name,
+            key=('voice', index),
+            on_done=self.translation_signals.voice_translation_done.emit,
+            on_error=lambda request_id, error: self.translation_signals.translation_failed.emit(request_id, str(error)),
+            quantized=self.quantize_checkbox.isChecked(),
+            decoding=self.decoding_combo.currentText(),
+        )
+        self.voice_request_ids.add(request_id)
 
-    def update_output_text(self, translated_text):
-        self.provide_output(translated_text)
-        self.animate_output()  # Animate when the text appears
+    def on_voice_translation_done(self, request_id, translated_text):
+        self.voice_request_ids.discard(request_id)
+        if self.voice_lines == 0:
+            self.output_textbox.clear()
+        self.voice_lines += 1
+        self.output_textbox.append(translated_text)
+        self.speech_worker.speak(translated_text)
 
+    def on_speech_failed(self, message):
+        self.input_text.setText(f"Voice input error: {message}")
 
-    def recognize_speech(self):
-        recognizer = sr.Recognizer()
-        with sr.Microphone() as source:
-            self.output_textbox.setPlainText("Listening...")
-            audio = recognizer.listen(source)
-            try:
-                text = recognizer.recognize_google(audio)
-                self.input_text.setText(text)
-            except sr.UnknownValueError:
-                self.input_text.setText("Sorry, I didn't catch that.")
-            except sr.RequestError:
-                self.input_text.setText("API unavailable.")
+    def on_listening_stopped(self):
+        self.speech_capture = None
+        self.voice_btn.setText('Voice Input')
 
 
     # Create animation for the voice input button (color animation)
@@ -418,33 +823,39 @@ class TranslatorApp(QWidget):
 
 
 
-class TranslationThread(QThread):
-    translation_done = pyqtSignal(str)
+class TranslationSignals(QObject):
+    # Carry results from the worker thread to the GUI thread:
+    # (request_id, translated_text) once the whole input is done and
+    # (request_id, sentence_index, translated_sentence) as each sentence finishes,
+    # or (request_id, message) when the translation failed
+    translation_done = pyqtSignal(int, str)
+    segment_done = pyqtSignal(int, int, str)
+    translation_failed = pyqtSignal(int, str)
 
+    # Background warm-up finished: (request_id, model_name), or failed: (message)
+    model_ready = pyqtSignal(object, str)
+    model_failed = pyqtSignal(str)
 
-    def __init__(self, text, lang_pair, language_pairs, device):
-        super().__init__()
-        self.text = text
-        self.lang_pair = lang_pair
-        self.language_pairs = language_pairs
-        self.device = device
+    # Everything queued for speech for request_id has been spoken
+    speech_done = pyqtSignal(int)
 
-
-    def run(self):
-        model_name = self.language_pairs[self.lang_pair]
-        tokenizer = MarianTokenizer.from_pretrained(model_name)
-        model = MarianMTModel.from_pretrained(model_name).to(self.device)
-
-        tokenized_text = tokenizer([self.text], return_tensors='pt').to(self.device)
-        translation = model.generate(**tokenized_text)
-
-        translated_text = tokenizer.decode(translation[0], skip_special_tokens=True)
-        self.translation_done.emit(translated_text)
+    # Voice input: (segment_index, recognized_text), the translation of one
+    # utterance (request_id, translated_text), errors, and the end of listening
+    speech_recognized = pyqtSignal(int, str)
+    voice_translation_done = pyqtSignal(int, str)
+    speech_failed = pyqtSignal(str)
+    listening_stopped = pyqtSignal()
 
 
 # Running the application
 if __name__ == '__main__':
-    app = QApplication(sys.argv)
-    translator = TranslatorApp()
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--server', default=None, help='translation server URL, e.g. http://127.0.0.1:8765')
+    args, qt_args = parser.parse_known_args()
+
+    app = QApplication(sys.argv[:1] + qt_args)
+    translator = TranslatorApp(server_url=args.server)
     translator.show()
     sys.exit(app.exec_())